@@ -0,0 +1,75 @@
+"""
+Recall@k and QPS of FaissStore index types against the exact flat baseline
+on synthetic clustered embeddings.
+
+    python -m benchmarks.bench_ann --n 200000 --dim 384 --queries 1000 --k 10
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from src.rag.store import FaissStore
+
+
+def synthetic(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    # clustered like real chunk embeddings, unit-normalized for cosine/IP
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype("float32")
+    x = centers[rng.integers(0, clusters, n)] + 0.5 * rng.normal(size=(n, dim)).astype("float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def ids_of(store: FaissStore, q: np.ndarray, k: int):
+    t0 = time.perf_counter()
+    _, I = store.index.search(q, k)
+    return I, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=1000)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--clusters", type=int, default=256)
+    ap.add_argument("--nprobe", default="4,16,64")
+    ap.add_argument("--ef-search", default="32,64,128")
+    args = ap.parse_args()
+
+    data = synthetic(args.n, args.dim, args.clusters, seed=0)
+    queries = synthetic(args.queries, args.dim, args.clusters, seed=1)
+    texts = [""] * args.n
+
+    rows = []
+    truth = None
+    configs = [("flat", {})]
+    configs += [("ivf_flat", {"nprobe": int(p)}) for p in args.nprobe.split(",")]
+    configs += [("ivf_pq", {"nprobe": int(p)}) for p in args.nprobe.split(",")]
+    configs += [("hnsw", {"ef_search": int(e)}) for e in args.ef_search.split(",")]
+    built = {}
+    for index_type, params in configs:
+        if index_type not in built:
+            store = FaissStore(args.dim, index_type=index_type, ann_min_size=0)
+            t0 = time.perf_counter()
+            store.add(data, texts)
+            built[index_type] = (store, time.perf_counter() - t0)
+        store, build_s = built[index_type]
+        store.set_search_params(**params)
+        I, secs = ids_of(store, queries, args.k)
+        if truth is None:
+            truth = I
+        recall = float(np.mean([len(set(a) & set(b)) / args.k for a, b in zip(I, truth)]))
+        rows.append({
+            "index_type": index_type, **params,
+            "build_s": round(build_s, 2),
+            "memory_mb": round(store.memory_bytes() / 2**20, 1),
+            "qps": round(args.queries / secs, 1),
+            f"recall@{args.k}": round(recall, 4),
+        })
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
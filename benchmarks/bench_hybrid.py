@@ -0,0 +1,80 @@
+"""
+Per-requirement cost of hybrid (dense + BM25, reciprocal rank fusion)
+retrieval over dense-only FaissStore search, at CV scale (one store per
+CV, as in the scoring pipeline) and at pool scale (one large store).
+
+    python -m benchmarks.bench_hybrid --pairs 50 --cv-sections 60 --jd-reqs 60 --pool-chunks 100000
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks.bench_pipeline import HashEmbedder, synthetic_cv, synthetic_jd
+from src.ingest.document import parse_document
+from src.rag.store import FaissStore
+
+
+def _time_search(pairs, hybrid: bool) -> float:
+    """Seconds for index build + batched search over all pairs (excluding embedding)."""
+    total = 0.0
+    for chunks, chunk_emb, reqs, req_emb in pairs:
+        t0 = time.perf_counter()
+        store = FaissStore(dim=chunk_emb.shape[1], hybrid=hybrid)
+        store.add(chunk_emb, chunks)
+        store.search_batch(req_emb, k=3, query_texts=reqs if hybrid else None)
+        total += time.perf_counter() - t0
+    return total
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pairs", type=int, default=50)
+    ap.add_argument("--cv-sections", type=int, default=60)
+    ap.add_argument("--jd-reqs", type=int, default=60)
+    ap.add_argument("--pool-chunks", type=int, default=50000)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    embedder = HashEmbedder()
+    pairs = []
+    for _ in range(args.pairs):
+        chunks = parse_document(synthetic_cv(rng, args.cv_sections)).chunks
+        reqs = parse_document(synthetic_jd(rng, args.jd_reqs)).requirements
+        pairs.append((chunks, embedder.encode(chunks), reqs, embedder.encode(reqs)))
+    n_reqs = sum(len(p[2]) for p in pairs)
+    dense_s, hybrid_s = _time_search(pairs, False), _time_search(pairs, True)
+    report = {"cv_scale": {
+        "chunks_per_cv": sum(len(p[0]) for p in pairs) // args.pairs,
+        "dense_ms_per_req": round(dense_s / n_reqs * 1000, 4),
+        "hybrid_ms_per_req": round(hybrid_s / n_reqs * 1000, 4),
+        "added_ms_per_req": round((hybrid_s - dense_s) / n_reqs * 1000, 4),
+    }}
+
+    # pool scale: one big store, index built once, searched with one JD
+    pool = []
+    while len(pool) < args.pool_chunks:
+        pool += parse_document(synthetic_cv(rng, 50)).chunks
+    pool = pool[:args.pool_chunks]
+    pool_emb = embedder.encode(pool)
+    reqs = parse_document(synthetic_jd(rng, args.jd_reqs)).requirements
+    req_emb = embedder.encode(reqs)
+    row = {"chunks": len(pool)}
+    for hybrid in (False, True):
+        store = FaissStore(dim=pool_emb.shape[1], hybrid=hybrid)
+        t0 = time.perf_counter()
+        store.add(pool_emb, pool)
+        store.search_batch(req_emb[:1], k=3, query_texts=reqs[:1] if hybrid else None)   # builds BM25 weights
+        build_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        store.search_batch(req_emb, k=3, query_texts=reqs if hybrid else None)
+        name = "hybrid" if hybrid else "dense"
+        row[f"{name}_build_s"] = round(build_s, 3)
+        row[f"{name}_ms_per_req"] = round((time.perf_counter() - t0) / len(reqs) * 1000, 4)
+    row["added_ms_per_req"] = round(row["hybrid_ms_per_req"] - row["dense_ms_per_req"], 4)
+    report["pool_scale"] = row
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
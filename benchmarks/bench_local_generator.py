@@ -0,0 +1,49 @@
+"""
+Throughput of the resident transformers generator vs. max batch size.
+
+    python -m benchmarks.bench_local_generator --model sshleifer/tiny-gpt2 --prompts 32
+
+Needs `transformers` + `torch`; a tiny model keeps it runnable on CPU.
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.llm.local_generator import ResidentGenerator
+
+
+def run(model: str, batch_size: int, n_prompts: int, max_new_tokens: int, max_wait_ms: float) -> dict:
+    gen = ResidentGenerator(model_name=model, max_batch_size=batch_size,
+                            max_wait_ms=max_wait_ms, max_new_tokens=max_new_tokens)
+    gen.start()
+    gen.generate("warmup")
+    gen.batches = gen.prompts = 0
+    prompts = [f"Candidate {i} has {i % 7 + 1} years of Python and Docker experience." for i in range(n_prompts)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_prompts) as ex:
+        list(ex.map(gen.generate, prompts))
+    elapsed = time.perf_counter() - t0
+    return {
+        "max_batch_size": batch_size,
+        "seconds": round(elapsed, 3),
+        "prompts_per_s": round(n_prompts / elapsed, 2),
+        "avg_batch_size": gen.stats()["avg_batch_size"],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", default="sshleifer/tiny-gpt2")
+    ap.add_argument("--prompts", type=int, default=32)
+    ap.add_argument("--max-new-tokens", type=int, default=32)
+    ap.add_argument("--max-wait-ms", type=float, default=20)
+    ap.add_argument("--batch-sizes", default="1,2,4,8")
+    args = ap.parse_args()
+    rows = [run(args.model, int(b), args.prompts, args.max_new_tokens, args.max_wait_ms)
+            for b in args.batch_sizes.split(",")]
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Parsing throughput (MB/s) on large synthetic CVs: the previous per-pipeline
+scanners (CV bullets, JD requirements, llm_only bullets, chunking, tokens on
+joined text), each walking the text itself, vs. one shared ParsedDocument.
+
+    python -m benchmarks.bench_parsing --docs 200 --sections 200
+"""
+import argparse
+import json
+import random
+import re
+import time
+
+from benchmarks.bench_pipeline import synthetic_cv
+from src.ingest.chunking import chunk_text
+from src.ingest.document import ParsedDocument
+
+_CV_RE = re.compile(r"^\s*(?:[-•*·]|•)\s+(.*)$")
+_JD_RE = re.compile(r"^\s*(?:[-•*·]|\d+[.)])\s+(.*)$")
+
+
+def legacy_cv_bullets(text):
+    lines = [l.strip() for l in text.splitlines() if l.strip()]
+    bullets = [m.group(1) for m in map(_CV_RE.match, lines) if m]
+    return bullets or [l for l in lines if len(l) > 30]
+
+
+def legacy_requirements(text):
+    lines = [l.strip() for l in text.splitlines() if l.strip()]
+    bullets = [m.group(1) for m in map(_JD_RE.match, lines) if m]
+    return bullets or [l for l in lines if len(l) > 20]
+
+
+def legacy_bullets(text):
+    lines = [l.strip() for l in text.splitlines() if l.strip()]
+    bullets = [m.group(1).strip() for m in map(_JD_RE.match, lines) if m]
+    if bullets:
+        return bullets
+    rough = re.split(r"(?<=[.!?])\s+\n?|\n{2,}", text)
+    return [s.strip() for s in rough if len(s.strip()) > 20][:120]
+
+
+def legacy_tokens(text):
+    return set(re.findall(r"[A-Za-z0-9][A-Za-z0-9\-\+_.]{2,}", text.lower()))
+
+
+def legacy(text):
+    bullets = legacy_bullets(text)
+    return legacy_cv_bullets(text), legacy_requirements(text), bullets, chunk_text(text), legacy_tokens(" ".join(bullets))
+
+
+def unified(text):
+    doc = ParsedDocument(text)
+    return doc.cv_bullets, doc.requirements, doc.bullets_or_sentences, doc.chunks, doc.tokens
+
+
+def bulletize(cv: str, rng: random.Random) -> str:
+    # mix of "-", "•", numbered and plain lines, like real CV exports
+    out = []
+    for i, line in enumerate(cv.splitlines()):
+        style = rng.random()
+        if not line:
+            out.append(line)
+        elif style < 0.4:
+            out.append(f"- {line}")
+        elif style < 0.6:
+            out.append(f"  • {line}")
+        elif style < 0.7:
+            out.append(f"{i}. {line}")
+        else:
+            out.append(line)
+    return "\n".join(out)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=100)
+    ap.add_argument("--sections", type=int, default=200, help="paragraphs per CV")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    docs = [bulletize(synthetic_cv(rng, args.sections), rng) for _ in range(args.docs)]
+    mb = sum(len(d.encode("utf-8")) for d in docs) / 1e6
+
+    # the unified parser must give the same answers as the old scanners
+    for d in docs[:5]:
+        old, new = legacy(d), unified(d)
+        assert old[:4] == tuple(new[:4]) and old[4] <= new[4]
+
+    report = {"docs": args.docs, "mb": round(mb, 2)}
+    for name, fn in (("legacy", legacy), ("unified", unified)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            for d in docs:
+                fn(d)
+            best = min(best, time.perf_counter() - t0)
+        report[name] = {"seconds": round(best, 4), "mb_per_s": round(mb / best, 2)}
+    report["speedup"] = round(report["legacy"]["seconds"] / report["unified"]["seconds"], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+End-to-end latency of run_match / run_match_llm on synthetic CVs and JDs,
+with a deterministic fake LLM so numbers reflect our pipeline, not a provider.
+
+    python -m benchmarks.bench_pipeline --runs 50 --cv-sections 40 --jd-reqs 30 --llm-latency-ms 200
+    python -m benchmarks.bench_pipeline --embedder hash --out bench.json   # no model download
+
+Reports per-stage timings (parse, chunk, embed, index, retrieve, prompt, llm,
+merge), p50/p95 latency, throughput and peak RSS, as JSON.
+"""
+import argparse
+import json
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from src.pipeline import llm_only, match_pipeline
+from src.utils.timing import collect
+
+SKILLS = [
+    "Python", "Docker", "Kubernetes", "AWS", "PostgreSQL", "FastAPI", "React", "TypeScript",
+    "Terraform", "Kafka", "Spark", "Airflow", "Go", "Rust", "GraphQL", "Redis", "Linux",
+    "CI/CD", "pandas", "PyTorch", "scikit-learn", "Snowflake", "dbt", "GCP", "Azure",
+]
+VERBS = ["Built", "Led", "Designed", "Maintained", "Migrated", "Optimized", "Shipped", "Scaled"]
+THINGS = ["payment services", "data pipelines", "an ML platform", "internal tooling",
+          "customer dashboards", "search APIs", "a recommendation engine", "billing systems"]
+
+
+def synthetic_cv(rng: random.Random, sections: int) -> str:
+    paras = []
+    for _ in range(sections):
+        lines = [f"{rng.choice(VERBS)} {rng.choice(THINGS)} with {rng.choice(SKILLS)} and "
+                 f"{rng.choice(SKILLS)}, serving {rng.randint(1, 500)}k users."
+                 for _ in range(rng.randint(2, 5))]
+        paras.append("\n".join(lines))
+    return "\n\n".join(paras)
+
+
+def synthetic_jd(rng: random.Random, reqs: int) -> str:
+    lines = ["Senior Engineer", "Requirements:"]
+    lines += [f"- {rng.randint(1, 8)}+ years of {rng.choice(SKILLS)} in production {rng.choice(THINGS)}"
+              for _ in range(reqs)]
+    return "\n".join(lines)
+
+
+class FakeLLM:
+    """Same prompt -> same JSON after a fixed delay; scores derive from a hash of the prompt."""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.calls = 0
+
+    def __call__(self, prompt: str) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        h = zlib.crc32(prompt.encode("utf-8"))
+        return json.dumps({
+            "overall_score": h % 101,
+            "section_scores": {"hard_skills": h % 97, "experience": h % 89, "soft_skills": h % 83},
+            "good_matches": [], "missing_requirements": [], "missing_skills": [],
+            "improvement_suggestions": ["Quantify impact."], "improvements": ["Quantify impact."],
+        })
+
+
+class HashEmbedder:
+    """Bag-of-words hashing vectors: stands in for the model when it can't be downloaded."""
+
+    def __init__(self, *a, dim: int = 384, **kw):
+        self.dim = dim
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for i, t in enumerate(texts):
+            for w in t.lower().split():
+                out[i, zlib.crc32(w.encode()) % self.dim] += 1.0
+        return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+
+
+def percentile(xs: List[float], p: float) -> float:
+    return float(np.percentile(xs, p)) if xs else 0.0
+
+
+def bench(name: str, fn: Callable[[str, str], Dict], pairs, concurrency: int) -> Dict:
+    def one(pair):
+        with collect() as timings:
+            t0 = time.perf_counter()
+            fn(*pair)
+            return time.perf_counter() - t0, timings.seconds
+
+    fn(*pairs[0])   # warm up model + caches outside the measurement
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        runs = list(ex.map(one, pairs))
+    wall = time.perf_counter() - t0
+
+    latencies = [r[0] * 1000 for r in runs]
+    stages = sorted({s for _, st in runs for s in st})
+    return {
+        "pipeline": name,
+        "runs": len(runs),
+        "concurrency": concurrency,
+        "latency_ms": {"p50": round(percentile(latencies, 50), 3), "p95": round(percentile(latencies, 95), 3),
+                       "mean": round(statistics.fmean(latencies), 3), "max": round(max(latencies), 3)},
+        "throughput_per_s": round(len(runs) / wall, 3),
+        "stages_ms": {s: {"p50": round(percentile([st.get(s, 0) * 1000 for _, st in runs], 50), 3),
+                          "p95": round(percentile([st.get(s, 0) * 1000 for _, st in runs], 95), 3)}
+                      for s in stages},
+    }
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=30)
+    ap.add_argument("--cvs", type=int, default=10, help="distinct synthetic CVs")
+    ap.add_argument("--jds", type=int, default=5, help="distinct synthetic JDs")
+    ap.add_argument("--cv-sections", type=int, default=20)
+    ap.add_argument("--jd-reqs", type=int, default=25)
+    ap.add_argument("--llm-latency-ms", type=float, default=100)
+    ap.add_argument("--concurrency", type=int, default=1, help="requests in flight at once")
+    ap.add_argument("--pipelines", default="rag,llm_only")
+    ap.add_argument("--embedder", choices=("model", "hash"), default="model")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="write the JSON report here as well as stdout")
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    cvs = [synthetic_cv(rng, args.cv_sections) for _ in range(args.cvs)]
+    jds = [synthetic_jd(rng, args.jd_reqs) for _ in range(args.jds)]
+    pairs = [(cvs[i % len(cvs)], jds[i % len(jds)]) for i in range(args.runs)]
+
+    llm = FakeLLM(args.llm_latency_ms)
+    match_pipeline.call_llm = llm
+    llm_only.call_llm = llm
+    if args.embedder == "hash":
+        match_pipeline.Embedder = HashEmbedder
+
+    pipelines = {"rag": match_pipeline.run_match, "llm_only": llm_only.run_match_llm}
+    results = [bench(name, pipelines[name], pairs, args.concurrency) for name in args.pipelines.split(",")]
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": vars(args),
+        "results": results,
+        "llm_calls": llm.calls,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Memory, QPS and recall loss of FaissStore vector storage formats (float32,
+float16, int8, binary) with and without exact float rescoring, against the
+float32 flat baseline on synthetic clustered embeddings. Also reports the
+embedding cache's bytes per row for each dtype.
+
+    python -m benchmarks.bench_quantization --n 200000 --dim 384 --queries 1000 --k 10
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_ann import synthetic
+from src.rag.quantization import DTYPES, row_dtype
+from src.rag.store import FaissStore
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=1000)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--clusters", type=int, default=256)
+    ap.add_argument("--index-type", default="flat")
+    ap.add_argument("--rescore", default="0,4,10")
+    args = ap.parse_args()
+
+    data = synthetic(args.n, args.dim, args.clusters, seed=0)
+    queries = synthetic(args.queries, args.dim, args.clusters, seed=1)
+    texts = [str(i) for i in range(args.n)]
+    tmp = tempfile.mkdtemp()
+
+    truth = None
+    rows = []
+    configs = [("float32", 0)]
+    configs += [(s, int(r)) for s in ("float16", "int8", "binary") for r in args.rescore.split(",")]
+    for storage, rescore in configs:
+        store = FaissStore(args.dim, index_type=args.index_type, ann_min_size=0, storage=storage,
+                           rescore=rescore, rescore_path=os.path.join(tmp, f"{storage}-{rescore}.f32"))
+        t0 = time.perf_counter()
+        store.add(data, texts)
+        build_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        hits = store.search_batch(queries, k=args.k)
+        secs = time.perf_counter() - t0
+        ids = [{int(t) for _, t in h} for h in hits]
+        if truth is None:
+            truth = ids
+        recall = float(np.mean([len(a & b) / args.k for a, b in zip(ids, truth)]))
+        rows.append({
+            "storage": storage, "rescore": rescore,
+            "build_s": round(build_s, 2),
+            "index_mb": round(store.memory_bytes() / 2**20, 1),
+            # float copies live in a memory-mapped file; only candidate rows are paged in
+            "rescore_file_mb": round(args.n * args.dim * 4 / 2**20, 1) if store.rescore else 0,
+            "qps": round(args.queries / secs, 1),
+            f"recall@{args.k}": round(recall, 4),
+            "recall_loss": round(1 - recall, 4),
+        })
+    cache = {d: row_dtype(args.dim, d).itemsize for d in DTYPES}
+    print(json.dumps({"index": rows, "embedding_cache_bytes_per_row": cache}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,73 @@
-from fastapi import FastAPI
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from ..pipeline.llm_only import run_match_llm
-from ..pipeline.match_pipeline import run_match
-from ..config import LLM_PROVIDER, OPENAI_MODEL, OLLAMA_MODEL, TRANSFORMERS_MODEL
+from ..pipeline.llm_only import arun_match_llm
+from ..pipeline.match_pipeline import aiter_match, aprepare_match, arun_match
+from ..pipeline.batch_pipeline import arun_match_batch
+from ..pipeline.fast_scoring import run_match_fast
+from ..pipeline.ranking import arun_rank
+from ..pipeline.incremental import arun_match_incremental, get_session_store
+from ..pipeline.artifacts import (
+    aprepare_artifacts, arun_match_artifacts, arun_match_llm_artifacts, build_artifact,
+    get_artifact_store, resolve_pair, run_match_fast_artifacts,
+)
+from ..ingest.bulk_ingest import iter_pages
+from ..pipeline.corpus_search import flush_corpus, index_cv, rebuild_corpus, remove_cv, search_corpus
+from ..jobs.queue import get_queue
+from ..jobs.workers import HANDLERS, JobWorkerPool, job_items
+from ..rag.embedder import model_stats, warmup
+from ..rag.embedding_cache import cache_stats
+from ..llm.local_generator import get_generator
+from ..llm.provider import current_model, get_client
+from ..llm.response_cache import get_response_cache
+from ..utils.metrics import HTTP_SECONDS, render_prometheus
+from ..utils.timing import collect
+from ..config import (
+    LLM_PROVIDER, EMBEDDING_MODEL, EMBEDDING_WARMUP, JOBS_WORKERS,
+    RANK_KEYWORD_WEIGHT, RANK_LLM_BUDGET_S, RANK_SCREEN_BUDGET_S, RANK_TOP_N
+)
 
-app = FastAPI(title="CV-JD RAG Matcher", version="1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # load the embedding model once so /score only pays for encoding
+    if EMBEDDING_WARMUP:
+        warmup(EMBEDDING_MODEL)
+    if LLM_PROVIDER == "transformers":
+        get_generator().start()
+    # queued jobs (including ones interrupted by a restart) resume here
+    workers = JobWorkerPool(get_queue(), JOBS_WORKERS).start() if JOBS_WORKERS > 0 else None
+    yield
+    if workers:
+        workers.stop(timeout=5)
+    flush_corpus()
+    await get_client().aclose()
 
-class MatchRequest(BaseModel):
-    cv_text: str
-    jd_text: str
-    top_k: int = 3
+app = FastAPI(title="CV-JD RAG Matcher", version="1.0", lifespan=lifespan)
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    # streaming responses are timed up to their first byte
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(time.perf_counter() - t0, route=getattr(route, "path", "unmatched"),
+                         status=response.status_code)
+    return response
+
+async def _timed(coro, include_timings: bool) -> Dict:
+    # per-stage breakdown (ms) of this one request, when the client asks for it
+    if not include_timings:
+        return await coro
+    t0 = time.perf_counter()
+    with collect() as timings:
+        out = await coro
+    out["timings_ms"] = {**timings.as_ms(), "total": round((time.perf_counter() - t0) * 1000, 3)}
+    return out
 
 @app.get("/")
 def root():
@@ -19,31 +77,242 @@ def root():
 def health():
     return {"status": "ok"}
 
+class MatchRequest(BaseModel):
+    # texts, or ids of documents stored with POST /documents
+    cv_text: str = ""
+    jd_text: str = ""
+    cv_id: Optional[str] = None
+    jd_id: Optional[str] = None
+    top_k: int = 3
+    include_timings: bool = False
+    mode: str = "rag"            # rag | fast (embedding-only, no LLM; /score only)
+    session_id: Optional[str] = None  # rag /score: re-score only what changed since the last call
 
+class DocumentRequest(BaseModel):
+    kind: str                    # cv | jd
+    text: str
+    doc_id: Optional[str] = None # default: derived from the text hash
 
+class BatchMatchRequest(BaseModel):
+    # one JD against many CVs, or one CV against many JDs
+    jd_text: Optional[str] = None
+    cv_texts: Optional[List[str]] = None
+    cv_text: Optional[str] = None
+    jd_texts: Optional[List[str]] = None
+    ids: Optional[List[str]] = None
+    top_k: int = 3
 
-class MatchRequest(BaseModel):
-    cv_text: str
+class RankRequest(BaseModel):
+    # one JD against a pool: CV texts (named by ids) and/or stored CVs (POST /documents)
     jd_text: str
+    cv_texts: Optional[List[str]] = None
+    ids: Optional[List[str]] = None
+    cv_ids: Optional[List[str]] = None
+    top_n: int = RANK_TOP_N
     top_k: int = 3
+    keyword_weight: float = RANK_KEYWORD_WEIGHT
+    screen_budget_s: float = RANK_SCREEN_BUDGET_S
+    llm_budget_s: float = RANK_LLM_BUDGET_S
+
+class CorpusCV(BaseModel):
+    doc_id: str
+    cv_text: str
+    metadata: Dict[str, Any] = {}
+
+class JobRequest(BaseModel):
+    # kind: match | match_llm | batch; payload: the body of /score, /score_llm or /score_batch
+    kind: str
+    payload: Dict[str, Any]
+
+class CorpusSearchRequest(BaseModel):
+    jd_text: str
+    top_n: int = 20
+    k_per_req: int = 50
+
+class CorpusRebuildRequest(BaseModel):
+    index_type: str = "ivf_flat"     # flat | ivf_flat | ivf_pq
+    nprobe: Optional[int] = None
 
 @app.get("/config")
 def config():
-    model = None
-    if LLM_PROVIDER == "openai":
-        model = OPENAI_MODEL
-    elif LLM_PROVIDER == "ollama":
-        model = OLLAMA_MODEL
-    elif LLM_PROVIDER == "transformers":
-        model = TRANSFORMERS_MODEL
-    return {"llm_provider": LLM_PROVIDER, "model": model}
+    return {"llm_provider": LLM_PROVIDER, "model": current_model()}
+
+@app.get("/cache")
+def cache():
+    return {"llm": get_response_cache().stats(), "embeddings": cache_stats()}
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus text format: stage/LLM/encode histograms, LLM call and embedding counters
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/models")
+def models():
+    # load time / memory of the resident embedding models
+    out = {"embedding_model": EMBEDDING_MODEL, "loaded": model_stats(), "embedding_cache": cache_stats()}
+    if LLM_PROVIDER == "transformers":
+        out["llm_generator"] = get_generator().stats()
+    return out
+
+def _by_id(req: MatchRequest) -> bool:
+    return bool(req.cv_id or req.jd_id)
 
 @app.post("/score_llm")
-def score_llm(req: MatchRequest):
+async def score_llm(req: MatchRequest):
     # top_k ignored here; kept for UI compatibility
-    return run_match_llm(req.cv_text, req.jd_text)
+    if _by_id(req):
+        cv, jd = await run_in_threadpool(resolve_pair, req.cv_id, req.jd_id, req.cv_text, req.jd_text)
+        return await _timed(arun_match_llm_artifacts(cv, jd), req.include_timings)
+    return await _timed(arun_match_llm(req.cv_text, req.jd_text), req.include_timings)
 
 # keep old endpoint if you still want it
 @app.post("/score")
-def score(req: MatchRequest):
-    return run_match(req.cv_text, req.jd_text, top_k=req.top_k)
+async def score(req: MatchRequest):
+    if req.mode not in ("rag", "fast"):
+        raise HTTPException(status_code=400, detail="mode must be 'rag' or 'fast'.")
+    if _by_id(req):
+        # stored documents skip parsing, chunking and embedding
+        cv, jd = await run_in_threadpool(resolve_pair, req.cv_id, req.jd_id, req.cv_text, req.jd_text)
+        if req.mode == "fast":
+            return await _timed(run_in_threadpool(run_match_fast_artifacts, cv, jd), req.include_timings)
+        return await _timed(arun_match_artifacts(cv, jd, top_k=req.top_k), req.include_timings)
+    if req.mode == "fast":
+        return await _timed(run_in_threadpool(run_match_fast, req.cv_text, req.jd_text), req.include_timings)
+    if req.session_id:
+        return await _timed(arun_match_incremental(req.session_id, req.cv_text, req.jd_text, top_k=req.top_k),
+                            req.include_timings)
+    return await _timed(arun_match(req.cv_text, req.jd_text, top_k=req.top_k), req.include_timings)
+
+@app.delete("/sessions/{session_id}")
+def session_delete(session_id: str):
+    return {"session_id": session_id, "deleted": get_session_store().drop(session_id)}
+
+@app.post("/score_stream")
+async def score_stream(req: MatchRequest, format: str = "ndjson"):
+    # parse/retrieve first so bad input still gets a normal 400
+    index = None
+    if _by_id(req):
+        cv, jd = await run_in_threadpool(resolve_pair, req.cv_id, req.jd_id, req.cv_text, req.jd_text)
+        prepared, index = await aprepare_artifacts(cv, jd, top_k=req.top_k), cv.token_index()
+    else:
+        prepared = await aprepare_match(req.cv_text, req.jd_text, top_k=req.top_k)
+
+    async def events():
+        async for event in aiter_match(prepared, index):
+            if format == "sse":
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            else:
+                yield json.dumps(event) + "\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
+@app.post("/score_batch")
+async def score_batch(req: BatchMatchRequest):
+    return await arun_match_batch(
+        jd_text=req.jd_text, cv_texts=req.cv_texts,
+        cv_text=req.cv_text, jd_texts=req.jd_texts,
+        top_k=req.top_k, ids=req.ids
+    )
+
+@app.post("/documents")
+async def document_add(req: DocumentRequest):
+    # parse + embed once; score later with cv_id / jd_id
+    def build():
+        return get_artifact_store().put(build_artifact(req.kind, req.text, req.doc_id))
+    return (await run_in_threadpool(build)).info()
+
+@app.get("/documents/{doc_id}")
+def document_info(doc_id: str):
+    art = get_artifact_store().get(doc_id)
+    if art is None:
+        raise HTTPException(status_code=404, detail="Unknown document id.")
+    return art.info()
+
+@app.delete("/documents/{doc_id}")
+def document_delete(doc_id: str):
+    if not get_artifact_store().delete(doc_id):
+        raise HTTPException(status_code=404, detail="Unknown document id.")
+    return {"doc_id": doc_id, "deleted": True}
+
+@app.post("/extract_pdf")
+async def extract_pdf(request: Request):
+    # raw PDF bytes in the body; text is cached server-side by file hash (PDF_CACHE_DIR)
+    data = await request.body()
+    if not data:
+        raise HTTPException(status_code=400, detail="Send the PDF file as the request body.")
+    pages = iter_pages(data)
+    try:
+        # the first page is pulled here so an unreadable PDF still gets a normal 400
+        first = await run_in_threadpool(next, pages, None)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not extract text from PDF: {type(e).__name__}: {e}")
+
+    def text():
+        # pages in order as they are extracted, each ending with a form feed like pdfminer's extract_text
+        if first is not None:
+            yield first + "\x0c"
+            for page in pages:
+                yield page + "\x0c"
+
+    return StreamingResponse(text(), media_type="text/plain; charset=utf-8")
+
+@app.post("/rank")
+async def rank(req: RankRequest):
+    # embedding + keyword screen of every candidate, LLM scoring of the top_n only
+    return await arun_rank(req.jd_text, cv_texts=req.cv_texts, cv_ids=req.cv_ids, ids=req.ids,
+                           top_n=req.top_n, top_k=req.top_k, keyword_weight=req.keyword_weight,
+                           screen_budget_s=req.screen_budget_s, llm_budget_s=req.llm_budget_s)
+
+@app.post("/corpus/cvs")
+async def corpus_add(req: CorpusCV):
+    # add or replace a candidate in the persistent index
+    return await run_in_threadpool(index_cv, req.doc_id, req.cv_text, req.metadata)
+
+@app.delete("/corpus/cvs/{doc_id}")
+async def corpus_delete(doc_id: str):
+    return await run_in_threadpool(remove_cv, doc_id)
+
+@app.post("/corpus/snapshot")
+async def corpus_snapshot():
+    # force the debounced save now, e.g. after a bulk load
+    return await run_in_threadpool(flush_corpus)
+
+@app.post("/corpus/rebuild")
+async def corpus_rebuild(req: CorpusRebuildRequest):
+    # re-train as IVF (or back to flat) for the current pool size, then save
+    return await run_in_threadpool(rebuild_corpus, req.index_type, req.nprobe)
+
+@app.post("/corpus/search")
+async def corpus_search(req: CorpusSearchRequest):
+    return await run_in_threadpool(search_corpus, req.jd_text, req.top_n, req.k_per_req)
+
+@app.post("/jobs")
+def submit_job(req: JobRequest):
+    if req.kind not in HANDLERS:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind; expected one of {sorted(HANDLERS)}.")
+    missing = [f for f in HANDLERS[req.kind][1] if not req.payload.get(f)]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing payload fields: {missing}")
+    job_id = get_queue().submit(req.kind, req.payload, items=job_items(req.kind, req.payload))
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/jobs/metrics")
+def jobs_metrics():
+    return get_queue().metrics()
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = get_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = get_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail={"status": job["status"], "error": job["error"]})
+    return get_queue().result(job_id)
@@ -13,6 +13,103 @@ OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
 
+# LLM HTTP clients (one pooled client per process)
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "300"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# Concurrent LLM calls per provider; 0 = provider default (openai 8, ollama 2, transformers = batch size)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "0"))
+
+# Prompt packing: requirements + evidence are packed into as few calls as fit
+# LLM_CONTEXT_TOKENS, keeping room for the JSON answer (base + per requirement).
+# LLM_MAX_REQ_PER_CALL > 0 caps requirements per call (more, smaller parallel calls).
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "8192"))
+LLM_OUTPUT_TOKENS = int(os.getenv("LLM_OUTPUT_TOKENS", "512"))
+LLM_OUTPUT_TOKENS_PER_REQ = int(os.getenv("LLM_OUTPUT_TOKENS_PER_REQ", "48"))
+LLM_MAX_REQ_PER_CALL = int(os.getenv("LLM_MAX_REQ_PER_CALL", "0"))
+
+# LLM response cache: LRU + TTL in memory, optional SQLite file (empty = memory only)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "")
+
 # Transformers
 TRANSFORMERS_MODEL = os.getenv("TRANSFORMERS_MODEL", "mistralai/Mistral-7B-Instruct-v0.2")
+TRANSFORMERS_MAX_BATCH = int(os.getenv("TRANSFORMERS_MAX_BATCH", "4"))
+TRANSFORMERS_MAX_WAIT_MS = float(os.getenv("TRANSFORMERS_MAX_WAIT_MS", "50"))
+TRANSFORMERS_MAX_NEW_TOKENS = int(os.getenv("TRANSFORMERS_MAX_NEW_TOKENS", "600"))
+
+# Embeddings (loaded once per process, see src/rag/embedder.py)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "1") == "1"
+
+# Embedding cache: in-memory LRU + memory-mapped files under EMBED_CACHE_DIR, rows stored as EMBED_CACHE_DTYPE
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1") == "1"
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "50000"))
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", ".cache/embeddings")  # empty = memory only
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float32").lower()  # float32 | float16 | int8
+
+# FAISS index: flat | ivf_flat | hnsw | ivf_pq (ANN only kicks in above FAISS_ANN_MIN_SIZE vectors)
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+FAISS_ANN_MIN_SIZE = int(os.getenv("FAISS_ANN_MIN_SIZE", "10000"))
+FAISS_TRAIN_SIZE = int(os.getenv("FAISS_TRAIN_SIZE", "100000"))
+# Vector codes: float32 | float16 | int8 | binary; compact codes fetch FAISS_RESCORE x k
+# candidates and re-rank them with exact float scores (0 = no rescoring)
+FAISS_STORAGE = os.getenv("FAISS_STORAGE", "float32").lower()
+FAISS_RESCORE = int(os.getenv("FAISS_RESCORE", "4"))
+
+# Hybrid retrieval: BM25 over the same chunks, fused with dense hits by reciprocal rank.
+# auto = on for stores up to HYBRID_MAX_CHUNKS (every per-CV store, ~0.1 ms per requirement),
+# dense-only above that (~2 ms per requirement at 50k chunks: opt in with 1); 0 = off
+HYBRID_RETRIEVAL = {"1": True, "0": False}.get(os.getenv("HYBRID_RETRIEVAL", "auto").lower())   # None = auto
+HYBRID_MAX_CHUNKS = int(os.getenv("HYBRID_MAX_CHUNKS", "5000"))
+HYBRID_DEPTH = int(os.getenv("HYBRID_DEPTH", "20"))     # hits taken from each list before fusing
+RRF_K = int(os.getenv("RRF_K", "60"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# mode="fast" scoring: cosine thresholds for the default embedding model
+# (missing below LOW, good match from MATCH, full coverage at HIGH);
+# a calibrated FAST_THRESHOLDS_FILE overrides them when present
+FAST_SIM_LOW = float(os.getenv("FAST_SIM_LOW", "0.30"))
+FAST_SIM_MATCH = float(os.getenv("FAST_SIM_MATCH", "0.45"))
+FAST_SIM_HIGH = float(os.getenv("FAST_SIM_HIGH", "0.60"))
+FAST_THRESHOLDS_FILE = os.getenv("FAST_THRESHOLDS_FILE", ".cache/fast_thresholds.json")
+
+# Two-stage ranking (/rank): embedding + keyword screen of the whole pool, LLM scoring of the top N
+RANK_TOP_N = int(os.getenv("RANK_TOP_N", "10"))
+RANK_KEYWORD_WEIGHT = float(os.getenv("RANK_KEYWORD_WEIGHT", "0.3"))   # rest is embedding coverage
+RANK_SCREEN_BUDGET_S = float(os.getenv("RANK_SCREEN_BUDGET_S", "10"))
+RANK_LLM_BUDGET_S = float(os.getenv("RANK_LLM_BUDGET_S", "120"))
+RANK_MAX_DOCS = int(os.getenv("RANK_MAX_DOCS", "5000"))
+
+# Parsed + embedded documents for scoring by cv_id / jd_id (POST /documents)
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", ".cache/artifacts")   # empty = memory only
+ARTIFACT_CACHE_SIZE = int(os.getenv("ARTIFACT_CACHE_SIZE", "1000"))
+
+# Incremental re-scoring: per-session vectors and batch results (/score with session_id)
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "256"))
+
+# Persistent candidate corpus (FAISS + metadata) for recruiter-side search
+CORPUS_INDEX_DIR = os.getenv("CORPUS_INDEX_DIR", ".cache/corpus")
+# Writes are saved once per CORPUS_SAVE_DELAY_S window instead of on every add/delete
+# (0 = save on every write). Edits inside the window are lost if the process dies.
+CORPUS_SAVE_DELAY_S = float(os.getenv("CORPUS_SAVE_DELAY_S", "2.0"))
+# A flat corpus is re-trained as IVF (ivf_flat) at its next save once it holds this many chunks (0 = never)
+CORPUS_IVF_MIN_CHUNKS = int(os.getenv("CORPUS_IVF_MIN_CHUNKS", "100000"))
+
+# PDF ingestion: text cached by file hash; documents with at least
+# PDF_PARALLEL_MIN_PAGES pages are extracted in page ranges on PDF_WORKERS processes (0 = CPUs)
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", ".cache/pdf_text")   # empty = no cache
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
 
+# Background job queue (SQLite file) and worker threads; JOBS_WORKERS=0 disables the workers
+JOBS_DB = os.getenv("JOBS_DB", ".cache/jobs.sqlite")
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+# A job interrupted this many times (e.g. one that crashes the process) is failed, not re-queued
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
@@ -0,0 +1,255 @@
+"""
+Parallel, cached PDF-to-text.
+
+Text is cached by sha256 of the file bytes (PDF_CACHE_DIR), so a re-upload
+costs one hash. Long documents are split into page ranges extracted in a
+process pool and streamed back in page order; bulk imports parallelize
+across files instead, since most CVs are only a few pages.
+
+    python -m src.ingest.bulk_ingest cvs/ --out .cache/ingest --workers 8
+"""
+import argparse
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from ..config import PDF_CACHE_DIR, PDF_PARALLEL_MIN_PAGES, PDF_WORKERS
+from .chunking import chunk_text
+
+
+def file_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def page_count(data: bytes) -> int:
+    from pdfminer.pdfpage import PDFPage
+    # walks the page tree only; no content streams are parsed
+    return sum(1 for _ in PDFPage.get_pages(io.BytesIO(data)))
+
+
+def extract_pages(data: bytes, start: int = 0, end: Optional[int] = None) -> List[str]:
+    """Text of pages [start, end), one string per page, laid out like pdfminer's extract_text."""
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    rsrc = PDFResourceManager()
+    laparams = LAParams()
+    pages = []
+    for i, page in enumerate(PDFPage.get_pages(io.BytesIO(data))):
+        if i < start:
+            continue
+        if end is not None and i >= end:
+            break
+        buf = io.StringIO()
+        device = TextConverter(rsrc, buf, laparams=laparams)
+        PDFPageInterpreter(rsrc, device).process_page(page)
+        device.close()
+        # TextConverter ends every page with a form feed
+        pages.append(buf.getvalue().rstrip("\x0c"))
+    return pages
+
+
+class TextCache:
+    """Extracted pages per content hash, one small JSON file each."""
+
+    def __init__(self, cache_dir: Optional[str] = PDF_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()     # counters are bumped from request threads
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], digest + ".json")
+
+    def get(self, digest: str) -> Optional[List[str]]:
+        if self.cache_dir and os.path.exists(self._path(digest)):
+            with open(self._path(digest)) as f:
+                pages = json.load(f)
+            with self._lock:
+                self.hits += 1
+            return pages
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, digest: str, pages: List[str]):
+        if not self.cache_dir:
+            return
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(pages, f)
+        os.replace(tmp, path)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "dir": self.cache_dir}
+
+
+def _workers(workers: int = PDF_WORKERS) -> int:
+    return workers or os.cpu_count() or 1
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn, not fork: the API process runs threads (uvicorn, torch, HTTP clients)
+    # whose locks a forked child would inherit mid-acquire
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_cache: Optional[TextCache] = None
+_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = _process_pool(_workers())
+        return _pool
+
+
+def get_text_cache() -> TextCache:
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = TextCache()
+        return _cache
+
+
+def iter_pages(data: bytes, cache: Optional[TextCache] = None,
+               min_parallel_pages: int = PDF_PARALLEL_MIN_PAGES) -> Iterator[str]:
+    """
+    Yield page texts in order as they become available. Cached documents
+    are served from disk; documents with at least `min_parallel_pages`
+    pages are extracted in page ranges on the process pool.
+    """
+    cache = cache or get_text_cache()
+    digest = file_hash(data)
+    cached = cache.get(digest)
+    if cached is not None:
+        yield from cached
+        return
+
+    pages: List[str] = []
+    n = page_count(data)
+    if n < max(2, min_parallel_pages):
+        for page in extract_pages(data):
+            pages.append(page)
+            yield page
+    else:
+        pool = get_pool()
+        step = max(1, -(-n // (_workers() * 2)))   # ~2 ranges per worker
+        futures = [pool.submit(extract_pages, data, s, min(s + step, n)) for s in range(0, n, step)]
+        try:
+            for fut in futures:
+                for page in fut.result():
+                    pages.append(page)
+                    yield page
+        finally:
+            for fut in futures:
+                fut.cancel()
+    cache.put(digest, pages)
+
+
+def pdf_bytes_to_text(data: bytes, cache: Optional[TextCache] = None) -> str:
+    # same layout as pdfminer's extract_text: every page ends with a form feed
+    return "".join(page + "\x0c" for page in iter_pages(data, cache))
+
+
+def _ingest_file(path: str, cache_dir: Optional[str]) -> Dict:
+    # runs in a worker process: one task per file
+    with open(path, "rb") as f:
+        data = f.read()
+    cache = TextCache(cache_dir)
+    digest = file_hash(data)
+    pages = cache.get(digest)
+    cached = pages is not None
+    if pages is None:
+        pages = extract_pages(data)
+        cache.put(digest, pages)
+    text = "".join(page + "\x0c" for page in pages)
+    return {"sha256": digest, "pages": len(pages), "cached": cached,
+            "text": text, "chunks": chunk_text(text, max_chars=800)}
+
+
+def ingest_directory(src_dir: str, out_dir: str, workers: int = PDF_WORKERS,
+                     cache_dir: Optional[str] = PDF_CACHE_DIR) -> Dict:
+    """
+    Extract every PDF under `src_dir` into `out_dir`: texts/<doc_id>.txt plus
+    chunks.jsonl ({doc_id, sha256, pages, chunks}). Files whose hash is
+    already in chunks.jsonl are skipped.
+    """
+    os.makedirs(os.path.join(out_dir, "texts"), exist_ok=True)
+    store_path = os.path.join(out_dir, "chunks.jsonl")
+    store: Dict[str, Dict] = {}
+    if os.path.exists(store_path):
+        with open(store_path) as f:
+            store = {rec["doc_id"]: rec for rec in map(json.loads, f)}
+
+    todo = []
+    for root, _, files in os.walk(src_dir):
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                path = os.path.join(root, name)
+                doc_id = os.path.splitext(os.path.relpath(path, src_dir))[0].replace(os.sep, "/")
+                todo.append((doc_id, path))
+
+    t0 = time.perf_counter()
+    done = skipped = failed = pages = 0
+    with _process_pool(_workers(workers)) as pool:
+        futures = {}
+        for doc_id, path in todo:
+            with open(path, "rb") as f:
+                digest = file_hash(f.read())
+            if store.get(doc_id, {}).get("sha256") == digest:
+                skipped += 1
+                continue
+            futures[doc_id] = pool.submit(_ingest_file, path, cache_dir)
+        for doc_id, fut in futures.items():
+            try:
+                rec = fut.result()
+            except Exception as e:
+                failed += 1
+                print(f"failed: {doc_id}: {type(e).__name__}: {e}")
+                continue
+            text_path = os.path.join(out_dir, "texts", doc_id + ".txt")
+            os.makedirs(os.path.dirname(text_path), exist_ok=True)
+            with open(text_path, "w") as f:
+                f.write(rec.pop("text"))
+            store[doc_id] = {"doc_id": doc_id, **rec}
+            done += 1
+            pages += rec["pages"]
+
+    tmp = store_path + ".tmp"
+    with open(tmp, "w") as f:
+        for rec in store.values():
+            f.write(json.dumps({k: v for k, v in rec.items() if k != "cached"}) + "\n")
+    os.replace(tmp, store_path)
+    elapsed = time.perf_counter() - t0
+    return {"ingested": done, "skipped": skipped, "failed": failed, "pages": pages,
+            "seconds": round(elapsed, 3), "pages_per_s": round(pages / elapsed, 2) if elapsed else 0.0}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pre-extract a directory of PDF CVs into text + chunks.")
+    ap.add_argument("src_dir")
+    ap.add_argument("--out", default=".cache/ingest")
+    ap.add_argument("--workers", type=int, default=PDF_WORKERS, help="0 = one per CPU")
+    args = ap.parse_args()
+    print(json.dumps(ingest_directory(args.src_dir, args.out, args.workers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
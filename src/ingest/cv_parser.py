@@ -1,20 +1,10 @@
-import re
 from typing import List
 
-BULLET_RE = re.compile(r"^\s*(?:[-•*·]|\u2022)\s+(.*)$")
+from .document import parse_document
 
 def extract_cv_bullets(cv_text: str) -> List[str]:
     """
     Extract bullet-like lines from a CV to use as experience evidence.
+    Falls back to long lines if there are no bullets.
     """
-    lines = [l.strip() for l in cv_text.splitlines() if l.strip()]
-    bullets = []
-    for l in lines:
-        m = BULLET_RE.match(l)
-        if m:
-            bullets.append(m.group(1))
-    # fallback: long lines as "bullets"
-    if not bullets:
-        bullets = [l for l in lines if len(l) > 30]
-    return bullets
-
+    return list(parse_document(cv_text).cv_bullets)
@@ -0,0 +1,81 @@
+import re
+from functools import cached_property, lru_cache
+from typing import FrozenSet, List
+
+from .chunking import chunk_text
+
+# applied to stripped lines only, after a cheap first-character check
+BULLET_RE = re.compile(r"(?:([-•*·])|\d+[.)])\s+(.*)$")
+BULLET_CHARS = "-•*·"
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+\n?|\n{2,}")
+WORD_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9\-\+_.]{2,}")
+
+CHUNK_CHARS = 800
+MAX_SENTENCES = 120
+
+
+class ParsedDocument:
+    """
+    One scan over a CV or JD's lines yields its stripped lines, symbol
+    bullets ("-", "•", ...) and numbered bullets together. Chunks, fallback
+    sentences and the token set are computed on first use and kept, so every
+    pipeline reading the same text shares one object (see parse_document).
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines: List[str] = []             # stripped, non-empty
+        self.bullets: List[str] = []           # symbol or numbered bullets (JD style)
+        self.symbol_bullets: List[str] = []    # symbol bullets only (CV style)
+        match = BULLET_RE.match
+        for raw in text.splitlines():
+            line = raw.strip()
+            if not line:
+                continue
+            self.lines.append(line)
+            first = line[0]
+            if first in BULLET_CHARS or first.isdigit():
+                m = match(line)
+                if m:
+                    self.bullets.append(m.group(2))
+                    if m.group(1):
+                        self.symbol_bullets.append(m.group(2))
+
+    @cached_property
+    def sentences(self) -> List[str]:
+        """Heuristic sentences for texts without bullets."""
+        return [s.strip() for s in SENTENCE_SPLIT_RE.split(self.text) if len(s.strip()) > 20][:MAX_SENTENCES]
+
+    @cached_property
+    def chunks(self) -> List[str]:
+        return chunk_text(self.text, max_chars=CHUNK_CHARS)
+
+    @cached_property
+    def tokens(self) -> FrozenSet[str]:
+        return frozenset(WORD_RE.findall(self.text.lower()))
+
+    @property
+    def cv_bullets(self) -> List[str]:
+        # fallback: long lines as "bullets"
+        return self.symbol_bullets or [l for l in self.lines if len(l) > 30]
+
+    @property
+    def requirements(self) -> List[str]:
+        # fallback: take non-trivial lines
+        return self.bullets or [l for l in self.lines if len(l) > 20]
+
+    @property
+    def bullets_or_sentences(self) -> List[str]:
+        return self.bullets or self.sentences
+
+
+@lru_cache(maxsize=256)
+def parse_document(text: str) -> ParsedDocument:
+    """Parsed view of `text`, shared by every caller that parses the same text (treat as read-only)."""
+    return ParsedDocument(text)
+
+
+@lru_cache(maxsize=8192)
+def word_set(text: str) -> FrozenSet[str]:
+    # tokens never span whitespace, so the set of a " ".join(...) is the union of the parts' sets
+    return frozenset(WORD_RE.findall(text.lower()))
@@ -1,5 +1,6 @@
-from pdfminer.high_level import extract_text
+from .bulk_ingest import pdf_bytes_to_text
 
 def pdf_to_text(path: str) -> str:
-    return extract_text(path)
-
+    # cached by content hash; long files are extracted in parallel page ranges
+    with open(path, "rb") as f:
+        return pdf_bytes_to_text(f.read())
@@ -0,0 +1,193 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from ..config import JOBS_DB, JOBS_MAX_ATTEMPTS
+
+STATUSES = ("queued", "running", "done", "failed")
+
+
+class JobQueue:
+    """
+    Persistent FIFO of scoring jobs in one SQLite file. Jobs survive restarts:
+    anything still "running" when the process died is put back in the queue
+    on open, so a worker picks it up again -- unless it has already been
+    started `max_attempts` times, in which case it is marked failed so a job
+    that keeps killing the process cannot loop forever. Only start() counts an
+    attempt, and a graceful shutdown hands its jobs back with requeue().
+    """
+
+    def __init__(self, db_path: str = JOBS_DB, max_attempts: int = JOBS_MAX_ATTEMPTS):
+        if db_path != ":memory:" and os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, payload TEXT, status TEXT, "
+                "done INTEGER DEFAULT 0, total INTEGER DEFAULT 0, items INTEGER DEFAULT 1, "
+                "result TEXT, error TEXT, attempts INTEGER DEFAULT 0, "
+                "created_at REAL, started_at REAL, finished_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self.abandoned = self._db.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                "WHERE status = 'running' AND attempts >= ?",
+                (json.dumps(f"Interrupted {max_attempts} times; not retried (JOBS_MAX_ATTEMPTS)."),
+                 time.time(), max_attempts),
+            ).rowcount
+            self.recovered = self._db.execute(
+                "UPDATE jobs SET status = 'queued', done = 0, started_at = NULL WHERE status = 'running'"
+            ).rowcount
+            self._db.commit()
+
+    def submit(self, kind: str, payload: Dict[str, Any], items: int = 1) -> str:
+        """Queue a job; `items` is the number of documents it scores (for throughput)."""
+        job_id = uuid.uuid4().hex
+        with self._wakeup:
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, payload, status, items, created_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(payload), items, time.time()),
+            )
+            self._db.commit()
+            self._wakeup.notify()
+        return job_id
+
+    def claim(self, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job and mark it running; waits up to `timeout` seconds for one."""
+        deadline = time.monotonic() + timeout
+        with self._wakeup:
+            while True:
+                row = self._db.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), row["id"]),
+                    )
+                    self._db.commit()
+                    job = self._get(row["id"])
+                    job["payload"] = json.loads(self._db.execute(
+                        "SELECT payload FROM jobs WHERE id = ?", (row["id"],)).fetchone()[0])
+                    return job
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._wakeup.wait(remaining)
+
+    def start(self, job_id: str):
+        """Count an attempt: the worker is about to run the claimed job."""
+        with self._lock:
+            self._db.execute("UPDATE jobs SET attempts = attempts + 1 WHERE id = ?", (job_id,))
+            self._db.commit()
+
+    def requeue(self, job_id: str):
+        """Put a running job back in the queue without counting its attempt (graceful shutdown)."""
+        with self._wakeup:
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', done = 0, started_at = NULL, attempts = MAX(attempts - 1, 0) "
+                "WHERE id = ? AND status = 'running'", (job_id,),
+            )
+            self._db.commit()
+            self._wakeup.notify()
+
+    def wake(self):
+        """Wake every claim() waiting for a job, e.g. so workers notice a stop request."""
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def progress(self, job_id: str, done: int, total: int):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET done = ?, total = ? WHERE id = ?", (done, total, job_id))
+            self._db.commit()
+
+    def finish(self, job_id: str, result: Any):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', result = ?, finished_at = ?, done = MAX(done, total) WHERE id = ?",
+                (json.dumps(result), time.time(), job_id),
+            )
+            self._db.commit()
+
+    def fail(self, job_id: str, error: Any):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (json.dumps(error), time.time(), job_id),
+            )
+            self._db.commit()
+
+    def _get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute(
+            "SELECT id, kind, status, done, total, items, error, attempts, created_at, started_at, finished_at "
+            "FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["error"] = json.loads(job["error"]) if job["error"] else None
+        job["progress"] = round(job["done"] / job["total"], 4) if job["total"] else 0.0
+        end = job["finished_at"] or time.time()
+        elapsed = end - job["started_at"] if job["started_at"] else 0.0
+        job["queue_seconds"] = round((job["started_at"] or end) - job["created_at"], 3)
+        job["run_seconds"] = round(elapsed, 3)
+        # documents/s; while running, extrapolated from the finished fraction of LLM calls
+        scored = job["items"] if job["status"] == "done" else job["items"] * job["progress"]
+        job["items_per_s"] = round(scored / elapsed, 4) if elapsed > 0 else 0.0
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._get(job_id)
+
+    def result(self, job_id: str) -> Any:
+        with self._lock:
+            row = self._db.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def metrics(self, window: float = 3600.0) -> Dict[str, Any]:
+        """Queue depth per status and throughput over jobs finished in the last `window` seconds."""
+        since = time.time() - window
+        with self._lock:
+            depth = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            row = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(items), 0), COALESCE(SUM(finished_at - started_at), 0), "
+                "COALESCE(AVG(started_at - created_at), 0) "
+                "FROM jobs WHERE status = 'done' AND finished_at >= ?", (since,)
+            ).fetchone()
+            oldest = self._db.execute("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        jobs, items, busy, wait = row
+        return {
+            "queue_depth": depth.get("queued", 0),
+            "by_status": {s: depth.get(s, 0) for s in STATUSES},
+            "oldest_queued_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+            "window_seconds": window,
+            "completed": jobs,
+            "jobs_per_minute": round(jobs / window * 60, 4),
+            "items_per_s": round(items / busy, 4) if busy > 0 else 0.0,
+            "avg_queue_seconds": round(wait, 3),
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
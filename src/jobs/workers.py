@@ -0,0 +1,114 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from fastapi import HTTPException
+
+from ..config import JOBS_WORKERS
+from ..pipeline.batch_pipeline import run_match_batch
+from ..pipeline.llm_only import run_match_llm
+from ..pipeline.match_pipeline import run_match
+from .queue import JobQueue, get_queue
+
+Progress = Callable[[int, int], None]
+
+
+def _run_match(payload: Dict[str, Any], progress: Progress) -> Dict:
+    return run_match(payload["cv_text"], payload["jd_text"], top_k=payload.get("top_k", 3), progress=progress)
+
+
+def _run_match_llm(payload: Dict[str, Any], progress: Progress) -> Dict:
+    return run_match_llm(payload["cv_text"], payload["jd_text"], progress=progress)
+
+
+def _run_batch(payload: Dict[str, Any], progress: Progress) -> Dict:
+    return run_match_batch(
+        jd_text=payload.get("jd_text"), cv_texts=payload.get("cv_texts"),
+        cv_text=payload.get("cv_text"), jd_texts=payload.get("jd_texts"),
+        top_k=payload.get("top_k", 3), ids=payload.get("ids"), progress=progress,
+    )
+
+
+# kind -> (handler, required payload fields)
+HANDLERS: Dict[str, Any] = {
+    "match": (_run_match, ("cv_text", "jd_text")),
+    "match_llm": (_run_match_llm, ("cv_text", "jd_text")),
+    "batch": (_run_batch, ()),
+}
+
+
+def job_items(kind: str, payload: Dict[str, Any]) -> int:
+    """Documents a job scores: the "many" side of a batch, else one pair."""
+    if kind == "batch":
+        return len(payload.get("cv_texts") or payload.get("jd_texts") or []) or 1
+    return 1
+
+
+class JobWorkerPool:
+    """
+    Background threads that drain the JobQueue through the synchronous
+    pipelines (each batch job still fans its LLM calls out over the provider's
+    concurrency limit).
+    """
+
+    def __init__(self, queue: Optional[JobQueue] = None, workers: int = JOBS_WORKERS,
+                 handlers: Optional[Dict[str, Any]] = None, poll_interval: float = 1.0):
+        self.queue = queue or get_queue()
+        self.workers = workers
+        self.handlers = handlers or HANDLERS
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Set[str] = set()       # job ids being run by this pool's threads
+        self._running_lock = threading.Lock()
+
+    def start(self) -> "JobWorkerPool":
+        if self._threads:
+            return self
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop claiming; jobs still running after `timeout` go back to the queue without using an attempt."""
+        self._stop.set()
+        self.queue.wake()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        with self._running_lock:
+            unfinished, self._running = list(self._running), set()
+        for job_id in unfinished:
+            self.queue.requeue(job_id)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            job = self.queue.claim(timeout=self.poll_interval)
+            if job is not None:
+                self.run_one(job)
+
+    def run_one(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        with self._running_lock:
+            self._running.add(job_id)
+        try:
+            self.queue.start(job_id)
+            handler = self.handlers[job["kind"]][0]
+            result = handler(job["payload"], lambda done, total: self.queue.progress(job_id, done, total))
+        except HTTPException as e:
+            self.queue.fail(job_id, e.detail)
+        except Exception as e:
+            self.queue.fail(job_id, f"{type(e).__name__}: {e}")
+        except BaseException as e:
+            # SystemExit, KeyboardInterrupt, ... from inside a handler: keep the worker thread alive
+            if self._stop.is_set():
+                self.queue.requeue(job_id)
+            else:
+                self.queue.fail(job_id, f"{type(e).__name__}: {e}")
+        else:
+            self.queue.finish(job_id, result)
+        finally:
+            with self._running_lock:
+                self._running.discard(job_id)
@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from ..config import (
+    TRANSFORMERS_MODEL, TRANSFORMERS_MAX_BATCH, TRANSFORMERS_MAX_WAIT_MS,
+    TRANSFORMERS_MAX_NEW_TOKENS
+)
+
+
+class ResidentGenerator:
+    """
+    Keeps a transformers causal LM loaded and serves prompts from a queue.
+    A single worker thread collects up to `max_batch_size` prompts (waiting at
+    most `max_wait_ms` after the first one) and runs one padded `generate`.
+    """
+
+    def __init__(self, model_name: str = TRANSFORMERS_MODEL, max_batch_size: int = TRANSFORMERS_MAX_BATCH,
+                 max_wait_ms: float = TRANSFORMERS_MAX_WAIT_MS, max_new_tokens: int = TRANSFORMERS_MAX_NEW_TOKENS):
+        self.model_name = model_name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_new_tokens = max_new_tokens
+        self.model = None
+        self.tokenizer = None
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.prompts = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._load()
+            self._thread = threading.Thread(target=self._worker, name="transformers-generator", daemon=True)
+            self._thread.start()
+
+    def _load(self):
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+        import torch
+        self.model = AutoModelForCausalLM.from_pretrained(
+            self.model_name,
+            device_map="auto",
+            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32
+        )
+        self.model.eval()
+        # decoder-only models must be left-padded for batched generation
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name, padding_side="left")
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+    def submit(self, prompt: str) -> Future:
+        self.start()
+        fut: Future = Future()
+        self._queue.put((prompt, fut))
+        return fut
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        return self.submit(prompt).result(timeout=timeout)
+
+    def _next_batch(self) -> List[Tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, remaining)) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            futs = [f for _, f in batch if f.set_running_or_notify_cancel()]
+            prompts = [p for p, f in batch if f in futs]
+            if not prompts:
+                continue
+            try:
+                outputs = self._generate_batch(prompts)
+            except Exception as e:
+                for f in futs:
+                    f.set_exception(e)
+                continue
+            self.batches += 1
+            self.prompts += len(prompts)
+            for f, text in zip(futs, outputs):
+                f.set_result(text)
+
+    def _generate_batch(self, prompts: List[str]) -> List[str]:
+        import torch
+        inp = self.tokenizer(prompts, return_tensors="pt", padding=True)
+        inp = {k: v.to(self.model.device) for k, v in inp.items()}
+        with torch.inference_mode():
+            out = self.model.generate(**inp, max_new_tokens=self.max_new_tokens, do_sample=False,
+                                      pad_token_id=self.tokenizer.pad_token_id)
+        # drop the (left-padded) prompt so the JSON extractor only sees the answer
+        new_tokens = out[:, inp["input_ids"].shape[1]:]
+        return self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+
+    def stats(self) -> Dict:
+        return {
+            "model": self.model_name,
+            "loaded": self.model is not None,
+            "batches": self.batches,
+            "prompts": self.prompts,
+            "avg_batch_size": round(self.prompts / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+
+_generator: Optional[ResidentGenerator] = None
+_generator_lock = threading.Lock()
+
+
+def get_generator() -> ResidentGenerator:
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = ResidentGenerator()
+    return _generator
@@ -1,14 +1,149 @@
-from typing import Dict, Any
+import asyncio
+import threading
+from collections import deque
+from typing import Deque, Dict, Any, Optional, Union
 from fastapi import HTTPException
 import requests
 from requests.adapters import HTTPAdapter, Retry
 
+from .local_generator import get_generator
+from .response_cache import get_response_cache, response_key
+from ..utils.json_sanitizer import extract_json
+from ..utils.metrics import LLM_CALLS
+from ..utils.timing import span
+
 from ..config import (
     LLM_PROVIDER, OPENAI_API_KEY, OPENAI_MODEL,
-    OLLAMA_BASE_URL, OLLAMA_MODEL, TRANSFORMERS_MODEL
+    OLLAMA_BASE_URL, OLLAMA_MODEL, TRANSFORMERS_MODEL,
+    LLM_POOL_SIZE, LLM_TIMEOUT, LLM_CONNECT_TIMEOUT, LLM_MAX_RETRIES,
+    LLM_MAX_CONCURRENCY, TRANSFORMERS_MAX_BATCH, LLM_CACHE_ENABLED, LLM_CONTEXT_TOKENS
 )
 
+# Sampling temperature per provider (part of the response-cache key)
+TEMPERATURE = {"openai": 0.2, "ollama": 0.1, "transformers": 0.0}
+
+def current_model(provider: str = LLM_PROVIDER) -> Optional[str]:
+    return {"openai": OPENAI_MODEL, "ollama": OLLAMA_MODEL, "transformers": TRANSFORMERS_MODEL}.get(provider)
+
+def _cache_key(prompt: str) -> str:
+    return response_key(LLM_PROVIDER, current_model() or "", TEMPERATURE.get(LLM_PROVIDER, 0.0), prompt)
+
+def _is_json(raw: str) -> bool:
+    # don't pin a broken answer in the cache; the next click should retry
+    try:
+        extract_json(raw)
+        return True
+    except Exception:
+        return False
+
+# Max in-flight calls per provider (LLM_MAX_CONCURRENCY overrides). Local
+# backends serialize anyway, so flooding them only adds queueing + timeouts.
+_DEFAULT_CONCURRENCY = {"openai": 8, "ollama": 2, "transformers": TRANSFORMERS_MAX_BATCH}
+
+def llm_concurrency(provider: str = LLM_PROVIDER) -> int:
+    return max(1, LLM_MAX_CONCURRENCY or _DEFAULT_CONCURRENCY.get(provider, 1))
+
+class ProviderLimit:
+    """
+    One cap on in-flight calls shared by threads (`with limit`) and by tasks on
+    any event loop (`async with limit`), so job workers, run_match threads and
+    async requests together never exceed it. Freed slots go to waiters in
+    arrival order; an async waiter is woken on its own loop.
+    """
+
+    def __init__(self, slots: int):
+        self._free = slots
+        self._lock = threading.Lock()
+        self._waiters: Deque[Union[threading.Event, tuple]] = deque()
+
+    def acquire(self):
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return
+            ready = threading.Event()
+            self._waiters.append(ready)
+        ready.wait()                # the releasing caller hands its slot over
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                handed_over = waiter not in self._waiters
+                if not handed_over:
+                    self._waiters.remove(waiter)
+            if handed_over:
+                self.release()      # the slot reached us as we were cancelled: pass it on
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, fut = waiter
+                try:
+                    loop.call_soon_threadsafe(_grant, fut)
+                    return
+                except RuntimeError:
+                    continue        # that loop is closed; try the next waiter
+            self._free += 1
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    async def __aenter__(self):
+        await self.aacquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+def _grant(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+    # else: cancelled before the slot arrived; aacquire's handler releases it again
+
+_limits: Dict[str, ProviderLimit] = {}
+_limits_lock = threading.Lock()
+
+def provider_limit(provider: str = LLM_PROVIDER) -> ProviderLimit:
+    with _limits_lock:
+        limit = _limits.get(provider)
+        if limit is None:
+            limit = _limits[provider] = ProviderLimit(llm_concurrency(provider))
+        return limit
+
 def call_llm(prompt: str) -> str:
+    if not LLM_CACHE_ENABLED:
+        return _call_uncached(prompt)
+    return get_response_cache().get_or_call(_cache_key(prompt), lambda: _call_uncached(prompt), _is_json)
+
+def _call_uncached(prompt: str) -> str:
+    with provider_limit(LLM_PROVIDER), span("llm_call", provider=LLM_PROVIDER):
+        try:
+            raw = _dispatch(prompt)
+        except HTTPException:
+            LLM_CALLS.inc(provider=LLM_PROVIDER, outcome="error")
+            raise
+    LLM_CALLS.inc(provider=LLM_PROVIDER, outcome="ok")
+    return raw
+
+def _dispatch(prompt: str) -> str:
     try:
         if LLM_PROVIDER == "openai":
             if not OPENAI_API_KEY:
@@ -25,68 +160,215 @@ def call_llm(prompt: str) -> str:
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"LLM provider '{LLM_PROVIDER}' failed: {type(e).__name__}: {e}")
 
-def _session_with_retries():
-    s = requests.Session()
-    retries = Retry(
-        total=2, backoff_factor=1.0,
-        status_forcelist=(429, 500, 502, 503, 504),
-        allowed_methods=frozenset(["POST","GET"])
-    )
-    s.mount("http://", HTTPAdapter(max_retries=retries))
-    s.mount("https://", HTTPAdapter(max_retries=retries))
-    return s
+async def acall_llm(prompt: str) -> str:
+    """Async twin of call_llm: awaits the provider instead of blocking a thread."""
+    if not LLM_CACHE_ENABLED:
+        return await _acall_uncached(prompt)
+    return await get_response_cache().aget_or_call(_cache_key(prompt), lambda: _acall_uncached(prompt), _is_json)
 
-def _call_ollama(prompt: str) -> str:
-    sess = _session_with_retries()
-    payload = {
+async def _acall_uncached(prompt: str) -> str:
+    async with provider_limit(LLM_PROVIDER):
+        with span("llm_call", provider=LLM_PROVIDER):
+            try:
+                raw = await _adispatch(prompt)
+            except HTTPException:
+                LLM_CALLS.inc(provider=LLM_PROVIDER, outcome="error")
+                raise
+    LLM_CALLS.inc(provider=LLM_PROVIDER, outcome="ok")
+    return raw
+
+async def _adispatch(prompt: str) -> str:
+    try:
+        if LLM_PROVIDER == "openai":
+            if not OPENAI_API_KEY:
+                raise HTTPException(status_code=400, detail="OPENAI_API_KEY not set but LLM_PROVIDER=openai.")
+            return await _acall_openai(prompt)
+        elif LLM_PROVIDER == "ollama":
+            return await _acall_ollama(prompt)
+        elif LLM_PROVIDER == "transformers":
+            return await asyncio.wrap_future(get_generator().submit(prompt))
+        else:
+            raise HTTPException(status_code=400, detail=f"Unsupported LLM_PROVIDER={LLM_PROVIDER}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"LLM provider '{LLM_PROVIDER}' failed: {type(e).__name__}: {e}")
+
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class ProviderClient:
+    """
+    Long-lived HTTP clients for the LLM backends. Created once per process so
+    every call reuses pooled keep-alive connections instead of a fresh
+    TCP/TLS handshake. Async clients own connections tied to one event loop,
+    so each running loop gets its own; those of closed loops are dropped.
+    """
+
+    def __init__(self, pool_size: int = LLM_POOL_SIZE, timeout: float = LLM_TIMEOUT,
+                 connect_timeout: float = LLM_CONNECT_TIMEOUT, max_retries: int = LLM_MAX_RETRIES,
+                 ollama_base_url: str = OLLAMA_BASE_URL):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.ollama_base_url = ollama_base_url.rstrip("/")
+        self.session = requests.Session()
+        retries = Retry(
+            total=max_retries, backoff_factor=1.0,
+            status_forcelist=_RETRY_STATUSES,
+            allowed_methods=frozenset(["POST","GET"])
+        )
+        # pool_block: beyond pool_size concurrent calls wait for a free connection
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=retries, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._openai = None
+        self._async: Dict[int, tuple] = {}     # id(loop) -> (loop, {"http" | "openai": client})
+        self._lock = threading.Lock()
+
+    def _httpx_kwargs(self) -> Dict[str, Any]:
+        import httpx
+        return {
+            "limits": httpx.Limits(max_connections=self.pool_size,
+                                   max_keepalive_connections=self.pool_size),
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout),
+        }
+
+    def openai(self):
+        if self._openai is None:
+            with self._lock:
+                if self._openai is None:
+                    import httpx
+                    from openai import OpenAI
+                    self._openai = OpenAI(api_key=OPENAI_API_KEY, max_retries=self.max_retries,
+                                          http_client=httpx.Client(**self._httpx_kwargs()))
+        return self._openai
+
+    def _loop_clients(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for key, (other, _) in list(self._async.items()):
+                if other.is_closed():
+                    del self._async[key]
+            entry = self._async.get(id(loop))
+            if entry is None or entry[0] is not loop:
+                entry = self._async[id(loop)] = (loop, {})
+            return entry[1]
+
+    def async_http(self):
+        # pooled keep-alive client for the async Ollama path, one per event loop
+        clients = self._loop_clients()
+        if "http" not in clients:
+            import httpx
+            clients["http"] = httpx.AsyncClient(**self._httpx_kwargs())
+        return clients["http"]
+
+    def async_openai(self):
+        clients = self._loop_clients()
+        if "openai" not in clients:
+            import httpx
+            from openai import AsyncOpenAI
+            clients["openai"] = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=self.max_retries,
+                                            http_client=httpx.AsyncClient(**self._httpx_kwargs()))
+        return clients["openai"]
+
+    def close(self):
+        self.session.close()
+        if self._openai is not None:
+            self._openai.close()
+
+    async def aclose(self):
+        """Close the async clients of the running loop (call before the loop ends)."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async.pop(id(loop), None)
+        clients = entry[1] if entry is not None and entry[0] is loop else {}
+        if "http" in clients:
+            await clients["http"].aclose()
+        if "openai" in clients:
+            await clients["openai"].close()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> ProviderClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ProviderClient()
+    return _client
+
+def _ollama_payload(prompt: str) -> Dict[str, Any]:
+    return {
         "model": OLLAMA_MODEL,
         "prompt": prompt,
         "stream": False,
         "format": "json",          # force JSON
         "keep_alive": "5m",
         "options": {
-            "temperature": 0.1,
-            "num_ctx": 8192       # if your model supports larger context
+            "temperature": TEMPERATURE["ollama"],
+            "num_ctx": LLM_CONTEXT_TOKENS   # prompts are packed to fit this
         }
     }
+
+def _call_ollama(prompt: str, client: Optional[ProviderClient] = None) -> str:
+    client = client or get_client()
+    payload = _ollama_payload(prompt)
     try:
-        r = sess.post(f"{OLLAMA_BASE_URL}/api/generate", json=payload, timeout=300)
+        r = client.session.post(f"{client.ollama_base_url}/api/generate", json=payload,
+                                timeout=(client.connect_timeout, client.timeout))
         r.raise_for_status()
         data = r.json()
         return data.get("response", "")
     except requests.exceptions.ReadTimeout as e:
-        raise HTTPException(status_code=502, detail=f"Ollama timed out after 300s. Try smaller batches or a smaller model.")
+        raise HTTPException(status_code=502, detail=f"Ollama timed out after {client.timeout:g}s. Try smaller batches or a smaller model.")
     except requests.exceptions.ConnectionError:
-        raise HTTPException(status_code=502, detail=f"Could not connect to Ollama at {OLLAMA_BASE_URL}. Is it running and is model '{OLLAMA_MODEL}' pulled?")
+        raise HTTPException(status_code=502, detail=f"Could not connect to Ollama at {client.ollama_base_url}. Is it running and is model '{OLLAMA_MODEL}' pulled?")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Ollama error: {e}")
+
+async def _acall_ollama(prompt: str, client: Optional[ProviderClient] = None) -> str:
+    import httpx
+    client = client or get_client()
+    http = client.async_http()
+    try:
+        for attempt in range(client.max_retries + 1):
+            r = await http.post(f"{client.ollama_base_url}/api/generate", json=_ollama_payload(prompt))
+            if r.status_code in _RETRY_STATUSES and attempt < client.max_retries:
+                await asyncio.sleep(1.0 * 2 ** attempt)
+                continue
+            r.raise_for_status()
+            return r.json().get("response", "")
+    except httpx.ReadTimeout:
+        raise HTTPException(status_code=502, detail=f"Ollama timed out after {client.timeout:g}s. Try smaller batches or a smaller model.")
+    except httpx.ConnectError:
+        raise HTTPException(status_code=502, detail=f"Could not connect to Ollama at {client.ollama_base_url}. Is it running and is model '{OLLAMA_MODEL}' pulled?")
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Ollama error: {e}")
 
-def _call_openai(prompt: str) -> str:
-    from openai import OpenAI
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    resp = client.chat.completions.create(
+def _openai_request(prompt: str) -> Dict[str, Any]:
+    return dict(
         model=OPENAI_MODEL,
         messages=[
             {"role":"system","content":"You are a precise evaluator. Return STRICT JSON only."},
             {"role":"user","content":prompt}
         ],
         response_format={"type":"json_object"},
-        temperature=0.2,
+        temperature=TEMPERATURE["openai"],
     )
+
+def _call_openai(prompt: str, client: Optional[ProviderClient] = None) -> str:
+    client = client or get_client()
+    resp = client.openai().chat.completions.create(**_openai_request(prompt))
+    return resp.choices[0].message.content
+
+async def _acall_openai(prompt: str, client: Optional[ProviderClient] = None) -> str:
+    client = client or get_client()
+    resp = await client.async_openai().chat.completions.create(**_openai_request(prompt))
     return resp.choices[0].message.content
 
 def _call_transformers(prompt: str) -> str:
-    from transformers import AutoModelForCausalLM, AutoTokenizer
-    import torch
-    model = AutoModelForCausalLM.from_pretrained(
-        TRANSFORMERS_MODEL,
-        device_map="auto",
-        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32
-    )
-    tok = AutoTokenizer.from_pretrained(TRANSFORMERS_MODEL)
-    inp = tok(prompt, return_tensors="pt")
-    if torch.cuda.is_available():
-        inp = {k:v.cuda() for k,v in inp.items()}
-    out = model.generate(**inp, max_new_tokens=600, do_sample=False)
-    text = tok.decode(out[0], skip_special_tokens=True)
-    return text
+    # model stays resident; concurrent prompts are batched by the generator
+    return get_generator().generate(prompt)
@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from ..config import LLM_CACHE_SIZE, LLM_CACHE_TTL, LLM_CACHE_DB
+from ..rag.embedding_cache import normalize_text
+
+# (response text, seconds the LLM call took)
+Entry = Tuple[str, float]
+
+
+def response_key(provider: str, model: str, temperature: float, prompt: str) -> str:
+    prompt_hash = hashlib.sha256(normalize_text(prompt).encode("utf-8")).hexdigest()
+    return f"{provider}|{model}|{temperature:g}|{prompt_hash}"
+
+
+class ResponseCache:
+    """
+    LLM response cache: in-memory LRU with TTL, optional SQLite tier, and
+    stampede protection -- concurrent identical prompts wait on the one call
+    already in flight instead of issuing their own. In-flight calls are
+    thread-safe futures, so sync callers, and async callers on any event
+    loop, share the same call.
+    """
+
+    def __init__(self, max_items: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL,
+                 db_path: Optional[str] = LLM_CACHE_DB):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._lru: "OrderedDict[str, Tuple[float, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT, llm_seconds REAL, expires_at REAL)"
+            )
+            self._db.commit()
+        self.hits = 0
+        self.disk_hits = 0
+        self.shared = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def get(self, key: str) -> Optional[Entry]:
+        now = time.time()
+        with self._lock:
+            item = self._lru.get(key)
+            if item is not None and item[0] > now:
+                self._lru.move_to_end(key)
+                return item[1], item[2]
+            if item is not None:
+                del self._lru[key]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, llm_seconds, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[2] > now:
+                    self._remember(key, row[0], row[1], row[2])
+                    self.disk_hits += 1
+                    return row[0], row[1]
+        return None
+
+    def put(self, key: str, response: str, llm_seconds: float):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, response, llm_seconds, expires_at)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)",
+                                 (key, response, llm_seconds, expires_at))
+                self._db.commit()
+
+    def _remember(self, key: str, response: str, llm_seconds: float, expires_at: float):
+        self._lru[key] = (expires_at, response, llm_seconds)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def _hit(self, entry: Entry, shared: bool = False) -> str:
+        with self._lock:
+            self.hits += 1
+            self.shared += shared
+            self.seconds_saved += entry[1]
+        return entry[0]
+
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        """The in-flight future for `key`, and whether this caller just became its owner."""
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut, False
+            fut = self._inflight[key] = Future()
+            return fut, True
+
+    def _release(self, key: str, fut: Future, entry: Optional[Entry] = None, error: Optional[Exception] = None):
+        """
+        Publish the owner's outcome. With neither entry nor error the owner was
+        cancelled: waiters get None and retry, so one of them takes over the
+        call instead of inheriting a cancellation that was not theirs.
+        """
+        with self._lock:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(entry)
+
+    def _owned(self, key: str, fut: Future) -> Optional[str]:
+        # the call may have finished (and been cached) between our get() and _claim()
+        entry = self.get(key)
+        if entry is not None:
+            self._release(key, fut, entry)
+            return self._hit(entry)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _finish(self, key: str, fut: Future, response: str, t0: float,
+                cacheable: Callable[[str], bool]) -> str:
+        entry = (response, time.perf_counter() - t0)
+        if cacheable(response):
+            self.put(key, *entry)
+        self._release(key, fut, entry)
+        return response
+
+    def get_or_call(self, key: str, fn: Callable[[], str], cacheable: Callable[[str], bool] = lambda r: True) -> str:
+        while True:
+            entry = self.get(key)
+            if entry is not None:
+                return self._hit(entry)
+            fut, owner = self._claim(key)
+            if owner:
+                break
+            entry = fut.result()
+            if entry is not None:
+                return self._hit(entry, shared=True)
+        hit = self._owned(key, fut)
+        if hit is not None:
+            return hit
+        try:
+            t0 = time.perf_counter()
+            response = fn()
+        except Exception as e:
+            self._release(key, fut, error=e)
+            raise
+        except BaseException:
+            self._release(key, fut)
+            raise
+        return self._finish(key, fut, response, t0, cacheable)
+
+    async def aget_or_call(self, key: str, fn: Callable[[], Awaitable[str]],
+                           cacheable: Callable[[str], bool] = lambda r: True) -> str:
+        while True:
+            entry = self.get(key)
+            if entry is not None:
+                return self._hit(entry)
+            fut, owner = self._claim(key)
+            if owner:
+                break
+            # shield: a cancelled waiter must not cancel the owner's future
+            entry = await asyncio.shield(asyncio.wrap_future(fut))
+            if entry is not None:
+                return self._hit(entry, shared=True)
+        hit = self._owned(key, fut)
+        if hit is not None:
+            return hit
+        try:
+            t0 = time.perf_counter()
+            response = await fn()
+        except Exception as e:
+            self._release(key, fut, error=e)
+            raise
+        except BaseException:       # cancelled (client gone, stage budget): hand the call to a waiter
+            self._release(key, fut)
+            raise
+        return self._finish(key, fut, response, t0, cacheable)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "shared_inflight": self.shared,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "llm_seconds_saved": round(self.seconds_saved, 3),
+            "memory_items": len(self._lru),
+        }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,64 @@
+import math
+import re
+import threading
+from typing import Callable, Optional
+
+from ..config import LLM_PROVIDER, OPENAI_MODEL, TRANSFORMERS_MODEL
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local estimate for BPE-style tokenizers: one token per punctuation
+    mark, roughly one per 4 characters of each word. Errs slightly high.
+    """
+    return sum(1 if not p[0].isalnum() else math.ceil(len(p) / 4) for p in _PIECE_RE.findall(text))
+
+
+_counter: Optional[Callable[[str], int]] = None
+_counter_lock = threading.Lock()
+
+
+def _model_counter(provider: str) -> Optional[Callable[[str], int]]:
+    try:
+        if provider == "openai":
+            import tiktoken
+            try:
+                enc = tiktoken.encoding_for_model(OPENAI_MODEL)
+            except KeyError:
+                enc = tiktoken.get_encoding("o200k_base")
+            return lambda text: len(enc.encode(text, disallowed_special=()))
+        if provider == "transformers":
+            from transformers import AutoTokenizer
+            tok = AutoTokenizer.from_pretrained(TRANSFORMERS_MODEL)
+            return lambda text: len(tok(text, add_special_tokens=False)["input_ids"])
+    except Exception:
+        pass
+    # ollama (and anything without a local tokenizer) uses the estimator
+    return None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens under the target model's tokenizer when available, else estimated."""
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                _counter = _model_counter(LLM_PROVIDER) or estimate_tokens
+    return _counter(text)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    # cut on word boundaries by estimate, then re-check against the real counter
+    pieces = text.split()
+    lo, hi = 0, len(pieces)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(" ".join(pieces[:mid]) + "…") <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(pieces[:lo]) + "…"
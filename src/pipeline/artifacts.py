@@ -0,0 +1,203 @@
+"""
+Precomputed CV / JD artifacts: parse and embed a document once, store it,
+and score later by id without re-running chunking, extraction or the
+embedding model.
+
+One compressed .npz per document under ARTIFACT_DIR: `emb` (float32 vectors
+of the scoring items) and `meta` (UTF-8 JSON: items, bullets, terms, model).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from ..config import ARTIFACT_DIR, ARTIFACT_CACHE_SIZE, EMBEDDING_MODEL
+from ..ingest.document import parse_document
+from ..rag.embedder import Embedder
+from ..utils.timing import span, traced
+from ..utils.token_index import TokenIndex
+from .fast_scoring import score_pair
+from .llm_only import arun_match_llm_bullets
+from .match_pipeline import (
+    Prepared, _prepare_cv, _prepare_requirements, ascore_prepared, retrieve_from_embeddings
+)
+
+KINDS = ("cv", "jd")
+DOC_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,128}$")
+
+
+def _check_doc_id(doc_id: str) -> str:
+    if not DOC_ID_RE.match(doc_id):
+        raise HTTPException(status_code=400, detail="doc_id may only contain letters, digits, '_', '-' and '.'.")
+    return doc_id
+
+
+class Artifact:
+    """
+    Everything scoring needs from one document. `items` are what gets
+    embedded: CV chunks or JD requirements (already capped). `bullets` feed
+    the llm_only pipeline; `terms` rebuild the CV's TokenIndex.
+    """
+
+    def __init__(self, doc_id: str, kind: str, sha1: str, items: List[str], bullets: List[str],
+                 terms: List[str], emb: np.ndarray, model: str):
+        self.doc_id = doc_id
+        self.kind = kind
+        self.sha1 = sha1
+        self.items = items
+        self.bullets = bullets
+        self.terms = terms
+        self.emb = emb
+        self.model = model
+
+    def token_index(self) -> TokenIndex:
+        return TokenIndex.from_terms(self.terms, "\n".join(self.items))
+
+    def info(self) -> Dict[str, Any]:
+        return {"doc_id": self.doc_id, "kind": self.kind, "sha1": self.sha1, "items": len(self.items),
+                "bullets": len(self.bullets), "terms": len(self.terms), "dim": int(self.emb.shape[1]),
+                "model": self.model}
+
+
+def build_artifact(kind: str, text: str, doc_id: Optional[str] = None,
+                   embedder: Optional[Embedder] = None) -> Artifact:
+    """Parse + embed one document (raises the same 400s as the pipelines for empty input)."""
+    if kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {KINDS}.")
+    if doc_id is not None:
+        _check_doc_id(doc_id)    # before the embedding work, not at put()
+    embedder = embedder or Embedder()
+    sha1 = hashlib.sha1(f"{kind}\n{text}".encode("utf-8")).hexdigest()
+    doc = parse_document(text)
+    items = _prepare_cv(text) if kind == "cv" else _prepare_requirements(text)
+    with span("embed"):
+        emb = np.ascontiguousarray(embedder.encode(items), dtype="float32")
+    terms = sorted(TokenIndex(items).terms)
+    return Artifact(doc_id or sha1[:16], kind, sha1, items, list(doc.bullets_or_sentences), terms, emb,
+                    getattr(embedder, "model_name", EMBEDDING_MODEL))
+
+
+class ArtifactStore:
+    """Artifacts on disk, with the most recently used ones kept in memory."""
+
+    def __init__(self, root: Optional[str] = ARTIFACT_DIR, max_items: int = ARTIFACT_CACHE_SIZE):
+        self.root = root
+        self.max_items = max_items
+        self._lru: "OrderedDict[str, Artifact]" = OrderedDict()
+        self._lock = threading.Lock()
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def _path(self, doc_id: str) -> str:
+        return os.path.join(self.root, _check_doc_id(doc_id) + ".npz")
+
+    def _remember(self, art: Artifact):
+        self._lru[art.doc_id] = art
+        self._lru.move_to_end(art.doc_id)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def put(self, art: Artifact) -> Artifact:
+        if self.root:
+            path = self._path(art.doc_id)
+            meta = {"doc_id": art.doc_id, "kind": art.kind, "sha1": art.sha1, "items": art.items,
+                    "bullets": art.bullets, "terms": art.terms, "model": art.model}
+            tmp = path + ".tmp.npz"
+            np.savez_compressed(tmp, emb=art.emb,
+                                meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8))
+            os.replace(tmp, path)
+        with self._lock:
+            self._remember(art)
+        return art
+
+    def get(self, doc_id: str) -> Optional[Artifact]:
+        with self._lock:
+            art = self._lru.get(doc_id)
+            if art is not None:
+                self._lru.move_to_end(doc_id)
+                return art
+        if not self.root or not os.path.exists(self._path(doc_id)):
+            return None
+        with np.load(self._path(doc_id)) as z:
+            meta = json.loads(z["meta"].tobytes().decode("utf-8"))
+            art = Artifact(meta["doc_id"], meta["kind"], meta["sha1"], meta["items"], meta["bullets"],
+                           meta["terms"], z["emb"], meta["model"])
+        with self._lock:
+            self._remember(art)
+        return art
+
+    def delete(self, doc_id: str) -> bool:
+        with self._lock:
+            found = self._lru.pop(doc_id, None) is not None
+        if self.root and os.path.exists(self._path(doc_id)):
+            os.remove(self._path(doc_id))
+            found = True
+        return found
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore()
+    return _store
+
+
+def resolve(kind: str, doc_id: Optional[str], text: Optional[str]) -> Artifact:
+    """
+    A stored artifact by id, or a throwaway one built from text. Stored
+    artifacts embedded with another model are re-embedded into a new
+    artifact; the cached one other requests hold is never modified.
+    """
+    store = get_artifact_store()
+    if doc_id:
+        art = store.get(doc_id)
+        if art is None:
+            raise HTTPException(status_code=404, detail=f"Unknown {kind} document id: {doc_id}")
+        if art.kind != kind:
+            raise HTTPException(status_code=400, detail=f"Document {doc_id} is a {art.kind}, not a {kind}.")
+        if art.model != EMBEDDING_MODEL:
+            embedder = Embedder()
+            emb = np.ascontiguousarray(embedder.encode(art.items), dtype="float32")
+            art = store.put(Artifact(art.doc_id, art.kind, art.sha1, art.items, art.bullets, art.terms,
+                                     emb, embedder.model_name))
+        return art
+    return build_artifact(kind, text or "")
+
+
+def resolve_pair(cv_id: Optional[str], jd_id: Optional[str],
+                 cv_text: Optional[str] = None, jd_text: Optional[str] = None) -> Tuple[Artifact, Artifact]:
+    return resolve("cv", cv_id, cv_text), resolve("jd", jd_id, jd_text)
+
+
+def prepare_artifacts(cv: Artifact, jd: Artifact, top_k: int = 2) -> Prepared:
+    """Retrieval straight from stored vectors: no parsing, chunking or model call."""
+    return cv.items, jd.items, retrieve_from_embeddings(cv.items, cv.emb, jd.items, jd.emb, top_k)
+
+
+async def aprepare_artifacts(cv: Artifact, jd: Artifact, top_k: int = 2) -> Prepared:
+    return await asyncio.get_running_loop().run_in_executor(None, traced(prepare_artifacts), cv, jd, top_k)
+
+
+async def arun_match_artifacts(cv: Artifact, jd: Artifact, top_k: int = 2) -> Dict:
+    return await ascore_prepared(await aprepare_artifacts(cv, jd, top_k), cv.token_index())
+
+
+async def arun_match_llm_artifacts(cv: Artifact, jd: Artifact) -> Dict:
+    return await arun_match_llm_bullets(cv.bullets, jd.bullets)
+
+
+def run_match_fast_artifacts(cv: Artifact, jd: Artifact) -> Dict:
+    return score_pair(cv.items, cv.emb, jd.items, jd.emb, index=cv.token_index())
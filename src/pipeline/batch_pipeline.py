@@ -0,0 +1,150 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from ..rag.embedder import Embedder
+from ..llm.provider import call_llm, acall_llm, llm_concurrency
+from .match_pipeline import (
+    Evidence, _prepare_cv, _prepare_requirements, _plan_calls, _parse_batch,
+    _merge_batch_results, _augment_missing, retrieve_evidence, store_from_embeddings
+)
+
+MAX_BATCH_DOCS = 200            # documents on the "many" side of one request
+
+# (cv_chunks, requirements, retrieved evidence) for one CV/JD pair
+Pair = Tuple[List[str], List[str], Evidence]
+
+
+def _split_rows(emb: np.ndarray, sizes: List[int]) -> List[np.ndarray]:
+    return np.split(emb, np.cumsum(sizes)[:-1]) if sizes else []
+
+
+def _prepare_pairs(embedder: Embedder, jd_text: Optional[str], cv_texts: Optional[List[str]],
+                   cv_text: Optional[str], jd_texts: Optional[List[str]],
+                   ids: Optional[List[str]] = None, top_k: int = 2) -> Tuple[str, List[Pair]]:
+    """Parse and embed the shared side once and the "many" side in one encode call."""
+    if jd_text is not None and cv_texts and cv_text is None and not jd_texts:
+        mode = "jd_vs_cvs"
+        many = cv_texts
+    elif cv_text is not None and jd_texts and jd_text is None and not cv_texts:
+        mode = "cv_vs_jds"
+        many = jd_texts
+    else:
+        raise HTTPException(status_code=400, detail="Provide either jd_text + cv_texts or cv_text + jd_texts.")
+    if len(many) > MAX_BATCH_DOCS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_DOCS} documents per batch request.")
+    if ids is not None and len(ids) != len(many):
+        raise HTTPException(status_code=400, detail="ids must have one entry per document.")
+
+    if mode == "jd_vs_cvs":
+        requirements = _prepare_requirements(jd_text)
+        chunks_per_cv = [_prepare_cv(t) for t in cv_texts]
+        emb = embedder.encode(requirements + [c for chunks in chunks_per_cv for c in chunks])
+        req_emb, chunk_emb = emb[:len(requirements)], emb[len(requirements):]
+        pairs = [
+            (chunks, requirements,
+             retrieve_evidence(requirements, store_from_embeddings(chunks, e), embedder, k=top_k, req_emb=req_emb))
+            for chunks, e in zip(chunks_per_cv, _split_rows(chunk_emb, [len(c) for c in chunks_per_cv]))
+        ]
+    else:
+        cv_chunks = _prepare_cv(cv_text)
+        reqs_per_jd = [_prepare_requirements(t) for t in jd_texts]
+        emb = embedder.encode(cv_chunks + [r for reqs in reqs_per_jd for r in reqs])
+        store = store_from_embeddings(cv_chunks, emb[:len(cv_chunks)])
+        pairs = [
+            (cv_chunks, reqs, retrieve_evidence(reqs, store, embedder, k=top_k, req_emb=e))
+            for reqs, e in zip(reqs_per_jd, _split_rows(emb[len(cv_chunks):], [len(r) for r in reqs_per_jd]))
+        ]
+    return mode, pairs
+
+
+def _jobs(pairs: List[Pair]) -> Tuple[List[Tuple[int, str, int]], List[Dict]]:
+    """One (pair index, prompt, requirements in it) job per packed LLM call, plus prompt stats per pair."""
+    jobs, stats = [], []
+    for p, (_, _, evidence) in enumerate(pairs):
+        batches, prompts, pair_stats = _plan_calls(evidence)
+        jobs.extend((p, prompt, len(batch)) for batch, prompt in zip(batches, prompts))
+        stats.append(pair_stats)
+    return jobs, stats
+
+
+def _assemble(mode: str, pairs: List[Pair], jobs, stats, outcomes, ids: Optional[List[str]]) -> Dict:
+    per_pair: List[List] = [[] for _ in pairs]
+    sizes: List[List[int]] = [[] for _ in pairs]
+    for (p, _, n), outcome in zip(jobs, outcomes):
+        per_pair[p].append(outcome)
+        sizes[p].append(n)
+
+    results = []
+    for p, (cv_chunks, requirements, _) in enumerate(pairs):
+        item = {"index": p, "id": ids[p] if ids else str(p)}
+        errors = [o for o in per_pair[p] if isinstance(o, HTTPException)]
+        if errors:
+            # one bad pair (e.g. invalid LLM JSON) shouldn't sink the whole ranking
+            item["error"] = errors[0].detail
+        else:
+            item["result"] = _augment_missing(_merge_batch_results(per_pair[p], sizes[p]), requirements, cv_chunks)
+            item["result"]["prompt_stats"] = stats[p]
+        results.append(item)
+
+    ranked = sorted((r for r in results if "result" in r),
+                    key=lambda r: (-r["result"]["overall_score"], r["index"]))
+    return {
+        "mode": mode,
+        "results": results,
+        "ranking": [{"rank": i + 1, "index": r["index"], "id": r["id"],
+                     "overall_score": r["result"]["overall_score"]} for i, r in enumerate(ranked)],
+    }
+
+
+def run_match_batch(jd_text: Optional[str] = None, cv_texts: Optional[List[str]] = None,
+                    cv_text: Optional[str] = None, jd_texts: Optional[List[str]] = None,
+                    top_k: int = 2, ids: Optional[List[str]] = None,
+                    progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    Score one JD against many CVs (or one CV against many JDs) and rank them.
+    `progress(done, total)` is called as each LLM call finishes.
+    """
+    embedder = Embedder()
+    mode, pairs = _prepare_pairs(embedder, jd_text, cv_texts, cv_text, jd_texts, ids, top_k)
+    jobs, stats = _jobs(pairs)
+
+    def run(job):
+        try:
+            return _parse_batch(call_llm(job[1]))
+        except HTTPException as e:
+            return e
+
+    outcomes: List = [None] * len(jobs)
+    if progress:
+        progress(0, len(jobs))
+    with ThreadPoolExecutor(max_workers=max(1, min(len(jobs), llm_concurrency()))) as ex:
+        futures = {ex.submit(run, job): i for i, job in enumerate(jobs)}
+        for done, fut in enumerate(as_completed(futures), 1):
+            outcomes[futures[fut]] = fut.result()
+            if progress:
+                progress(done, len(jobs))
+    return _assemble(mode, pairs, jobs, stats, outcomes, ids)
+
+
+async def arun_match_batch(jd_text: Optional[str] = None, cv_texts: Optional[List[str]] = None,
+                           cv_text: Optional[str] = None, jd_texts: Optional[List[str]] = None,
+                           top_k: int = 2, ids: Optional[List[str]] = None) -> Dict:
+    def prepare():
+        # Embedder() may load the model and _jobs() packs prompts: both stay off the event loop
+        mode, pairs = _prepare_pairs(Embedder(), jd_text, cv_texts, cv_text, jd_texts, ids, top_k)
+        return (mode, pairs, *_jobs(pairs))
+
+    mode, pairs, jobs, stats = await asyncio.get_running_loop().run_in_executor(None, prepare)
+
+    async def run(job):
+        try:
+            return _parse_batch(await acall_llm(job[1]))
+        except HTTPException as e:
+            return e
+
+    outcomes = await asyncio.gather(*(run(j) for j in jobs))
+    return _assemble(mode, pairs, jobs, stats, outcomes, ids)
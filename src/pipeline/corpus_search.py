@@ -0,0 +1,90 @@
+import threading
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+from ..config import CORPUS_INDEX_DIR, CORPUS_IVF_MIN_CHUNKS, CORPUS_SAVE_DELAY_S
+from ..rag.embedder import Embedder
+from ..rag.corpus_index import get_corpus_index
+from .match_pipeline import _prepare_cv, _prepare_requirements
+
+_save_timer: Optional[threading.Timer] = None
+_save_lock = threading.Lock()
+
+
+def flush_corpus() -> Dict:
+    """Write pending corpus edits to CORPUS_INDEX_DIR now (POST /corpus/snapshot, and at shutdown)."""
+    global _save_timer
+    with _save_lock:
+        if _save_timer is not None:
+            _save_timer.cancel()
+            _save_timer = None
+    corpus = get_corpus_index()
+    saved = corpus is not None and corpus.dirty
+    if saved:
+        if CORPUS_IVF_MIN_CHUNKS and corpus.is_flat() and corpus.index.ntotal >= CORPUS_IVF_MIN_CHUNKS:
+            # off the request path: the save timer (or shutdown) pays for the IVF training
+            corpus.rebuild("ivf_flat")
+        corpus.save(CORPUS_INDEX_DIR)
+    return {"saved": saved, **(corpus.stats() if corpus is not None else {})}
+
+
+def rebuild_corpus(index_type: str = "ivf_flat", nprobe: Optional[int] = None) -> Dict:
+    """Re-train the corpus index (POST /corpus/rebuild), e.g. to re-size IVF after the pool has grown."""
+    corpus = get_corpus_index()
+    if corpus is None or not len(corpus):
+        raise HTTPException(status_code=404, detail="Candidate corpus is empty.")
+    try:
+        corpus.rebuild(index_type, nprobe=nprobe)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**flush_corpus(), "index_type": index_type}
+
+
+def _schedule_save():
+    """
+    Debounce saves: the first write after a save starts a CORPUS_SAVE_DELAY_S
+    timer and every write inside that window rides on the same save, so bulk
+    loading N CVs rewrites the index about once per window instead of N times.
+    """
+    global _save_timer
+    if CORPUS_SAVE_DELAY_S <= 0:
+        flush_corpus()
+        return
+    with _save_lock:
+        if _save_timer is None:
+            _save_timer = threading.Timer(CORPUS_SAVE_DELAY_S, flush_corpus)
+            _save_timer.daemon = True
+            _save_timer.start()
+
+
+def index_cv(doc_id: str, cv_text: str, metadata: Optional[Dict[str, Any]] = None) -> Dict:
+    """Add (or replace) a candidate in the persistent corpus index."""
+    chunks = _prepare_cv(cv_text)
+    emb = Embedder().encode(chunks)
+    corpus = get_corpus_index(dim=emb.shape[1])
+    corpus.add_document(doc_id, chunks, emb, metadata)
+    _schedule_save()
+    return {"doc_id": doc_id, "chunks": len(chunks), **corpus.stats()}
+
+
+def remove_cv(doc_id: str) -> Dict:
+    corpus = get_corpus_index()
+    if corpus is None or not corpus.delete_document(doc_id):
+        raise HTTPException(status_code=404, detail=f"Unknown candidate '{doc_id}'.")
+    _schedule_save()
+    return {"deleted": doc_id, **corpus.stats()}
+
+
+def search_corpus(jd_text: str, top_n: int = 20, k_per_req: int = 50) -> Dict:
+    """Search all JD requirements across the whole candidate pool in one batched query."""
+    corpus = get_corpus_index()
+    if corpus is None or not len(corpus):
+        raise HTTPException(status_code=404, detail="Candidate corpus is empty.")
+    requirements = _prepare_requirements(jd_text)
+    req_emb = Embedder().encode(requirements)
+    candidates = corpus.search_candidates(req_emb, k_per_req=k_per_req, top_n=top_n)
+    for c in candidates:
+        for ev in c["evidence"]:
+            ev["requirement"] = requirements[ev["requirement_index"]]
+    return {"requirements": len(requirements), "candidates": candidates, **corpus.stats()}
@@ -0,0 +1,175 @@
+"""
+Embedding-only scoring for first-pass screening: no LLM call.
+
+Each requirement's coverage is its best cosine similarity against the CV
+chunks (one requirement-by-chunk matmul), mapped through calibrated
+thresholds: below `low` the requirement is missing, above `high` it is
+fully covered, linear in between; `match` marks a good match. The result
+has the same keys as the LLM pipeline's merged output.
+
+Calibrate against the LLM pipeline on a sample of pairs (labels = the
+requirements it did not list as missing):
+
+    python -m src.pipeline.fast_scoring pairs.jsonl --out .cache/fast_thresholds.json
+"""
+import argparse
+import json
+import os
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import FAST_SIM_LOW, FAST_SIM_MATCH, FAST_SIM_HIGH, FAST_THRESHOLDS_FILE
+from ..rag.embedder import Embedder
+from ..utils.timing import span
+from ..utils.token_index import TokenIndex
+from .match_pipeline import _augment_missing, _prepare_inputs, run_match
+
+Thresholds = Dict[str, float]
+
+DEFAULT_THRESHOLDS: Thresholds = {"low": FAST_SIM_LOW, "match": FAST_SIM_MATCH, "high": FAST_SIM_HIGH}
+
+EXPERIENCE_RE = re.compile(r"\byears?\b|\bexperience\b|\bproven\b|\btrack record\b", re.I)
+SOFT_RE = re.compile(r"communicat|collaborat|team|leadership|mentor|stakeholder|ownership|problem.solving", re.I)
+
+
+def load_thresholds(path: Optional[str] = FAST_THRESHOLDS_FILE) -> Thresholds:
+    """Calibrated thresholds from `path` if it exists, else the configured defaults."""
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return {**DEFAULT_THRESHOLDS, **json.load(f)}
+    return dict(DEFAULT_THRESHOLDS)
+
+
+_thresholds: Optional[Thresholds] = None
+
+
+def current_thresholds() -> Thresholds:
+    global _thresholds
+    if _thresholds is None:
+        _thresholds = load_thresholds()
+    return _thresholds
+
+
+def coverage(best_sim: np.ndarray, thresholds: Thresholds) -> np.ndarray:
+    low, high = thresholds["low"], thresholds["high"]
+    return np.clip((best_sim - low) / max(high - low, 1e-6), 0.0, 1.0)
+
+
+def _section(requirement: str) -> str:
+    if SOFT_RE.search(requirement):
+        return "soft_skills"
+    if EXPERIENCE_RE.search(requirement):
+        return "experience"
+    return "hard_skills"
+
+
+def score_embeddings(requirements: List[str], req_emb: np.ndarray, cv_chunks: List[str], cv_emb: np.ndarray,
+                     thresholds: Optional[Thresholds] = None) -> Dict:
+    """Score one pair from normalized embeddings; output keys match _merge_batch_results plus `coverage`."""
+    thresholds = thresholds or current_thresholds()
+    sim = req_emb @ cv_emb.T                       # (requirements, chunks) cosine similarities
+    best_idx = sim.argmax(axis=1)
+    best = sim[np.arange(len(requirements)), best_idx]
+    cov = coverage(best, thresholds)
+
+    overall = int(round(100 * float(cov.mean()))) if len(cov) else 0
+    sections: Dict[str, List[float]] = {"hard_skills": [], "experience": [], "soft_skills": []}
+    for r, c in zip(requirements, cov.tolist()):
+        sections[_section(r)].append(c)
+
+    per_req = [
+        {"requirement": r, "similarity": round(float(s), 4), "coverage": round(float(c), 4),
+         "evidence": cv_chunks[int(i)]}
+        for r, s, c, i in zip(requirements, best.tolist(), cov.tolist(), best_idx.tolist())
+    ]
+    missing = [p["requirement"] for p in per_req if p["similarity"] < thresholds["low"]]
+    return {
+        "overall_score": overall,
+        # a section with no requirements of its kind takes the overall score
+        "section_scores": {k: int(round(100 * sum(v) / len(v))) if v else overall for k, v in sections.items()},
+        "good_matches": [
+            {"requirement": p["requirement"], "evidence": p["evidence"],
+             "reason": f"semantic similarity {p['similarity']:.2f}"}
+            for p in per_req if p["similarity"] >= thresholds["match"]
+        ],
+        "missing_requirements": missing,
+        "missing_skills": [],
+        "improvement_suggestions": [f"Add concrete evidence for: {r}" for r in missing[:5]],
+        "coverage": per_req,
+    }
+
+
+def run_match_fast(cv_text: str, jd_text: str, embedder: Optional[Embedder] = None,
+                   thresholds: Optional[Thresholds] = None) -> Dict:
+    cv_chunks, requirements = _prepare_inputs(cv_text, jd_text)
+    embedder = embedder or Embedder()
+    with span("embed"):
+        emb = embedder.encode(cv_chunks + requirements)
+    return score_pair(cv_chunks, emb[:len(cv_chunks)], requirements, emb[len(cv_chunks):], thresholds)
+
+
+def score_pair(cv_chunks: List[str], cv_emb: np.ndarray, requirements: List[str], req_emb: np.ndarray,
+               thresholds: Optional[Thresholds] = None, index: Optional[TokenIndex] = None) -> Dict:
+    """Fast-mode result from precomputed embeddings (and the CV's TokenIndex, if already built)."""
+    with span("fast_score"):
+        out = score_embeddings(requirements, req_emb, cv_chunks, cv_emb, thresholds)
+    with span("merge"):
+        out = _augment_missing(out, requirements, cv_chunks, index)
+    out["mode"] = "fast"
+    out["prompt_stats"] = {"llm_calls": 0}
+    return out
+
+
+def calibrate(similarities: Iterable[float], covered: Iterable[bool]) -> Thresholds:
+    """
+    Fit thresholds to labelled requirement similarities: `match` maximizes
+    Youden's J (TPR - FPR); `low` is the 5th percentile of covered
+    requirements and `high` the 95th percentile of uncovered ones.
+    """
+    s = np.asarray(list(similarities), dtype="float32")
+    y = np.asarray(list(covered), dtype=bool)
+    if not y.any() or y.all():
+        raise ValueError("Calibration needs both covered and uncovered requirements.")
+    pos, neg = s[y], s[~y]
+    candidates = np.unique(s)
+    j = [(pos >= t).mean() - (neg >= t).mean() for t in candidates]
+    match = float(candidates[int(np.argmax(j))])
+    low = min(float(np.percentile(pos, 5)), match)
+    high = max(float(np.percentile(neg, 95)), match)
+    return {"low": round(low, 4), "match": round(match, 4), "high": round(high, 4)}
+
+
+def label_with_llm(pairs: List[Tuple[str, str]], scorer: Optional[Callable[[str, str], Dict]] = None,
+                   embedder: Optional[Embedder] = None) -> Tuple[List[float], List[bool]]:
+    """Best-chunk similarity per requirement, labelled covered unless the LLM pipeline lists it as missing."""
+    scorer = scorer or run_match
+    embedder = embedder or Embedder()
+    sims, labels = [], []
+    for cv_text, jd_text in pairs:
+        fast = run_match_fast(cv_text, jd_text, embedder, thresholds=DEFAULT_THRESHOLDS)
+        missing = {m.strip().lower() for m in scorer(cv_text, jd_text).get("missing_requirements", [])}
+        for p in fast["coverage"]:
+            sims.append(p["similarity"])
+            labels.append(p["requirement"].strip().lower() not in missing)
+    return sims, labels
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Calibrate fast-mode thresholds against the LLM pipeline.")
+    ap.add_argument("pairs", help="JSONL with cv_text and jd_text per line")
+    ap.add_argument("--out", default=FAST_THRESHOLDS_FILE)
+    args = ap.parse_args()
+    with open(args.pairs) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    pairs = [(r["cv_text"], r["jd_text"]) for r in rows]
+    thresholds = calibrate(*label_with_llm(pairs))
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(thresholds, f, indent=2)
+    print(json.dumps(thresholds, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Diff-aware re-scoring for a CV/JD pair that is edited and re-submitted
+under the same session id.
+
+Each session keeps the vectors of its last chunks and requirements and the
+LLM result of every batch, keyed by the batches' evidence fingerprints. On
+re-submit only new chunk/requirement texts are embedded; a previous batch
+is reused when all of its requirements are still present with identical
+retrieved evidence, and only the remaining requirements are packed into
+new LLM calls.
+"""
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import SESSION_CACHE_SIZE
+from ..llm.provider import acall_llm
+from ..rag.embedder import Embedder
+from ..utils.timing import span, traced
+from .match_pipeline import (
+    _augment_missing, _merge_batch_results, _parse_batch, _plan_calls, _prepare_inputs,
+    _split_batches, retrieve_from_embeddings,
+)
+from .prompt_packer import Evidence
+
+# (requirements, their evidence fingerprints, parsed LLM result of that call)
+Batch = Tuple[Tuple[str, ...], Tuple[str, ...], Dict]
+
+
+def evidence_fingerprint(requirement: str, hits: List[Tuple[float, str]]) -> str:
+    """Changes iff the requirement's line in the prompt would change (scores as printed)."""
+    h = hashlib.sha1(requirement.encode("utf-8"))
+    for score, snippet in hits:
+        h.update(f"\x00{round(score, 3)}\x00{snippet}".encode("utf-8"))
+    return h.hexdigest()
+
+
+class Session:
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.requirements: List[str] = []
+        self.vectors: Dict[str, np.ndarray] = {}
+        self.batches: List[Batch] = []
+        # concurrent submits for one session id: guards the fields above (the last to finish wins)
+        self.lock = threading.Lock()
+
+
+class SessionStore:
+    """Most recently used sessions in memory; an evicted session just re-scores in full."""
+
+    def __init__(self, max_items: int = SESSION_CACHE_SIZE):
+        self.max_items = max_items
+        self._lru: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Session:
+        with self._lock:
+            session = self._lru.get(session_id)
+            if session is None:
+                session = self._lru[session_id] = Session()
+            self._lru.move_to_end(session_id)
+            while len(self._lru) > self.max_items:
+                self._lru.popitem(last=False)
+            return session
+
+    def drop(self, session_id: str) -> bool:
+        with self._lock:
+            return self._lru.pop(session_id, None) is not None
+
+
+_sessions: Optional[SessionStore] = None
+_sessions_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    global _sessions
+    if _sessions is None:
+        with _sessions_lock:
+            if _sessions is None:
+                _sessions = SessionStore()
+    return _sessions
+
+
+def embed_changed(session: Session, texts: List[str], embedder: Embedder) -> Tuple[np.ndarray, int]:
+    """Vectors for `texts`, encoding only those the session has not seen; returns (vectors, encoded)."""
+    with session.lock:
+        new = [t for t in dict.fromkeys(texts) if t not in session.vectors]
+        if new:
+            with span("embed"):
+                emb = embedder.encode(new)
+            vectors = {**session.vectors, **dict(zip(new, emb))}
+        else:
+            vectors = session.vectors
+        # keep only what the current version uses
+        session.vectors = {t: vectors[t] for t in texts}
+        return np.stack([session.vectors[t] for t in texts]).astype("float32"), len(new)
+
+
+def plan_reuse(previous: List[Batch], requirements: List[str],
+               fingerprints: List[str]) -> Tuple[List[Tuple[int, Batch]], List[int]]:
+    """
+    Split requirements into previous batches that can be reused as-is and
+    the positions that still need scoring. Reused batches come back with the
+    position of their first requirement so results merge in JD order.
+    """
+    current = {}
+    for i, (r, fp) in enumerate(zip(requirements, fingerprints)):
+        current.setdefault((r, fp), i)
+    reused, claimed = [], set()
+    for batch in previous:
+        positions = [current.get(key) for key in zip(batch[0], batch[1])]
+        if None in positions or claimed.intersection(positions):
+            continue
+        claimed.update(positions)
+        reused.append((min(positions), batch))
+    return reused, [i for i in range(len(requirements)) if i not in claimed]
+
+
+async def arun_match_incremental(session_id: str, cv_text: str, jd_text: str, top_k: int = 2,
+                                 sessions: Optional[SessionStore] = None) -> Dict:
+    """arun_match that re-embeds and re-scores only what changed since the session's last call."""
+    loop = asyncio.get_running_loop()
+    session = (sessions or get_session_store()).get(session_id)
+    cv_chunks, all_requirements = _prepare_inputs(cv_text, jd_text)
+    with session.lock:
+        prev_chunks, prev_reqs, prev_batches = set(session.chunks), set(session.requirements), session.batches
+
+    def prepare() -> Tuple[Evidence, int]:
+        emb, encoded = embed_changed(session, cv_chunks + all_requirements, Embedder())
+        n = len(cv_chunks)
+        return retrieve_from_embeddings(cv_chunks, emb[:n], all_requirements, emb[n:], top_k), encoded
+
+    evidence, encoded = await loop.run_in_executor(None, traced(prepare))
+    fingerprints = [evidence_fingerprint(r, hits) for r, hits in evidence]
+    reused, dirty = plan_reuse(prev_batches, all_requirements, fingerprints)
+
+    batches, prompts, stats = _plan_calls([evidence[i] for i in dirty])
+
+    async def score(prompt: str) -> Dict:
+        return _parse_batch(await acall_llm(prompt))
+
+    with span("llm"):
+        results = await asyncio.gather(*(score(p) for p in prompts))
+
+    # map packed batches back to JD positions (packing keeps order)
+    scored, pos = [], iter(dirty)
+    for batch, res in zip(batches, results):
+        idx = [next(pos) for _ in batch]
+        scored.append((idx[0], (tuple(all_requirements[i] for i in idx), tuple(fingerprints[i] for i in idx), res)))
+    ordered = [b for _, b in sorted(reused + scored, key=lambda x: x[0])]
+
+    with span("merge"):
+        # weight by requirements per batch: a reused batch of 24 counts 24x a re-scored one of 1
+        merged = _merge_batch_results([b[2] for b in ordered], [len(b[0]) for b in ordered])
+        merged = _augment_missing(merged, all_requirements, cv_chunks)
+    full_calls = len(_split_batches(evidence)) if reused else len(prompts)
+    stats["incremental"] = {
+        "session_id": session_id,
+        "chunks_added": len(set(cv_chunks) - prev_chunks),
+        "chunks_removed": len(prev_chunks - set(cv_chunks)),
+        "requirements_added": len(set(all_requirements) - prev_reqs),
+        "requirements_removed": len(prev_reqs - set(all_requirements)),
+        "requirements_rescored": len(dirty),
+        "texts_embedded": encoded,
+        "batches_reused": len(reused),
+        "llm_calls_avoided": max(full_calls - len(prompts), 0),
+    }
+    merged["prompt_stats"] = stats
+    with session.lock:
+        session.chunks, session.requirements, session.batches = cv_chunks, all_requirements, ordered
+    return merged
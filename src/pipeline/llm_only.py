@@ -1,29 +1,26 @@
 # src/pipeline/llm_only.py
-import re
-from typing import List, Dict
+from typing import Callable, Dict, List, Optional
 from fastapi import HTTPException
-from ..llm.provider import call_llm
+from ..llm.provider import call_llm, acall_llm
+from ..llm.tokens import count_tokens, truncate_to_tokens
+from ..ingest.document import WORD_RE, parse_document, word_set
 from ..utils.json_sanitizer import extract_json
+from ..utils.metrics import LLM_INVALID_JSON
+from ..utils.timing import span
+from ..utils.token_index import TokenIndex
+from ..config import LLM_CONTEXT_TOKENS, LLM_OUTPUT_TOKENS, LLM_OUTPUT_TOKENS_PER_REQ
 
-# --------- simple helpers (no FAISS / no RAG) ---------
-BULLET_RE = re.compile(r"^\s*(?:[-•*·]|\d+[.)])\s+(.*)$")
+MAX_BULLET_TOKENS = 64          # truncate a single bullet
+JD_BUDGET_SHARE   = 0.35        # JD bullets may use at most this share of the prompt budget
 
+# --------- simple helpers (no FAISS / no RAG) ---------
 def extract_bullets(text: str) -> List[str]:
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    bullets = []
-    for l in lines:
-        m = BULLET_RE.match(l)
-        if m:
-            bullets.append(m.group(1).strip())
-    if bullets:
-        return bullets
-    # fallback: heuristic "sentences"
-    rough = re.split(r"(?<=[.!?])\s+\n?|\n{2,}", text)
-    return [s.strip() for s in rough if len(s.strip()) > 20][:120]
+    # bullets, else heuristic "sentences"
+    return list(parse_document(text).bullets_or_sentences)
 
 def tokenize_words(text: str) -> List[str]:
     # lowercase tokens, letters+digits only, len>=3
-    return re.findall(r"[A-Za-z0-9][A-Za-z0-9\-\+_.]{2,}", text.lower())
+    return WORD_RE.findall(text.lower())
 
 def sanitize_list_str(items: List[str]) -> List[str]:
     cleaned = []
@@ -80,14 +77,21 @@ CV_BULLETS:
 """
 
 
-def _clip_list(xs: List[str], max_len: int, max_chars: int) -> List[str]:
-    out = []
-    for x in xs[:max_len]:
+def _clip_to_budget(xs: List[str], budget: int, max_item_tokens: int = MAX_BULLET_TOKENS):
+    """Take bullets in order (duplicates dropped) while their "- " lines fit `budget` tokens."""
+    out, used, seen = [], 0, set()
+    for x in xs:
         x = x.replace("\n", " ").strip()
-        if len(x) > max_chars:
-            x = x[:max_chars] + "…"
+        if x.lower() in seen:
+            continue
+        seen.add(x.lower())
+        x = truncate_to_tokens(x, max_item_tokens)
+        cost = count_tokens(f"- {x}") + 1
+        if used + cost > budget:
+            break
         out.append(x)
-    return out
+        used += cost
+    return out, used
 
 def _postprocess(data: Dict, jd_bullets: List[str], cv_bullets: List[str]) -> Dict:
     jd_set = {b.strip() for b in jd_bullets}
@@ -110,13 +114,13 @@ def _postprocess(data: Dict, jd_bullets: List[str], cv_bullets: List[str]) -> Di
     ]
 
     # keep only skills appearing in JD and NOT in CV
-    jd_tokens = set(tokenize_words(" ".join(jd_bullets)))
-    cv_tokens = set(tokenize_words(" ".join(cv_bullets)))
+    jd_index = TokenIndex(jd_bullets)
+    cv_index = TokenIndex(cv_bullets)
     miss = []
     for s in sanitize_list_str(data.get("missing_skills", [])):
-        toks = set(tokenize_words(s))
-        # accept if at least one token appears in JD tokens, and none appear in CV tokens
-        if toks & jd_tokens and not (toks & cv_tokens):
+        toks = word_set(s)
+        # accept if at least one token appears in the JD, and none appear in the CV
+        if jd_index.any_of(toks) and not cv_index.any_of(toks):
             miss.append(s)
     # de-dup
     seen = set(); miss2 = []
@@ -139,26 +143,43 @@ def _postprocess(data: Dict, jd_bullets: List[str], cv_bullets: List[str]) -> Di
     data["overall_score"] = int(data.get("overall_score", 0))
     return data
 
-def run_match_llm(cv_text: str, jd_text: str) -> Dict:
-    jd_bullets = extract_bullets(jd_text)
-    cv_bullets = extract_bullets(cv_text)
+def _build_prompt(cv_text: str, jd_text: str):
+    with span("parse"):
+        jd_bullets = extract_bullets(jd_text)
+        cv_bullets = extract_bullets(cv_text)
+    return _prompt_from_bullets(jd_bullets, cv_bullets)
+
+def _prompt_from_bullets(jd_bullets: List[str], cv_bullets: List[str]):
     if not jd_bullets:
         raise HTTPException(status_code=400, detail="No requirements detected in JD.")
     if not cv_bullets:
         raise HTTPException(status_code=400, detail="No content detected in CV.")
 
-    # keep prompts tight to be fast & avoid timeouts
-    jd_bullets_small = _clip_list(jd_bullets, max_len=40, max_chars=220)
-    cv_bullets_small = _clip_list(cv_bullets, max_len=120, max_chars=220)
+    # fill the context budget instead of clipping by characters: JD bullets
+    # first (capped at a share), CV bullets take whatever is left
+    with span("prompt"):
+        return _fill_prompt(jd_bullets, cv_bullets)
+
+def _fill_prompt(jd_bullets: List[str], cv_bullets: List[str]):
+    budget = (LLM_CONTEXT_TOKENS - count_tokens(PROMPT)
+              - LLM_OUTPUT_TOKENS - 10 * LLM_OUTPUT_TOKENS_PER_REQ)   # answer lists are ~10 items
+    jd_bullets_small, jd_used = _clip_to_budget(jd_bullets, int(budget * JD_BUDGET_SHARE))
+    cv_bullets_small, _ = _clip_to_budget(cv_bullets, budget - jd_used)
 
     prompt = (PROMPT
               .replace("<<JD>>", "\n".join(f"- {b}" for b in jd_bullets_small))
               .replace("<<CV>>", "\n".join(f"- {b}" for b in cv_bullets_small)))
-    # then call the LLM as before
-    raw = call_llm(prompt)
+    return prompt, jd_bullets_small, cv_bullets_small
+
+def _prompt_stats(prompt: str, jd_small: List[str], cv_small: List[str]) -> Dict:
+    return {"llm_calls": 1, "prompt_tokens": [count_tokens(prompt)], "context_tokens": LLM_CONTEXT_TOKENS,
+            "jd_bullets_used": len(jd_small), "cv_bullets_used": len(cv_small)}
+
+def _parse_response(raw: str, jd_bullets_small: List[str], cv_bullets_small: List[str]) -> Dict:
     try:
         data = extract_json(raw)
     except Exception as e:
+        LLM_INVALID_JSON.inc(pipeline="llm_only")
         # show first 2k chars in server log to debug the LLM
         print("LLM RAW OUTPUT START =====")
         print(raw[:2000])
@@ -166,3 +187,32 @@ def run_match_llm(cv_text: str, jd_text: str) -> Dict:
         raise HTTPException(status_code=502, detail=f"LLM did not return valid JSON: {type(e).__name__}: {e}")
 
     return _postprocess(data, jd_bullets_small, cv_bullets_small)
+
+def run_match_llm(cv_text: str, jd_text: str, progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    prompt, jd_small, cv_small = _build_prompt(cv_text, jd_text)
+    if progress:
+        progress(0, 1)
+    # then call the LLM as before
+    with span("llm"):
+        raw = call_llm(prompt)
+    if progress:
+        progress(1, 1)
+    with span("merge"):
+        data = _parse_response(raw, jd_small, cv_small)
+    data["prompt_stats"] = _prompt_stats(prompt, jd_small, cv_small)
+    return data
+
+async def arun_match_llm(cv_text: str, jd_text: str) -> Dict:
+    return await _ascore_prompt(*_build_prompt(cv_text, jd_text))
+
+async def arun_match_llm_bullets(cv_bullets: List[str], jd_bullets: List[str]) -> Dict:
+    """arun_match_llm from already extracted bullets (e.g. stored document artifacts)."""
+    return await _ascore_prompt(*_prompt_from_bullets(jd_bullets, cv_bullets))
+
+async def _ascore_prompt(prompt: str, jd_small: List[str], cv_small: List[str]) -> Dict:
+    with span("llm"):
+        raw = await acall_llm(prompt)
+    with span("merge"):
+        data = _parse_response(raw, jd_small, cv_small)
+    data["prompt_stats"] = _prompt_stats(prompt, jd_small, cv_small)
+    return data
@@ -1,19 +1,25 @@
-from typing import Dict, List, Tuple
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 import numpy as np
 from fastapi import HTTPException
 
-from ..ingest.chunking import chunk_text
-from ..ingest.jd_parser import extract_requirements
+from ..ingest.document import parse_document
 from ..rag.embedder import Embedder
 from ..rag.store import FaissStore
-from ..llm.provider import call_llm
+from ..llm.provider import call_llm, acall_llm, llm_concurrency
+from ..llm.tokens import count_tokens
 from ..utils.json_sanitizer import extract_json
+from ..utils.metrics import LLM_INVALID_JSON
+from ..utils.timing import span, traced
+from ..utils.token_index import TokenIndex
+from ..config import LLM_CONTEXT_TOKENS, LLM_MAX_REQ_PER_CALL
+from .prompt_packer import Evidence, clip_evidence, duplicate_snippets, format_evidence, pack_evidence
 
 # --- Tunables to keep prompts small/fast ---
-MAX_REQ_PER_BATCH = 10          # handle at most 10 requirements per LLM call
+# (per-call size is set by the token budget, see prompt_packer.py)
+MAX_REQ_PER_CALL  = LLM_MAX_REQ_PER_CALL   # optional cap; 0 = pack by tokens only
 MAX_TOTAL_REQ     = 60          # hard cap total reqs considered
-MAX_SNIPPET_CHARS = 400         # truncate evidence
-MAX_REQ_CHARS     = 250         # truncate requirement line
 MAX_CV_CHUNKS     = 160         # cap CV length (prevents huge indexes)
 
 PROMPT_TEMPLATE = """You are a senior technical recruiter.
@@ -44,43 +50,89 @@ Return ONLY JSON.
 
 
 def build_indexes(cv_chunks: List[str], embedder: Embedder) -> FaissStore:
-    emb = embedder.encode(cv_chunks)
+    return store_from_embeddings(cv_chunks, embedder.encode(cv_chunks))
+
+def store_from_embeddings(cv_chunks: List[str], emb: np.ndarray) -> FaissStore:
     store = FaissStore(dim=emb.shape[1])
     store.add(emb, cv_chunks)
     return store
 
-def retrieve_evidence(requirements: List[str], store: FaissStore, embedder: Embedder, k:int=2) -> List[Tuple[str, List[Tuple[float,str]]]]:
-    req_emb = embedder.encode(requirements)
-    out = []
-    for i, r in enumerate(requirements):
-        q = req_emb[i:i+1]
-        hits = store.search(q, k=k)
-        out.append((r, hits))
-    return out
-
-def _format_evidence(evidence: List[Tuple[str, List[Tuple[float,str]]]]) -> str:
-    lines = []
-    for req, hits in evidence:
-        req_short = (req[:MAX_REQ_CHARS] + "…") if len(req) > MAX_REQ_CHARS else req
-        lines.append(f"- {req_short}")
-        for score, snippet in hits:
-            cleaned = snippet.replace("\n", " ").strip()
-            if len(cleaned) > MAX_SNIPPET_CHARS:
-                cleaned = cleaned[:MAX_SNIPPET_CHARS] + "…"
-            lines.append(f"  • score={round(score,3)} | {cleaned}")
-    return "\n".join(lines)
+def retrieve_evidence(requirements: List[str], store: FaissStore, embedder: Embedder, k:int=2,
+                      req_emb: Optional[np.ndarray] = None) -> Evidence:
+    # all requirements in one encode + one batched FAISS search (fused with BM25 on hybrid stores)
+    if req_emb is None:
+        req_emb = embedder.encode(requirements)
+    return list(zip(requirements, store.search_batch(req_emb, k=k, query_texts=requirements)))
+
+def index_and_retrieve(cv_chunks: List[str], requirements: List[str], embedder: Embedder, k: int) -> Evidence:
+    """Embed CV chunks and requirements in one model call, index, retrieve for the whole JD."""
+    with span("embed"):
+        emb = embedder.encode(cv_chunks + requirements)
+    return retrieve_from_embeddings(cv_chunks, emb[:len(cv_chunks)], requirements, emb[len(cv_chunks):], k)
+
+def retrieve_from_embeddings(cv_chunks: List[str], cv_emb: np.ndarray, requirements: List[str],
+                             req_emb: np.ndarray, k: int) -> Evidence:
+    """Index precomputed chunk vectors and retrieve for every requirement vector (no model call)."""
+    with span("index"):
+        store = store_from_embeddings(cv_chunks, cv_emb)
+    with span("retrieve"):
+        return retrieve_evidence(requirements, store, None, k=k, req_emb=req_emb)
 
 def _safe_extract_json(raw: str) -> Dict:
     try:
-        return extract_json(raw)
+        with span("json_parse"):
+            return extract_json(raw)
     except Exception as e:
+        LLM_INVALID_JSON.inc(pipeline="rag")
         # print a slice to server logs for debugging
         print("LLM RAW OUTPUT START =====")
         print(raw[:3000])
         print("LLM RAW OUTPUT END   =====")
         raise HTTPException(status_code=502, detail=f"LLM did not return valid JSON: {type(e).__name__}: {e}")
 
-def _merge_batch_results(results: List[Dict]) -> Dict:
+def _batch_prompt(evidence: Evidence) -> str:
+    return PROMPT_TEMPLATE.format(
+        requirements="\n".join([f"- {r}" for r, _ in evidence]),
+        evidence=format_evidence(evidence)
+    )
+
+_template_tokens = None
+
+def _split_batches(evidence: Evidence) -> List[Evidence]:
+    global _template_tokens
+    if _template_tokens is None:
+        _template_tokens = count_tokens(PROMPT_TEMPLATE.format(requirements="", evidence=""))
+    return pack_evidence(clip_evidence(evidence), _template_tokens, max_per_call=MAX_REQ_PER_CALL)
+
+def _plan_calls(evidence: Evidence) -> Tuple[List[Evidence], List[str], Dict]:
+    """Pack evidence into LLM calls; returns batches, their prompts and token stats."""
+    with span("prompt"):
+        batches = _split_batches(evidence)
+        prompts = [_batch_prompt(b) for b in batches]
+    stats = {
+        "llm_calls": len(prompts),
+        "prompt_tokens": [count_tokens(p) for p in prompts],
+        "context_tokens": LLM_CONTEXT_TOKENS,
+        "duplicate_snippets_dropped": duplicate_snippets(batches),
+    }
+    return batches, prompts, stats
+
+def _score_prompt(prompt: str) -> Dict:
+    return _parse_batch(call_llm(prompt))
+
+def _parse_batch(raw: str) -> Dict:
+    data = _safe_extract_json(raw)
+    return {
+        "overall_score": int(data.get("overall_score", 0)),
+        "section_scores": data.get("section_scores", {"hard_skills":0,"experience":0,"soft_skills":0}),
+        "good_matches": data.get("good_matches", []),
+        "missing_requirements": data.get("missing_requirements", []),
+        "missing_skills": data.get("missing_skills", []),
+        "improvement_suggestions": data.get("improvement_suggestions", []),
+    }
+
+def _merge_batch_results(results: List[Dict], sizes: Optional[List[int]] = None) -> Dict:
+    """Merge per-call results; `sizes` (requirements per call) weights the score averages."""
     if not results:
         return {
             "overall_score": 0,
@@ -90,10 +142,12 @@ def _merge_batch_results(results: List[Dict]) -> Dict:
         }
 
     # Average numeric scores; concat lists, then deduplicate a bit.
-    overall = int(round(sum(r.get("overall_score",0) for r in results)/len(results)))
-    hs = int(round(sum(r.get("section_scores",{}).get("hard_skills",0) for r in results)/len(results)))
-    exp = int(round(sum(r.get("section_scores",{}).get("experience",0) for r in results)/len(results)))
-    soft = int(round(sum(r.get("section_scores",{}).get("soft_skills",0) for r in results)/len(results)))
+    w = sizes or [1] * len(results)
+    total = sum(w)
+    overall = int(round(sum(n * r.get("overall_score",0) for n, r in zip(w, results))/total))
+    hs = int(round(sum(n * r.get("section_scores",{}).get("hard_skills",0) for n, r in zip(w, results))/total))
+    exp = int(round(sum(n * r.get("section_scores",{}).get("experience",0) for n, r in zip(w, results))/total))
+    soft = int(round(sum(n * r.get("section_scores",{}).get("soft_skills",0) for n, r in zip(w, results))/total))
 
     def _dedup(seq):
         seen = set(); out=[]
@@ -117,52 +171,130 @@ def _merge_batch_results(results: List[Dict]) -> Dict:
         "improvement_suggestions": sugg
     }
 
-def run_match(cv_text: str, jd_text: str, top_k: int = 2) -> Dict:
+def _prepare_cv(cv_text: str) -> List[str]:
     # Cap CV size to keep retrieval fast
-    cv_chunks = chunk_text(cv_text, max_chars=800)[:MAX_CV_CHUNKS]
+    with span("chunk"):
+        cv_chunks = parse_document(cv_text).chunks[:MAX_CV_CHUNKS]
     if not cv_chunks:
         cv_chunks = [cv_text.strip()]
+    return cv_chunks
 
+def _prepare_requirements(jd_text: str) -> List[str]:
     # Extract + cap requirements
-    all_requirements = extract_requirements(jd_text)[:MAX_TOTAL_REQ]
+    with span("parse"):
+        all_requirements = parse_document(jd_text).requirements[:MAX_TOTAL_REQ]
     if not all_requirements:
         raise HTTPException(status_code=400, detail="No requirements detected in JD text.")
+    return all_requirements
 
-    # Build RAG index
-    embedder = Embedder()
-    store = build_indexes(cv_chunks, embedder)
-
-    # Batch over requirements
-    batch_results = []
-    for i in range(0, len(all_requirements), MAX_REQ_PER_BATCH):
-        batch_reqs = all_requirements[i:i+MAX_REQ_PER_BATCH]
-        evidence = retrieve_evidence(batch_reqs, store, embedder, k=top_k)
-        prompt = PROMPT_TEMPLATE.format(
-            requirements="\n".join([f"- {r}" for r in batch_reqs]),
-            evidence=_format_evidence(evidence)
-        )
-        raw = call_llm(prompt)
-        data = _safe_extract_json(raw)
-        batch_results.append({
-            "overall_score": int(data.get("overall_score", 0)),
-            "section_scores": data.get("section_scores", {"hard_skills":0,"experience":0,"soft_skills":0}),
-            "good_matches": data.get("good_matches", []),
-            "missing_requirements": data.get("missing_requirements", []),
-            "missing_skills": data.get("missing_skills", []),
-            "improvement_suggestions": data.get("improvement_suggestions", []),
-        })
-
-    merged = _merge_batch_results(batch_results)
-
-    # Light heuristic augmentation: add naive missing-tokens pass
-    cv_lower = " ".join(cv_chunks).lower()
-    extra_missing = []
-    for r in all_requirements:
-        for w in [w.strip(",.():").lower() for w in r.split() if len(w) > 2]:
-            if w.isalpha() and w not in cv_lower:
-                extra_missing.append(w)
-    # de-dup and clip
-    seen=set(); extra=[w for w in extra_missing if not (w in seen or seen.add(w))]
+def _prepare_inputs(cv_text: str, jd_text: str) -> Tuple[List[str], List[str]]:
+    return _prepare_cv(cv_text), _prepare_requirements(jd_text)
+
+def requirement_words(requirements: List[str]) -> Iterator[str]:
+    """Lower-cased alphabetic words (3+ chars) of the requirements, in order, with repeats."""
+    return (w for r in requirements
+            for w in (x.strip(",.():").lower() for x in r.split() if len(x) > 2) if w.isalpha())
+
+def _augment_missing(merged: Dict, all_requirements: List[str], cv_chunks: List[str],
+                     index: Optional[TokenIndex] = None) -> Dict:
+    # Light heuristic augmentation: requirement words that never occur as a
+    # whole word in the CV, resolved against one token index (de-duped)
+    extra = (index or TokenIndex(cv_chunks)).missing(requirement_words(all_requirements))
     merged["missing_skills"] = list(dict.fromkeys([*merged.get("missing_skills",[]), *extra[:20]]))
+    return merged
 
+def run_match(cv_text: str, jd_text: str, top_k: int = 2,
+              progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """`progress(done, total)` is called as each LLM call finishes."""
+    cv_chunks, all_requirements = _prepare_inputs(cv_text, jd_text)
+
+    # Build RAG index + retrieve evidence for every requirement up front
+    evidence = index_and_retrieve(cv_chunks, all_requirements, Embedder(), top_k)
+
+    # Pack requirements into calls; calls run concurrently (bounded by the
+    # provider limit); results are read back in batch order for the merge.
+    batches, prompts, stats = _plan_calls(evidence)
+    with span("llm"), ThreadPoolExecutor(max_workers=min(len(prompts), llm_concurrency())) as ex:
+        futures = [ex.submit(traced(_score_prompt), p) for p in prompts]
+        if progress:
+            progress(0, len(futures))
+            for done, _ in enumerate(as_completed(futures), 1):
+                progress(done, len(futures))
+        batch_results = [f.result() for f in futures]
+
+    with span("merge"):
+        merged = _augment_missing(_merge_batch_results(batch_results, [len(b) for b in batches]),
+                                  all_requirements, cv_chunks)
+    merged["prompt_stats"] = stats
+    return merged
+
+# (cv_chunks, requirements, evidence for every requirement)
+Prepared = Tuple[List[str], List[str], Evidence]
+
+async def aprepare_match(cv_text: str, jd_text: str, top_k: int = 2) -> Prepared:
+    """Parse + embed + retrieve off the event loop; raises 400s before any LLM work."""
+    def prepare() -> Prepared:
+        # parsing and Embedder() (a registry lookup that may load the model) block too
+        cv_chunks, all_requirements = _prepare_inputs(cv_text, jd_text)
+        return cv_chunks, all_requirements, index_and_retrieve(cv_chunks, all_requirements, Embedder(), top_k)
+    return await asyncio.get_running_loop().run_in_executor(None, traced(prepare))
+
+async def arun_match(cv_text: str, jd_text: str, top_k: int = 2) -> Dict:
+    """Async run_match: embedding/FAISS work goes to the default executor, LLM calls are awaited."""
+    return await ascore_prepared(await aprepare_match(cv_text, jd_text, top_k))
+
+async def ascore_prepared(prepared: Prepared, index: Optional[TokenIndex] = None) -> Dict:
+    """LLM-score already retrieved evidence; `index` is the CV's TokenIndex if precomputed."""
+    cv_chunks, all_requirements, evidence = prepared
+    batches, prompts, stats = _plan_calls(evidence)
+
+    async def score(prompt: str) -> Dict:
+        return _parse_batch(await acall_llm(prompt))
+
+    # gather() returns in batch order, same as the sync path
+    with span("llm"):
+        batch_results = await asyncio.gather(*(score(p) for p in prompts))
+    with span("merge"):
+        merged = _augment_missing(_merge_batch_results(list(batch_results), [len(b) for b in batches]),
+                                  all_requirements, cv_chunks, index)
+    merged["prompt_stats"] = stats
     return merged
+
+async def aiter_match(prepared: Prepared, index: Optional[TokenIndex] = None) -> AsyncIterator[Dict]:
+    """
+    Yield scoring events as requirement batches finish:
+    "start", then one "batch" per completed batch (with the running merged
+    score), then "done" with the same result arun_match returns, or "error".
+    """
+    cv_chunks, all_requirements, evidence = prepared
+    batches, prompts, stats = _plan_calls(evidence)
+    yield {"event": "start", "batches": len(batches), "requirements": len(all_requirements),
+           "prompt_stats": stats}
+
+    async def score(i: int, prompt: str) -> Tuple[int, Dict]:
+        return i, _parse_batch(await acall_llm(prompt))
+
+    tasks = [asyncio.ensure_future(score(i, p)) for i, p in enumerate(prompts)]
+    results: List[Optional[Dict]] = [None] * len(batches)
+    try:
+        for completed, fut in enumerate(asyncio.as_completed(tasks), start=1):
+            try:
+                i, res = await fut
+            except HTTPException as e:
+                yield {"event": "error", "status": e.status_code, "detail": e.detail}
+                return
+            results[i] = res
+            yield {
+                "event": "batch", "batch_index": i, "completed": completed, "batches": len(batches),
+                "requirements": [r for r, _ in batches[i]], "result": res,
+                # merged in batch order, so the running score is deterministic for a given set
+                "merged": _merge_batch_results([r for r in results if r is not None],
+                                               [len(b) for b, r in zip(batches, results) if r is not None]),
+            }
+        merged = _augment_missing(_merge_batch_results(results, [len(b) for b in batches]),
+                                  all_requirements, cv_chunks, index)
+        merged["prompt_stats"] = stats
+        yield {"event": "done", "result": merged}
+    finally:
+        for t in tasks:
+            t.cancel()
@@ -0,0 +1,105 @@
+from typing import Dict, List, Tuple
+
+from ..config import LLM_CONTEXT_TOKENS, LLM_OUTPUT_TOKENS, LLM_OUTPUT_TOKENS_PER_REQ
+from ..llm.tokens import count_tokens, truncate_to_tokens
+
+Evidence = List[Tuple[str, List[Tuple[float, str]]]]
+
+MAX_REQ_TOKENS     = 64         # truncate requirement line
+MAX_SNIPPET_TOKENS = 100        # truncate evidence
+
+
+def clip_evidence(evidence: Evidence, max_req_tokens: int = MAX_REQ_TOKENS,
+                  max_snippet_tokens: int = MAX_SNIPPET_TOKENS) -> Evidence:
+    """Token-truncate requirements and snippets (each unique snippet only once)."""
+    clipped: Dict[str, str] = {}
+    out = []
+    for req, hits in evidence:
+        new_hits = []
+        for score, snippet in hits:
+            if snippet not in clipped:
+                clipped[snippet] = truncate_to_tokens(snippet.replace("\n", " ").strip(), max_snippet_tokens)
+            new_hits.append((score, clipped[snippet]))
+        out.append((truncate_to_tokens(req.replace("\n", " ").strip(), max_req_tokens), new_hits))
+    return out
+
+
+def _hit_line(score: float, ref: int, snippet: str, seen: bool) -> str:
+    if seen:
+        return f"  • score={round(score,3)} | [E{ref}] (same snippet as above)"
+    return f"  • score={round(score,3)} | [E{ref}] {snippet}"
+
+
+def format_evidence(evidence: Evidence) -> str:
+    """Requirement bullets with their hits; a snippet shared by several requirements is printed once."""
+    lines = []
+    refs: Dict[str, int] = {}
+    for req, hits in evidence:
+        lines.append(f"- {req}")
+        for score, snippet in hits:
+            seen = snippet in refs
+            if not seen:
+                refs[snippet] = len(refs) + 1
+            lines.append(_hit_line(score, refs[snippet], snippet, seen))
+    return "\n".join(lines)
+
+
+def pack_evidence(evidence: Evidence, fixed_tokens: int, context_tokens: int = LLM_CONTEXT_TOKENS,
+                  max_per_call: int = 0) -> List[Evidence]:
+    """
+    Greedily pack requirements (in order) into the fewest calls whose prompt
+    plus expected JSON answer fits `context_tokens`. `fixed_tokens` is the
+    template's own size. A requirement's cost is its two bullet lines, its
+    new snippets (repeats cost only a short reference) and its share of the
+    answer. A requirement that alone exceeds the budget still gets a call.
+    """
+    budget = context_tokens - fixed_tokens - LLM_OUTPUT_TOKENS
+    memo: Dict[str, int] = {}
+
+    def tokens(s: str) -> int:
+        if s not in memo:
+            memo[s] = count_tokens(s)
+        return memo[s]
+
+    # hit line = fixed prefix + snippet text (or the short back-reference)
+    prefix = tokens(_hit_line(0.999, 99, "", False))
+    ref = tokens(_hit_line(0.999, 99, "", True))
+
+    def cost_of(req: str, hits, seen: set) -> int:
+        cost = 2 * tokens(f"- {req}") + LLM_OUTPUT_TOKENS_PER_REQ
+        seen = set(seen)
+        for _, snippet in hits:
+            cost += ref if snippet in seen else prefix + tokens(snippet)
+            seen.add(snippet)
+        return cost
+
+    batches: List[Evidence] = []
+    current: Evidence = []
+    seen: set = set()
+    used = 0
+    for req, hits in evidence:
+        cost = cost_of(req, hits, seen)
+        full = max_per_call and len(current) >= max_per_call
+        if current and (used + cost > budget or full):
+            batches.append(current)
+            current, seen, used = [], set(), 0
+            # snippets are no longer shared with the previous call
+            cost = cost_of(req, hits, seen)
+        current.append((req, hits))
+        seen.update(snippet for _, snippet in hits)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def duplicate_snippets(batches: List[Evidence]) -> int:
+    """Snippet repeats replaced by a reference across all calls."""
+    dropped = 0
+    for batch in batches:
+        seen = set()
+        for _, hits in batch:
+            for _, snippet in hits:
+                dropped += snippet in seen
+                seen.add(snippet)
+    return dropped
@@ -0,0 +1,186 @@
+"""
+Two-stage ranking of a candidate pool against one JD.
+
+1. Screen: every CV is scored without the LLM. The score blends embedding
+   coverage (each requirement's best chunk similarity mapped through the
+   fast-mode thresholds) with keyword coverage (the share of requirement
+   words present as whole words in the CV).
+2. LLM: only the top N go through the RAG scoring path. It reuses the
+   screen's embeddings, so retrieval needs no further model call.
+
+Each stage has a latency budget. The screen stops embedding new CVs once
+its budget is spent, and the unscreened ones are ranked last. LLM calls
+still running at the LLM budget are cancelled, and those candidates keep
+their screen score.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from ..config import RANK_KEYWORD_WEIGHT, RANK_LLM_BUDGET_S, RANK_MAX_DOCS, RANK_SCREEN_BUDGET_S, RANK_TOP_N
+from ..llm.provider import acall_llm
+from ..rag.embedder import Embedder
+from ..utils.timing import span, traced
+from ..utils.token_index import TokenIndex
+from .artifacts import resolve
+from .fast_scoring import Thresholds, coverage, current_thresholds
+from .match_pipeline import (
+    _augment_missing, _merge_batch_results, _parse_batch, _plan_calls, _prepare_cv, _prepare_requirements,
+    requirement_words, retrieve_from_embeddings,
+)
+
+SCREEN_SLICE = 64               # CVs parsed and embedded per encode call
+
+
+def keyword_coverage(keywords: List[str], index: TokenIndex) -> float:
+    return 1.0 - len(index.missing(keywords)) / len(keywords) if keywords else 0.0
+
+
+def screen_score(req_emb: np.ndarray, keywords: List[str], cv_emb: np.ndarray, index: TokenIndex,
+                 keyword_weight: float, thresholds: Thresholds) -> Dict:
+    semantic = float(coverage((req_emb @ cv_emb.T).max(axis=1), thresholds).mean())
+    keyword = keyword_coverage(keywords, index)
+    return {"score": round(100 * ((1 - keyword_weight) * semantic + keyword_weight * keyword), 2),
+            "semantic": round(semantic, 4), "keyword": round(keyword, 4)}
+
+
+def screen(jd_text: str, cv_texts: Optional[List[str]] = None, cv_ids: Optional[List[str]] = None,
+           ids: Optional[List[str]] = None, keyword_weight: float = RANK_KEYWORD_WEIGHT,
+           budget_s: float = RANK_SCREEN_BUDGET_S, embedder: Optional[Embedder] = None,
+           thresholds: Optional[Thresholds] = None) -> Tuple[List[str], np.ndarray, List[Dict], Dict]:
+    """
+    Stage 1 over the whole pool: CV texts (named by `ids`) followed by stored
+    CV artifacts (`cv_ids`). Returns requirements, their vectors, one dict
+    per candidate (with "screen" None if the budget ran out) and stage stats.
+    """
+    cv_texts, cv_ids = cv_texts or [], cv_ids or []
+    if not cv_texts and not cv_ids:
+        raise HTTPException(status_code=400, detail="Provide cv_texts and/or cv_ids.")
+    if len(cv_texts) + len(cv_ids) > RANK_MAX_DOCS:
+        raise HTTPException(status_code=400, detail=f"At most {RANK_MAX_DOCS} candidates per ranking request.")
+    if ids is not None and len(ids) != len(cv_texts):
+        raise HTTPException(status_code=400, detail="ids must have one entry per CV text.")
+
+    t0 = time.perf_counter()
+    embedder = embedder or Embedder()
+    thresholds = thresholds or current_thresholds()
+    requirements = _prepare_requirements(jd_text)
+    req_emb = embedder.encode(requirements)
+    keywords = list(dict.fromkeys(requirement_words(requirements)))
+
+    def candidate(index: int, doc_id: str, chunks: List[str], emb: np.ndarray, token_index: TokenIndex) -> Dict:
+        return {"index": index, "id": doc_id, "chunks": chunks, "emb": emb, "token_index": token_index,
+                "screen": screen_score(req_emb, keywords, emb, token_index, keyword_weight, thresholds)}
+
+    with span("screen"):
+        # stored artifacts need no model call, so the budget never cuts them
+        stored = []
+        for j, doc_id in enumerate(cv_ids):
+            art = resolve("cv", doc_id, None)
+            stored.append(candidate(len(cv_texts) + j, doc_id, art.items, art.emb, art.token_index()))
+
+        texts: List[Dict] = []
+        for start in range(0, len(cv_texts), SCREEN_SLICE):
+            if time.perf_counter() - t0 > budget_s:
+                break
+            chunks = [_prepare_cv(t) for t in cv_texts[start:start + SCREEN_SLICE]]
+            emb = embedder.encode([c for cs in chunks for c in cs])
+            offsets = np.cumsum([0] + [len(cs) for cs in chunks])
+            for i, cs in enumerate(chunks, start):
+                e = emb[offsets[i - start]:offsets[i - start + 1]]
+                texts.append(candidate(i, ids[i] if ids else str(i), cs, e, TokenIndex(cs)))
+        texts += [{"index": i, "id": ids[i] if ids else str(i), "screen": None}
+                  for i in range(len(texts), len(cv_texts))]
+
+    stats = {"seconds": round(time.perf_counter() - t0, 3), "budget_s": budget_s,
+             "screened": len(stored) + sum(c["screen"] is not None for c in texts),
+             "unscreened": sum(c["screen"] is None for c in texts)}
+    return requirements, req_emb, texts + stored, stats
+
+
+async def llm_stage(shortlist: List[Dict], requirements: List[str], req_emb: np.ndarray, top_k: int = 2,
+                    budget_s: float = RANK_LLM_BUDGET_S) -> Dict:
+    """Stage 2: RAG-score the shortlist concurrently; sets "llm" / "status" on each candidate."""
+    t0 = time.perf_counter()
+    loop = asyncio.get_running_loop()
+
+    def prepare():
+        return [retrieve_from_embeddings(c["chunks"], c["emb"], requirements, req_emb, top_k) for c in shortlist]
+
+    plans = [_plan_calls(ev) for ev in await loop.run_in_executor(None, traced(prepare))]
+
+    async def call(prompt: str) -> Dict:
+        return _parse_batch(await acall_llm(prompt))
+
+    async def score(c: Dict, batches: List, prompts: List[str], stats: Dict) -> Dict:
+        results = list(await asyncio.gather(*(call(p) for p in prompts)))
+        merged = _merge_batch_results(results, [len(b) for b in batches])
+        merged = _augment_missing(merged, requirements, c["chunks"], c["token_index"])
+        merged["prompt_stats"] = stats
+        return merged
+
+    tasks = [asyncio.ensure_future(score(c, *plan)) for c, plan in zip(shortlist, plans)]
+    done = set()
+    if tasks:
+        with span("llm"):
+            done, pending = await asyncio.wait(tasks, timeout=max(budget_s - (time.perf_counter() - t0), 0.0))
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    for c, t in zip(shortlist, tasks):
+        if t not in done:
+            c["status"] = "llm_timeout"
+        elif t.cancelled():         # cancelled from below (e.g. a shared LLM call): unscored, not a crash
+            c["status"], c["error"] = "llm_error", "cancelled"
+        elif t.exception() is not None:
+            e = t.exception()
+            c["status"], c["error"] = "llm_error", e.detail if isinstance(e, HTTPException) else f"{type(e).__name__}: {e}"
+        else:
+            c["status"], c["llm"] = "scored", t.result()
+    return {"seconds": round(time.perf_counter() - t0, 3), "budget_s": budget_s, "shortlisted": len(shortlist),
+            "scored": sum(c["status"] == "scored" for c in shortlist),
+            "timed_out": sum(c["status"] == "llm_timeout" for c in shortlist),
+            "errors": sum(c["status"] == "llm_error" for c in shortlist),
+            "llm_calls": sum(len(p) for _, p, _ in plans)}
+
+
+def _rank_key(c: Dict):
+    llm = c.get("llm")
+    screen_s = c["screen"]["score"] if c["screen"] else None
+    if llm is not None:
+        return 0, -llm["overall_score"], -screen_s, c["index"]
+    if screen_s is not None:
+        return 1, 0, -screen_s, c["index"]
+    return 2, 0, 0, c["index"]
+
+
+async def arun_rank(jd_text: str, cv_texts: Optional[List[str]] = None, cv_ids: Optional[List[str]] = None,
+                    ids: Optional[List[str]] = None, top_n: int = RANK_TOP_N, top_k: int = 2,
+                    keyword_weight: float = RANK_KEYWORD_WEIGHT, screen_budget_s: float = RANK_SCREEN_BUDGET_S,
+                    llm_budget_s: float = RANK_LLM_BUDGET_S) -> Dict:
+    """Rank a pool for one JD: LLM-scored candidates first (by LLM score), then the rest by screen score."""
+    loop = asyncio.get_running_loop()
+    requirements, req_emb, candidates, screen_stats = await loop.run_in_executor(
+        None, traced(screen), jd_text, cv_texts, cv_ids, ids, keyword_weight, screen_budget_s)
+
+    screened = sorted((c for c in candidates if c["screen"] is not None), key=_rank_key)
+    shortlist = screened[:max(top_n, 0)]
+    for c in candidates:
+        c["status"] = "screened" if c["screen"] is not None else "unscreened"
+    llm_stats = await llm_stage(shortlist, requirements, req_emb, top_k, llm_budget_s)
+
+    ranking = []
+    for rank, c in enumerate(sorted(candidates, key=_rank_key), 1):
+        row = {"rank": rank, "index": c["index"], "id": c["id"], "status": c["status"],
+               "screen": c["screen"], "llm_score": c["llm"]["overall_score"] if "llm" in c else None}
+        if "llm" in c:
+            row["result"] = c["llm"]
+        if "error" in c:
+            row["error"] = c["error"]
+        ranking.append(row)
+    return {"requirements": len(requirements), "candidates": len(candidates), "top_n": top_n,
+            "stages": {"screen": screen_stats, "llm": llm_stats}, "ranking": ranking}
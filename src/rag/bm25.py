@@ -0,0 +1,109 @@
+"""
+In-memory BM25 over the chunks of a FaissStore, for hybrid retrieval.
+
+Documents are tokenized like TokenIndex: compound tokens such as "node.js"
+or "c++" count both whole and as their alphanumeric runs. The index is one
+sparse term-by-document matrix of precomputed BM25 weights, so a batch of
+queries is a single sparse product: (queries x terms) @ (terms x documents).
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from ..config import BM25_B, BM25_K1
+from ..utils.token_index import RUN_RE
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#_.-]*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or our the to we will with you your "
+    "experience knowledge strong good ability skills years year using use work working".split()
+)
+
+
+def bm25_tokens(text: str) -> List[str]:
+    out = []
+    for t in TOKEN_RE.findall(text.lower()):
+        if not t.isalnum():
+            t = t.rstrip("._-")
+            if not t.isalnum():
+                out.append(t)
+                out.extend(RUN_RE.findall(t))
+                continue
+        if t not in STOPWORDS:
+            out.append(t)
+    return out
+
+
+def reciprocal_rank_fusion(ranked: Sequence[Iterable[int]], k: int = 60) -> List[int]:
+    """Ids ordered by sum of 1 / (k + rank) over the ranked lists (ties: first list, first seen)."""
+    scores: Dict[int, float] = {}
+    for ids in ranked:
+        for rank, i in enumerate(ids, 1):
+            scores[i] = scores.get(i, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda i: -scores[i])
+
+
+class BM25Index:
+    """Documents are appended with add(); the weight matrix is rebuilt lazily on the next search."""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.docs: List[np.ndarray] = []       # term ids per document
+        self.vocab: Dict[str, int] = {}
+        self._weights: Optional[sparse.csr_matrix] = None     # terms x documents
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, texts: Iterable[str]):
+        vocab = self.vocab
+        for text in texts:
+            self.docs.append(np.array([vocab.setdefault(t, len(vocab)) for t in bm25_tokens(text)], dtype="int64"))
+        self._weights = None
+
+    def _build(self) -> sparse.csr_matrix:
+        n_docs, n_terms = len(self.docs), len(self.vocab)
+        doc_len = np.array([len(t) for t in self.docs], dtype="float32")
+        rows = np.concatenate(self.docs)
+        cols = np.repeat(np.arange(n_docs), doc_len.astype("int64"))
+        tf = sparse.csr_matrix((np.ones(len(rows), dtype="float32"), (rows, cols)), shape=(n_terms, n_docs))
+        tf.sum_duplicates()
+        df = np.diff(tf.indptr).astype("float32")
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * doc_len / max(float(doc_len.mean()), 1e-9))
+        # BM25 term weight: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+        data = tf.data
+        doc_of = tf.indices
+        data[:] = np.repeat(idf, np.diff(tf.indptr)) * data * (self.k1 + 1) / (data + norm[doc_of])
+        return tf
+
+    def _queries(self, queries: Sequence[str]) -> sparse.csr_matrix:
+        indptr, indices = [0], []
+        for q in queries:
+            ids = {self.vocab[t] for t in bm25_tokens(q) if t in self.vocab}
+            indices.extend(sorted(ids))
+            indptr.append(len(indices))
+        return sparse.csr_matrix((np.ones(len(indices), dtype="float32"), indices, indptr),
+                                 shape=(len(queries), len(self.vocab)))
+
+    def search_batch(self, queries: Sequence[str], k: int = 10) -> List[List[Tuple[float, int]]]:
+        """Top-k (score, document index) per query; documents sharing no term are left out."""
+        if not self.docs or not self.vocab:
+            return [[] for _ in queries]
+        if self._weights is None:
+            self._weights = self._build()
+        scores = (self._queries(queries) @ self._weights).tocsr()
+        out = []
+        for r in range(scores.shape[0]):
+            lo, hi = scores.indptr[r], scores.indptr[r + 1]
+            data, docs = scores.data[lo:hi], scores.indices[lo:hi]
+            if len(data) > k:
+                top = np.argpartition(-data, k - 1)[:k]
+                data, docs = data[top], docs[top]
+            order = np.lexsort((docs, -data))
+            out.append([(float(data[i]), int(docs[i])) for i in order])
+        return out
+
@@ -0,0 +1,257 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from ..config import CORPUS_INDEX_DIR, FAISS_NPROBE
+from .store import make_index
+
+# (score, doc_id, chunk text)
+Hit = Tuple[float, str, str]
+
+
+class CorpusIndex:
+    """
+    Persistent multi-CV index. Every chunk gets a stable int64 id (kept by an
+    IndexIDMap2, or by the IVF lists after a rebuild), so candidates can be
+    added, replaced or deleted without rebuilding, and every hit maps back to
+    its candidate (doc_id).
+
+    Metadata is a journal (META_FILE): a header line, then one add or delete
+    record per edit. save() appends the records since the last save and
+    compacts the journal only once it is mostly superseded records.
+    """
+
+    INDEX_FILE = "index.faiss"
+    META_FILE = "meta.jsonl"
+    LEGACY_META_FILE = "meta.json"
+    COMPACT_RATIO = 2       # rewrite the journal once it has this many records per live document
+
+    def __init__(self, dim: int, index=None):
+        self.dim = dim
+        self.index = index if index is not None else faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        self.next_id = 0
+        self.chunks: Dict[int, Tuple[str, str]] = {}      # chunk id -> (doc_id, text)
+        self.docs: Dict[str, Dict[str, Any]] = {}         # doc_id -> {"chunk_ids", "metadata"}
+        self.nprobe = FAISS_NPROBE
+        self._lock = threading.RLock()
+        self._mmap_file: Optional[str] = None             # set while the index is a read-only mmap
+        self.dirty = False                                # edits not yet written by save()
+        self._pending: List[Dict[str, Any]] = []          # journal records not yet written by save()
+        self._journal: Optional[str] = None               # journal file the pending records extend
+        self._journal_records = 0                         # records in that journal
+        self._tune()
+
+    def _tune(self):
+        try:
+            faiss.extract_index_ivf(self.index).nprobe = self.nprobe
+        except RuntimeError:
+            pass  # flat index: nothing to tune
+
+    def _ensure_writable(self):
+        """An mmap-loaded IVF index has read-only inverted lists; reopen it in memory before the first write."""
+        if self._mmap_file is not None:
+            self.index = faiss.read_index(self._mmap_file)
+            self._mmap_file = None
+            self._tune()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add_document(self, doc_id: str, chunks: List[str], embeddings: np.ndarray,
+                     metadata: Optional[Dict[str, Any]] = None):
+        """Add a candidate; an existing doc_id is replaced (update = delete + add)."""
+        assert embeddings.shape == (len(chunks), self.dim)
+        with self._lock:
+            self.delete_document(doc_id)
+            self._ensure_writable()
+            ids = np.arange(self.next_id, self.next_id + len(chunks), dtype="int64")
+            self.index.add_with_ids(np.ascontiguousarray(embeddings, dtype="float32"), ids)
+            self.next_id += len(chunks)
+            for cid, text in zip(ids.tolist(), chunks):
+                self.chunks[cid] = (doc_id, text)
+            self.docs[doc_id] = {"chunk_ids": ids.tolist(), "metadata": metadata or {}}
+            self._pending.append(self._add_record(doc_id))
+            self.dirty = True
+
+    update_document = add_document
+
+    def delete_document(self, doc_id: str) -> bool:
+        with self._lock:
+            doc = self.docs.get(doc_id)
+            if doc is None:
+                return False
+            self._ensure_writable()
+            # drop the entry only once the vectors are gone, so a failed remove leaves both in step
+            self.index.remove_ids(np.array(doc["chunk_ids"], dtype="int64"))
+            del self.docs[doc_id]
+            for cid in doc["chunk_ids"]:
+                self.chunks.pop(cid, None)
+            self._pending.append({"op": "delete", "doc_id": doc_id})
+            self.dirty = True
+            return True
+
+    def is_flat(self) -> bool:
+        return isinstance(self.index, faiss.IndexIDMap2)
+
+    def rebuild(self, index_type: str = "ivf_flat", nprobe: Optional[int] = None, **params):
+        """
+        Re-train the index as an IVF structure once the pool is large. Only
+        IVF types are allowed because HNSW cannot delete vectors. Note that
+        rebuilding an ivf_pq index again starts from its lossy reconstructions.
+        """
+        if index_type not in ("flat", "ivf_flat", "ivf_pq"):
+            raise ValueError("CorpusIndex supports flat, ivf_flat and ivf_pq (HNSW cannot delete).")
+        with self._lock:
+            ids = np.array(sorted(self.chunks), dtype="int64")
+            vecs = self.index.reconstruct_batch(ids) if len(ids) else np.zeros((0, self.dim), "float32")
+            base = make_index(self.dim, index_type, len(ids), **params)
+            if not base.is_trained:
+                base.train(vecs)
+            if index_type == "flat":
+                index = faiss.IndexIDMap2(base)
+            else:
+                # IVF lists hold the ids themselves; an IndexIDMap2 around IVF breaks after the first
+                # remove_ids, since IVF never renumbers the positions the map relies on
+                base.set_direct_map_type(faiss.DirectMap.Hashtable)
+                index = base
+            if len(ids):
+                index.add_with_ids(vecs, ids)
+            self.index = index
+            self._mmap_file = None
+            self.dirty = True
+            self.nprobe = nprobe or self.nprobe
+            self._tune()
+
+    def search(self, query_emb: np.ndarray, k: int = 10) -> List[List[Hit]]:
+        with self._lock:
+            if self.index.ntotal == 0:
+                return [[] for _ in range(query_emb.shape[0])]
+            D, I = self.index.search(np.ascontiguousarray(query_emb, dtype="float32"), k)
+            return [
+                [(float(s), *self.chunks[int(i)]) for s, i in zip(drow, irow) if int(i) in self.chunks]
+                for drow, irow in zip(D, I)
+            ]
+
+    def search_candidates(self, req_emb: np.ndarray, k_per_req: int = 50, top_n: int = 20) -> List[Dict[str, Any]]:
+        """
+        Rank candidates for a set of requirement vectors in one batched search.
+        A candidate's score is the mean over requirements of its best chunk
+        similarity; requirements where none of its chunks made the top
+        `k_per_req` count as 0.
+        """
+        hits = self.search(req_emb, k=k_per_req)
+        best: Dict[str, Dict[int, Tuple[float, str]]] = {}
+        for r, row in enumerate(hits):
+            for score, doc_id, text in row:
+                per_req = best.setdefault(doc_id, {})
+                if r not in per_req or score > per_req[r][0]:
+                    per_req[r] = (score, text)
+        n_req = max(1, req_emb.shape[0])
+        ranked = sorted(best.items(), key=lambda kv: -sum(s for s, _ in kv[1].values()))[:top_n]
+        return [
+            {
+                "doc_id": doc_id,
+                "score": round(sum(s for s, _ in per_req.values()) / n_req, 4),
+                "requirements_matched": len(per_req),
+                "evidence": [{"requirement_index": r, "score": round(s, 4), "text": t}
+                             for r, (s, t) in sorted(per_req.items())],
+                "metadata": self.docs[doc_id]["metadata"],
+            }
+            for doc_id, per_req in ranked
+        ]
+
+    def _add_record(self, doc_id: str) -> Dict[str, Any]:
+        doc = self.docs[doc_id]
+        return {"op": "add", "doc_id": doc_id, "chunk_ids": doc["chunk_ids"], "metadata": doc["metadata"],
+                "texts": [self.chunks[cid][1] for cid in doc["chunk_ids"]]}
+
+    def save(self, path: str):
+        """
+        Write the metadata edits since the last save, then the index. If the
+        process dies in between, the two disagree on the chunks edited last;
+        search skips vectors the journal no longer lists and deletes skip ids
+        the index lacks.
+        """
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            meta_path = os.path.join(path, self.META_FILE)
+            records = self._journal_records + len(self._pending)
+            if self._journal != meta_path or not os.path.exists(meta_path) \
+                    or records > self.COMPACT_RATIO * max(len(self.docs), 1) + 1:
+                tmp = meta_path + ".tmp"
+                with open(tmp, "w") as f:
+                    f.write(json.dumps({"dim": self.dim, "next_id": self.next_id}) + "\n")
+                    f.writelines(json.dumps(self._add_record(d)) + "\n" for d in self.docs)
+                os.replace(tmp, meta_path)
+                self._journal, self._journal_records = meta_path, len(self.docs)
+            else:
+                with open(meta_path, "a") as f:
+                    f.writelines(json.dumps(r) + "\n" for r in self._pending)
+                self._journal_records = records
+            self._pending = []
+            tmp = os.path.join(path, self.INDEX_FILE + ".tmp")
+            faiss.write_index(self.index, tmp)
+            os.replace(tmp, os.path.join(path, self.INDEX_FILE))
+            self.dirty = False
+
+    def _replay(self, meta_path: str):
+        with open(meta_path) as f:
+            self.next_id = json.loads(next(f))["next_id"]
+            for line in f:
+                r = json.loads(line)
+                self._journal_records += 1
+                old = self.docs.pop(r["doc_id"], None)
+                for cid in old["chunk_ids"] if old else ():
+                    self.chunks.pop(cid, None)
+                if r["op"] == "add":
+                    self.docs[r["doc_id"]] = {"chunk_ids": r["chunk_ids"], "metadata": r["metadata"]}
+                    self.chunks.update((cid, (r["doc_id"], t)) for cid, t in zip(r["chunk_ids"], r["texts"]))
+                    self.next_id = max(self.next_id, max(r["chunk_ids"], default=-1) + 1)
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return any(os.path.exists(os.path.join(path, f)) for f in (cls.META_FILE, cls.LEGACY_META_FILE))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "CorpusIndex":
+        """With `mmap`, IVF lists stay on disk until the first add or delete reads them into memory."""
+        index_file = os.path.join(path, cls.INDEX_FILE)
+        index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP if mmap else 0)
+        store = cls(index.d, index=index)
+        if mmap:
+            store._mmap_file = index_file
+        meta_path = os.path.join(path, cls.META_FILE)
+        if os.path.exists(meta_path):
+            store._replay(meta_path)
+            store._journal = meta_path
+        else:
+            # single meta.json written before the journal; the next save() converts it
+            with open(os.path.join(path, cls.LEGACY_META_FILE)) as f:
+                meta = json.load(f)
+            store.next_id = meta["next_id"]
+            store.docs = meta["docs"]
+            store.chunks = {int(cid): (v[0], v[1]) for cid, v in meta["chunks"].items()}
+        return store
+
+    def stats(self) -> Dict[str, Any]:
+        return {"documents": len(self.docs), "chunks": int(self.index.ntotal), "dim": self.dim}
+
+
+_corpus: Optional[CorpusIndex] = None
+_corpus_lock = threading.Lock()
+
+
+def get_corpus_index(dim: Optional[int] = None, path: str = CORPUS_INDEX_DIR) -> Optional[CorpusIndex]:
+    """Process-wide corpus index, loaded from `path` if saved before, else created once `dim` is known."""
+    global _corpus
+    with _corpus_lock:
+        if _corpus is None:
+            if path and CorpusIndex.exists(path):
+                _corpus = CorpusIndex.load(path)
+            elif dim is not None:
+                _corpus = CorpusIndex(dim)
+        return _corpus
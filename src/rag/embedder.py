@@ -1,11 +1,107 @@
-from sentence_transformers import SentenceTransformer
+import resource
+import threading
+import time
+from typing import Any, Dict
+
 import numpy as np
 
+from ..config import EMBEDDING_MODEL, EMBED_CACHE_ENABLED
+from ..utils.metrics import EMBED_TEXTS
+from ..utils.timing import span
+from .embedding_cache import get_cache, text_key
+
+# Process-wide model registry: one SentenceTransformer per model name, shared
+# by every Embedder / pipeline / request.
+_MODELS: Dict[str, Any] = {}
+_MODEL_STATS: Dict[str, Dict[str, Any]] = {}
+_REGISTRY_LOCK = threading.Lock()
+_MODEL_LOCKS: Dict[str, threading.Lock] = {}
+
+
+def _load_model(model_name: str):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # ru_maxrss is KiB on Linux; good enough as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _model_nbytes(model) -> int:
+    try:
+        return int(sum(p.numel() * p.element_size() for p in model.parameters()))
+    except Exception:
+        return 0
+
+
+def get_model(model_name: str = EMBEDDING_MODEL):
+    """Return the shared model for `model_name`, loading it at most once."""
+    model = _MODELS.get(model_name)
+    if model is not None:
+        return model
+    with _REGISTRY_LOCK:
+        lock = _MODEL_LOCKS.setdefault(model_name, threading.Lock())
+    # per-model lock so loading one model doesn't block lookups of another
+    with lock:
+        model = _MODELS.get(model_name)
+        if model is None:
+            rss0, t0 = _rss_bytes(), time.perf_counter()
+            model = _load_model(model_name)
+            _MODEL_STATS[model_name] = {
+                "model": model_name,
+                "load_seconds": round(time.perf_counter() - t0, 3),
+                "param_bytes": _model_nbytes(model),
+                "rss_delta_bytes": max(0, _rss_bytes() - rss0),
+                "loaded_at": time.time(),
+            }
+            _MODELS[model_name] = model
+    return model
+
+
+def warmup(model_name: str = EMBEDDING_MODEL) -> Dict[str, Any]:
+    get_model(model_name)
+    return _MODEL_STATS[model_name]
+
+
+def model_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: dict(stats) for name, stats in _MODEL_STATS.items()}
+
+
 class Embedder:
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = EMBEDDING_MODEL, use_cache: bool = EMBED_CACHE_ENABLED):
+        self.model_name = model_name
+        self.model = get_model(model_name)
+        self.cache = get_cache(model_name) if use_cache else None
 
-    def encode(self, texts):
+    def _encode(self, texts):
         emb = self.model.encode(texts, show_progress_bar=False, normalize_embeddings=True)
         return np.array(emb, dtype="float32")
 
+    def encode(self, texts):
+        with span("encode", model=self.model_name):
+            return self._encode_cached(texts)
+
+    def _encode_cached(self, texts):
+        if self.cache is None or isinstance(texts, str) or not texts:
+            EMBED_TEXTS.inc(1 if isinstance(texts, str) else len(texts), source="model")
+            return self._encode(texts)
+        keys = [text_key(t) for t in texts]
+        found = self.cache.get_many(keys)
+        # only the (unique) misses go to the model, in one batch
+        missing = {}
+        for i, v in enumerate(found):
+            if v is None and keys[i] not in missing:
+                missing[keys[i]] = texts[i]
+        EMBED_TEXTS.inc(len(texts) - len(missing), source="cache")
+        EMBED_TEXTS.inc(len(missing), source="model")
+        if missing:
+            fresh = self._encode(list(missing.values()))
+            self.cache.put_many(list(missing.keys()), fresh)
+            by_key = dict(zip(missing.keys(), fresh))
+            found = [v if v is not None else by_key[k] for k, v in zip(keys, found)]
+        return np.stack(found).astype("float32", copy=False)
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..config import EMBED_CACHE_DIR, EMBED_CACHE_DTYPE, EMBED_CACHE_SIZE
+from .quantization import decode_rows, encode_rows, row_dtype
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WS_RE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+_VEC_FILES = {"float32": "vectors.f32", "float16": "vectors.f16", "int8": "vectors.i8"}
+
+try:
+    import fcntl
+except ImportError:         # no flock (Windows): keep one writer process per cache directory
+    fcntl = None
+
+
+@contextmanager
+def _file_lock(path: str):
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class _DiskTier:
+    """
+    Append-only matrix on disk (read through np.memmap) plus a key file of
+    "<text hash> <row>" lines. Rows are float32, float16 or int8 with a
+    per-row scale; a directory keeps the dtype it was created with.
+
+    Appends hold an exclusive lock on a sibling lock file, so several
+    processes can share one directory. A key's row is the vector file's
+    row count at write time, never a count kept in memory. Vectors are
+    written before their keys, so a crash mid-append leaves rows no key
+    points at; the next open cuts the file back to the last referenced row.
+    """
+
+    def __init__(self, path: str, dtype: str = "float32"):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.key_path = os.path.join(path, "keys.txt")
+        self.meta_path = os.path.join(path, "meta.json")
+        self.lock_path = os.path.join(path, ".lock")
+        self.dtype = dtype
+        self.dim: Optional[int] = None
+        self.rows: Dict[str, int] = {}
+        self._n_rows = 0            # rows this process may map: 1 + the highest row it knows a key for
+        self._mm: Optional[np.memmap] = None
+        with _file_lock(self.lock_path):
+            self._load()
+
+    @property
+    def vec_path(self) -> str:
+        return os.path.join(self.path, _VEC_FILES[self.dtype])
+
+    def _read_meta(self) -> bool:
+        if not os.path.exists(self.meta_path):
+            return False
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        self.dim, self.dtype = int(meta["dim"]), meta.get("dtype", "float32")
+        return True
+
+    def _load(self):
+        """Read the key file and drop torn rows past the last key (caller holds the lock)."""
+        if not self._read_meta():
+            return
+        row_bytes = row_dtype(self.dim, self.dtype).itemsize
+        n_vec = os.path.getsize(self.vec_path) // row_bytes if os.path.exists(self.vec_path) else 0
+        if os.path.exists(self.key_path):
+            with open(self.key_path) as f:
+                for i, line in enumerate(f):
+                    key, _, row = line.strip().partition(" ")
+                    row = int(row) if row else i        # files written before rows were recorded
+                    if row < n_vec:
+                        self.rows[key] = row
+                        self._n_rows = max(self._n_rows, row + 1)
+        if os.path.exists(self.vec_path) and os.path.getsize(self.vec_path) > self._n_rows * row_bytes:
+            os.truncate(self.vec_path, self._n_rows * row_bytes)
+
+    def _mapped(self) -> np.memmap:
+        n = self._n_rows
+        if self._mm is None or self._mm.shape[0] < n:
+            self._mm = np.memmap(self.vec_path, dtype=row_dtype(self.dim, self.dtype), mode="r", shape=(n,))
+        return self._mm
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        return decode_rows(self._mapped()[row:row + 1])[0]
+
+    def put_many(self, keys: List[str], vectors: np.ndarray):
+        new = [(k, v) for k, v in zip(keys, vectors) if k not in self.rows]
+        if not new:
+            return
+        with _file_lock(self.lock_path):
+            if self.dim is None and not self._read_meta():
+                self.dim = int(vectors.shape[1])
+                with open(self.meta_path, "w") as f:
+                    json.dump({"dim": self.dim, "dtype": self.dtype}, f)
+            row_bytes = row_dtype(self.dim, self.dtype).itemsize
+            with open(self.vec_path, "ab") as f:
+                start = f.tell() // row_bytes
+                f.truncate(start * row_bytes)       # a partial row left by a crash
+                f.write(np.ascontiguousarray(encode_rows([v for _, v in new], self.dtype)).tobytes())
+            with open(self.key_path, "a") as f:
+                f.write("".join(f"{k} {start + i}\n" for i, (k, _) in enumerate(new)))
+        for i, (k, _) in enumerate(new):
+            self.rows[k] = start + i
+        self._n_rows = max(self._n_rows, start + len(new))
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of embeddings keyed by (model name, normalized text hash):
+    a bounded in-memory LRU in front of an optional memory-mapped disk tier.
+    With dtype float16 / int8 both tiers hold compact rows (2x / ~4x smaller)
+    and hits are decoded back to float32.
+    """
+
+    def __init__(self, model_name: str, max_items: int = EMBED_CACHE_SIZE, cache_dir: str = EMBED_CACHE_DIR,
+                 dtype: str = EMBED_CACHE_DTYPE):
+        self.model_name = model_name
+        self.max_items = max_items
+        self.dtype = dtype
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        if cache_dir:
+            slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+            self._disk = _DiskTier(os.path.join(cache_dir, slug), dtype)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        out = []
+        with self._lock:
+            for k in keys:
+                v = self._lru.get(k)
+                if v is not None:
+                    self._lru.move_to_end(k)
+                    v = self._decode(v)
+                    self.hits += 1
+                elif self._disk is not None and (v := self._disk.get(k)) is not None:
+                    self._remember(k, v)
+                    self.hits += 1
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+                out.append(v)
+        return out
+
+    def put_many(self, keys: List[str], vectors: np.ndarray):
+        with self._lock:
+            for k, v in zip(keys, vectors):
+                self._remember(k, v)
+            if self._disk is not None:
+                self._disk.put_many(keys, vectors)
+
+    def _decode(self, row: np.ndarray) -> np.ndarray:
+        return row if self.dtype == "float32" else decode_rows(row)[0]
+
+    def _remember(self, key: str, vec: np.ndarray):
+        self._lru[key] = vec if self.dtype == "float32" else encode_rows(vec, self.dtype)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "dtype": self.dtype,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_items": len(self._lru),
+            "disk_items": len(self._disk.rows) if self._disk is not None else 0,
+        }
+
+
+_CACHES: Dict[str, EmbeddingCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_cache(model_name: str) -> EmbeddingCache:
+    with _CACHES_LOCK:
+        cache = _CACHES.get(model_name)
+        if cache is None:
+            cache = _CACHES[model_name] = EmbeddingCache(model_name)
+        return cache
+
+
+def cache_stats() -> Dict[str, Dict]:
+    return {name: c.stats() for name, c in _CACHES.items()}
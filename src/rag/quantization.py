@@ -0,0 +1,78 @@
+"""
+Compact encodings for unit-normalized embedding rows.
+
+- float16: half precision, 2 bytes per dimension.
+- int8: one scale per row (max |x| / 127) plus a signed byte per dimension,
+  stored as a structured row so a memmap reads both at once.
+- binary: one sign bit per dimension (search codes only, not decodable).
+"""
+from typing import Tuple
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+STORAGES = DTYPES + ("binary",)
+
+
+def row_dtype(dim: int, dtype: str) -> np.dtype:
+    """numpy dtype of one stored row (int8 rows are a (scale, codes) record)."""
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype={dtype!r}; expected one of {DTYPES}")
+    if dtype == "int8":
+        return np.dtype([("scale", "<f4"), ("q", "i1", (dim,))])
+    return np.dtype((np.dtype(dtype), (dim,)))
+
+
+def encode_rows(vectors: np.ndarray, dtype: str) -> np.ndarray:
+    """(n, dim) float rows in `dtype`; int8 gives an (n,) record array."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype="float32"))
+    if dtype == "int8":
+        out = np.empty(len(vectors), dtype=row_dtype(vectors.shape[1], dtype))
+        scale = np.abs(vectors).max(axis=1) / 127.0
+        out["scale"] = scale
+        out["q"] = np.round(vectors / np.maximum(scale, 1e-12)[:, None]).astype("int8")
+        return out
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype={dtype!r}; expected one of {DTYPES}")
+    return vectors.astype(dtype)
+
+
+def decode_rows(rows: np.ndarray) -> np.ndarray:
+    """float32 (n, dim) from rows made by encode_rows."""
+    if rows.dtype.names:
+        return rows["q"].astype("float32") * rows["scale"].astype("float32")[:, None]
+    return np.asarray(rows, dtype="float32")
+
+
+def binary_codes(vectors: np.ndarray) -> np.ndarray:
+    """Sign bits packed 8 per byte: (n, dim / 8) uint8 for faiss binary indexes."""
+    vectors = np.asarray(vectors, dtype="float32")
+    if vectors.shape[1] % 8:
+        raise ValueError("binary storage needs a dimension divisible by 8")
+    return np.packbits(vectors > 0, axis=1)
+
+
+def hamming_to_cosine(distances: np.ndarray, dim: int) -> np.ndarray:
+    # fraction of agreeing signs, rescaled to [-1, 1] (a coarse cosine proxy)
+    return 1.0 - 2.0 * distances.astype("float32") / dim
+
+
+def topk_rescore(queries: np.ndarray, candidates: np.ndarray, vectors, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact inner products of each query with its candidate rows (-1 = none),
+    keeping the best k. `vectors` is anything indexable by a row array
+    (float32 matrix or memmap). Returns (scores, ids) padded with -1.
+    """
+    q, c = candidates.shape
+    scores = np.full((q, c), -np.inf, dtype="float32")
+    valid = candidates >= 0
+    rows = np.unique(candidates[valid])
+    if len(rows):
+        table = np.asarray(vectors[rows], dtype="float32")
+        pos = np.searchsorted(rows, np.where(valid, candidates, rows[0]))
+        scores = np.einsum("qcd,qd->qc", table[pos], queries.astype("float32"))
+        scores[~valid] = -np.inf
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    top = np.take_along_axis(scores, order, axis=1)
+    ids = np.where(np.isfinite(top), np.take_along_axis(candidates, order, axis=1), -1)
+    return top, ids
@@ -1,24 +1,308 @@
+import math
+import os
 import faiss
 import numpy as np
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from ..config import (
+    FAISS_INDEX_TYPE, FAISS_NPROBE, FAISS_EF_SEARCH, FAISS_ANN_MIN_SIZE, FAISS_TRAIN_SIZE,
+    FAISS_STORAGE, FAISS_RESCORE, HYBRID_RETRIEVAL, HYBRID_DEPTH, HYBRID_MAX_CHUNKS, RRF_K
+)
+from .bm25 import BM25Index, reciprocal_rank_fusion
+from .quantization import STORAGES, binary_codes, hamming_to_cosine, topk_rescore
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+_SQ_TYPES = {"float16": "QT_fp16", "int8": "QT_8bit"}
+
+
+def _pq_subquantizers(dim: int, m: int) -> int:
+    # PQ needs m | dim; take the largest divisor of dim not above m
+    return max(d for d in range(1, min(m, dim) + 1) if dim % d == 0)
+
+
+def make_index(dim: int, index_type: str, n: int, nlist: Optional[int] = None,
+               hnsw_m: int = 32, pq_m: int = 16, pq_nbits: int = 8, storage: str = "float32"):
+    """
+    Build an (untrained) inner-product index sized for roughly `n` vectors.
+    `storage` picks the vector codes: float32, float16 / int8 scalar
+    quantization, or binary sign bits (a Hamming index). ivf_pq has its own
+    compressed codes and only accepts float32.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index_type={index_type!r}; expected one of {INDEX_TYPES}")
+    if storage not in STORAGES:
+        raise ValueError(f"Unknown storage={storage!r}; expected one of {STORAGES}")
+    if index_type == "ivf_pq" and storage != "float32":
+        raise ValueError("ivf_pq already stores compressed codes; use storage='float32'")
+    nlist = min(nlist or max(1, int(math.sqrt(n))), max(1, n))
+    if storage == "binary":
+        if index_type == "flat":
+            return faiss.IndexBinaryFlat(dim)
+        if index_type == "hnsw":
+            return faiss.IndexBinaryHNSW(dim, hnsw_m)
+        return faiss.IndexBinaryIVF(faiss.IndexBinaryFlat(dim), dim, nlist)
+    sq = getattr(faiss.ScalarQuantizer, _SQ_TYPES[storage]) if storage in _SQ_TYPES else None
+    if index_type == "flat":
+        if sq is not None:
+            return faiss.IndexScalarQuantizer(dim, sq, faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexFlatIP(dim)
+    if index_type == "hnsw":
+        if sq is not None:
+            return faiss.IndexHNSWSQ(dim, sq, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+    quantizer = faiss.IndexFlatIP(dim)
+    if index_type == "ivf_flat":
+        if sq is not None:
+            return faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, sq, faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+    # PQ k-means needs at least 2**nbits training points
+    nbits = min(pq_nbits, max(1, int(math.log2(max(n, 2)))))
+    return faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim, pq_m), nbits,
+                            faiss.METRIC_INNER_PRODUCT)
+
+
+def index_bytes(index) -> int:
+    """
+    Resident size of a FAISS index, from its structure rather than a
+    serialized copy: ntotal x code size, plus ids, centroids and PQ
+    codebooks for IVF, or the neighbour links for HNSW.
+    """
+    binary = isinstance(index, faiss.IndexBinary)
+    downcast = faiss.downcast_IndexBinary if binary else faiss.downcast_index
+    if hasattr(index, "hnsw"):
+        h = index.hnsw
+        return index_bytes(downcast(index.storage)) + 4 * (h.neighbors.size() + h.levels.size()) + 8 * h.offsets.size()
+    if isinstance(index, (faiss.IndexIVF, faiss.IndexBinaryIVF)):
+        codebook = index.pq.centroids.size() * 4 if hasattr(index, "pq") else 0
+        direct_map = index.direct_map.array.size() * 8 if hasattr(index, "direct_map") else 0
+        return index.ntotal * (index.code_size + 8) + index_bytes(downcast(index.quantizer)) + codebook + direct_map
+    return index.ntotal * index.code_size
+
+
+class _FloatRows:
+    """
+    Full-precision copies of the indexed vectors for rescoring: in memory, or
+    appended to `path` and memory-mapped so only candidate rows are paged in.
+    """
+
+    def __init__(self, dim: int, path: Optional[str] = None):
+        self.dim = dim
+        self.path = path
+        self.n = 0
+        self._blocks: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            open(path, "wb").close()
+
+    def add(self, x: np.ndarray):
+        if self.path:
+            with open(self.path, "ab") as f:
+                f.write(x.tobytes())
+        else:
+            self._blocks.append(x)
+        self.n += len(x)
+        self._matrix = None
+
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            if self.path:
+                self._matrix = np.memmap(self.path, dtype="float32", mode="r", shape=(self.n, self.dim))
+            else:
+                self._blocks = [np.vstack(self._blocks)] if self._blocks else []
+                self._matrix = self._blocks[0] if self._blocks else np.zeros((0, self.dim), "float32")
+        return self._matrix
+
+    def memory_bytes(self) -> int:
+        return 0 if self.path else self.n * self.dim * 4
+
 
 class FaissStore:
-    def __init__(self, dim: int):
-        # Cosine via dot product on normalized vectors (IP)
-        self.index = faiss.IndexFlatIP(dim)
+    """
+    Cosine-similarity store over normalized vectors. `index_type` picks exact
+    search ("flat") or an ANN structure ("ivf_flat", "hnsw", "ivf_pq"). The
+    index is created on the first add so IVF can size nlist and train on a
+    sample of that data; collections smaller than `ann_min_size` stay flat,
+    where brute force is both exact and faster. A flat store that grows past
+    `ann_min_size` is rebuilt as `index_type` on that add; rebuild() re-sizes
+    an ANN index on demand (e.g. after IVF has outgrown its nlist).
+
+    `storage` compresses the indexed vectors (float16, int8, binary). A
+    compact search then fetches `rescore` x k candidates and re-ranks them by
+    exact inner product against float32 copies, kept in memory or, with
+    `rescore_path`, in a memory-mapped file (rescore=0 skips this).
+
+    With `hybrid`, the texts also go into a BM25 index; search_batch calls
+    that pass the query texts fuse the dense and BM25 top `hybrid_depth`
+    lists by reciprocal rank. Hits keep their cosine similarity as the score.
+    hybrid=None (auto) keeps BM25 only while the store holds at most
+    `hybrid_max_chunks` texts, so large stores stay dense-only.
+    """
+
+    def __init__(self, dim: int, index_type: str = FAISS_INDEX_TYPE, nlist: Optional[int] = None,
+                 nprobe: int = FAISS_NPROBE, ef_search: int = FAISS_EF_SEARCH, hnsw_m: int = 32,
+                 pq_m: int = 16, pq_nbits: int = 8, train_size: int = FAISS_TRAIN_SIZE,
+                 ann_min_size: int = FAISS_ANN_MIN_SIZE, storage: str = FAISS_STORAGE,
+                 rescore: int = FAISS_RESCORE, rescore_path: Optional[str] = None,
+                 hybrid: Optional[bool] = HYBRID_RETRIEVAL, hybrid_depth: int = HYBRID_DEPTH,
+                 hybrid_max_chunks: int = HYBRID_MAX_CHUNKS, rrf_k: int = RRF_K):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index_type={index_type!r}; expected one of {INDEX_TYPES}")
+        if storage not in STORAGES:
+            raise ValueError(f"Unknown storage={storage!r}; expected one of {STORAGES}")
+        self.dim = dim
+        self.index_type = index_type
+        self.storage = storage
+        self.rescore = rescore if storage != "float32" else 0
+        self._floats = _FloatRows(dim, rescore_path) if self.rescore else None
+        self.params = dict(nlist=nlist, hnsw_m=hnsw_m, pq_m=pq_m, pq_nbits=pq_nbits, storage=storage)
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.train_size = train_size
+        self.ann_min_size = ann_min_size
+        self.index = None
+        self.index_type_used: Optional[str] = None
         self.texts: List[str] = []
+        self.bm25 = BM25Index() if hybrid is not False else None
+        self.hybrid_max_chunks = hybrid_max_chunks if hybrid is None else None
+        self.hybrid_depth = hybrid_depth
+        self.rrf_k = rrf_k
+
+    def _build(self, codes: np.ndarray):
+        n = codes.shape[0]
+        kind = self.index_type if n >= self.ann_min_size else "flat"
+        index = make_index(self.dim, kind, n, **self.params)
+        if not index.is_trained:
+            sample = codes
+            if n > self.train_size:
+                rng = np.random.default_rng(0)
+                sample = codes[rng.choice(n, self.train_size, replace=False)]
+            index.train(sample)
+        self.index, self.index_type_used = index, kind
+        self.set_search_params()
+
+    def _stored_codes(self) -> np.ndarray:
+        # exact float copies when rescoring keeps them, otherwise what the index holds
+        if self._floats is not None and self.storage != "binary":
+            return np.array(self._floats.matrix())
+        try:
+            return self.index.reconstruct_n(0, self.index.ntotal)
+        except RuntimeError:
+            faiss.extract_index_ivf(self.index).make_direct_map()
+            return self.index.reconstruct_n(0, self.index.ntotal)
+
+    def rebuild(self, extra: Optional[np.ndarray] = None):
+        """Re-pick the index type and size for everything stored (plus `extra` codes) and re-add it."""
+        codes = self._stored_codes()
+        if extra is not None:
+            codes = np.concatenate([codes, extra])
+        self._build(codes)
+        self.index.add(codes)
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """Tune the recall/speed trade-off at query time."""
+        self.nprobe = nprobe or self.nprobe
+        self.ef_search = ef_search or self.ef_search
+        if self.index is None:
+            return
+        if hasattr(self.index, "nprobe"):
+            self.index.nprobe = self.nprobe
+        if hasattr(self.index, "hnsw"):
+            self.index.hnsw.efSearch = self.ef_search
 
     def add(self, embeddings: np.ndarray, texts: List[str]):
         assert embeddings.shape[0] == len(texts)
-        self.index.add(embeddings)
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        codes = self._codes(embeddings)
+        if self.index is None:
+            self._build(codes)
+            self.index.add(codes)
+        elif (self.index_type_used == "flat" and self.index_type != "flat"
+              and self.index.ntotal + len(codes) >= self.ann_min_size):
+            self.rebuild(codes)     # grown past ann_min_size: switch to the configured ANN index
+        else:
+            self.index.add(codes)
+        if self._floats is not None:
+            self._floats.add(embeddings)
         self.texts.extend(texts)
+        if self.bm25 is not None:
+            if self.hybrid_max_chunks is not None and len(self.texts) > self.hybrid_max_chunks:
+                self.bm25 = None        # auto: too large for BM25 to fit the per-request budget
+            else:
+                self.bm25.add(texts)
+
+    def _codes(self, x: np.ndarray) -> np.ndarray:
+        return binary_codes(x) if self.storage == "binary" else x
 
     def search(self, query_vec: np.ndarray, k: int = 5) -> List[Tuple[float, str]]:
-        D, I = self.index.search(query_vec, k)
-        out = []
-        for score, idx in zip(D[0], I[0]):
-            if idx < 0:
-                continue
-            out.append((float(score), self.texts[idx]))
-        return out
+        return self.search_batch(query_vec[:1], k=k)[0]
+
+    def search_batch(self, query_vecs: np.ndarray, k: int = 5,
+                     query_texts: Optional[List[str]] = None) -> List[List[Tuple[float, str]]]:
+        """
+        One FAISS call for many queries; returns one hit list per query row.
+        `query_texts` (one per row) turns on BM25 fusion for hybrid stores.
+        """
+        if self.index is None:
+            return [[] for _ in range(len(query_vecs))]
+        q = np.ascontiguousarray(query_vecs, dtype="float32")
+        if self.bm25 is not None and query_texts is not None:
+            return self._hybrid_search(q, query_texts, k)
+        D, I = self._dense_search(q, k)
+        texts = self.texts
+        return [
+            [(float(score), texts[idx]) for score, idx in zip(drow.tolist(), irow.tolist()) if idx >= 0]
+            for drow, irow in zip(D, I)
+        ]
+
+    def _dense_search(self, q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        D, I = self.index.search(self._codes(q), k * self.rescore if self.rescore else k)
+        if self.rescore:
+            D, I = topk_rescore(q, I, self._floats.matrix(), k)
+        elif self.storage == "binary":
+            D = hamming_to_cosine(D, self.dim)
+        return D, I
+
+    def _hybrid_search(self, q: np.ndarray, query_texts: List[str], k: int) -> List[List[Tuple[float, str]]]:
+        depth = max(k, self.hybrid_depth)
+        D, I = self._dense_search(q, depth)
+        lexical = self.bm25.search_batch(query_texts, depth)
+        fused, cosine = [], {}
+        for r, (drow, irow, lex) in enumerate(zip(D.tolist(), I.tolist(), lexical)):
+            dense = [i for i in irow if i >= 0]
+            cosine.update(((r, i), d) for i, d in zip(irow, drow) if i >= 0)
+            fused.append(reciprocal_rank_fusion([dense, [i for _, i in lex]], self.rrf_k)[:k])
+        # BM25-only hits get their similarity from the stored vectors
+        extra = [(r, i) for r, ids in enumerate(fused) for i in ids if (r, i) not in cosine]
+        if extra:
+            vecs = self._vectors(np.array([i for _, i in extra], dtype="int64"))
+            for n, (r, i) in enumerate(extra):
+                cosine[(r, i)] = float(vecs[n] @ q[r]) if vecs is not None else 0.0
+        return [[(cosine[(r, i)], self.texts[i]) for i in ids] for r, ids in enumerate(fused)]
+
+    def _vectors(self, ids: np.ndarray) -> Optional[np.ndarray]:
+        if self._floats is not None:
+            return np.asarray(self._floats.matrix()[ids], dtype="float32")
+        if self.storage == "binary":
+            return None
+        try:
+            return self.index.reconstruct_batch(ids)
+        except RuntimeError:
+            # IVF indexes reconstruct only with a direct map
+            faiss.extract_index_ivf(self.index).make_direct_map()
+            return self.index.reconstruct_batch(ids)
+
+    def memory_bytes(self) -> int:
+        """Size of the index (codes + graph/centroids), excluding texts."""
+        return int(index_bytes(self.index)) if self.index is not None else 0
 
+    def stats(self) -> Dict:
+        return {
+            "index_type": self.index_type_used or self.index_type,
+            "vectors": int(self.index.ntotal) if self.index is not None else 0,
+            "storage": self.storage,
+            "memory_bytes": self.memory_bytes(),
+            "rescore_memory_bytes": self._floats.memory_bytes() if self._floats is not None else 0,
+            "nprobe": self.nprobe,
+            "ef_search": self.ef_search,
+        }
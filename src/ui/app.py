@@ -1,8 +1,7 @@
 import os
-import io
+import json
 import requests
 import streamlit as st
-from pdfminer.high_level import extract_text
 
 st.set_page_config(page_title="CV ↔ JD RAG Matcher", layout="wide")
 st.title("CV ↔ JD RAG Matcher (LLM-Scored)")
@@ -17,8 +16,16 @@ with left:
     cv_text = ""
     if uploaded_pdf is not None:
         try:
-            # Extract text directly from in-memory bytes
-            cv_text = extract_text(io.BytesIO(uploaded_pdf.getvalue()))
+            # The API extracts the text; re-uploads of the same file hit its text cache
+            r = requests.post(
+                f"{API_URL}/extract_pdf",
+                data=uploaded_pdf.getvalue(),
+                headers={"Content-Type": "application/pdf"},
+                timeout=120,
+            )
+            if not r.ok:
+                raise RuntimeError(f"API error: {r.status_code} — {r.text}")
+            cv_text = r.text
             st.success("CV text extracted from PDF ✅")
             # Optional preview (collapsible)
             with st.expander("Preview extracted CV text"):
@@ -46,14 +53,108 @@ with right:
 # Tunables
 st.markdown("---")
 top_k = st.slider("Top-k retrieved evidence per requirement", 1, 7, 3)
+stream = st.checkbox("Stream RAG results as each requirement batch finishes", value=False)
 run_btn = st.button("Evaluate CV ↔ JD Match")
 
+
+def render_results(data, partial_note=None):
+    # --- Summary metrics
+    if partial_note:
+        st.info(partial_note)
+    st.success(f"Overall Match: {data.get('overall_score', 0)} / 100")
+    c1, c2, c3 = st.columns(3)
+    sec = data.get("section_scores", {})
+    c1.metric("Hard Skills", sec.get("hard_skills", 0))
+    c2.metric("Experience", sec.get("experience", 0))
+    c3.metric("Soft Skills", sec.get("soft_skills", 0))
+
+    # --- Good matches
+    st.subheader("Good Matches (Evidence-backed)")
+    good_matches = data.get("good_matches", [])
+    if good_matches:
+        for gm in good_matches[:12]:
+            st.markdown(f"**Requirement:** {gm.get('requirement', '')}")
+            if gm.get("evidence"):
+                st.markdown(f"> **Evidence:** {gm.get('evidence', '')}")
+            if gm.get("reason"):
+                st.caption(gm.get("reason", ""))
+            st.divider()
+    else:
+        st.write("No strong matches detected.")
+
+    # --- Missing requirements
+    st.subheader("Missing Requirements")
+    missing_reqs = data.get("missing_requirements", [])
+    if missing_reqs:
+        for mr in missing_reqs[:30]:
+            st.write(f"- {mr}")
+    else:
+        st.write("None detected 🎉")
+
+    # --- Missing / weak skills (LLM + heuristic)
+    st.subheader("Missing / Weak Skills")
+    miss_sk = data.get("missing_skills", [])
+    if miss_sk:
+        st.write(", ".join(sorted(set(miss_sk))[:40]))
+    else:
+        st.write("None detected")
+
+    # --- Improvement suggestions
+    st.subheader("Improvement Suggestions")
+    sugg = data.get("improvement_suggestions", [])
+    if sugg:
+        for s in sugg[:12]:
+            st.write(f"- {s}")
+    else:
+        st.write("No suggestions provided by the LLM.")
+
+
+def stream_results():
+    # NDJSON events from /score_stream; re-render as each batch lands
+    progress = st.progress(0.0, text="Retrieving evidence...")
+    placeholder = st.empty()
+    try:
+        with requests.post(
+            f"{API_URL}/score_stream",
+            json={"cv_text": cv_text, "jd_text": jd_text, "top_k": top_k},
+            stream=True,
+            timeout=(10, 180),   # read timeout applies per batch, not to the whole job
+        ) as r:
+            if not r.ok:
+                st.error(f"API error: {r.status_code} — {r.text}")
+                st.stop()
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                kind = event.get("event")
+                if kind == "start":
+                    progress.progress(0.0, text=f"Scoring {event['requirements']} requirements in {event['batches']} batches...")
+                elif kind == "batch":
+                    done, total = event["completed"], event["batches"]
+                    progress.progress(done / total, text=f"{done}/{total} batches scored")
+                    with placeholder.container():
+                        render_results(event["merged"], partial_note=f"Partial result: {done} of {total} batches")
+                elif kind == "done":
+                    progress.empty()
+                    with placeholder.container():
+                        render_results(event["result"])
+                elif kind == "error":
+                    st.error(f"API error: {event.get('status')} — {event.get('detail')}")
+                    st.stop()
+    except requests.exceptions.RequestException as ex:
+        st.error(f"Could not reach API at {API_URL}. Error: {ex}")
+        st.stop()
+
+
 # --- Call API
 if run_btn:
     if not jd_text:
         st.error("Please paste the Job Description text.")
     elif not cv_text:
         st.error("Please upload a CV PDF so I can extract the text.")
+    elif stream:
+        stream_results()
     else:
         with st.spinner("Scoring with RAG + LLM..."):
             try:
@@ -70,52 +171,4 @@ if run_btn:
             st.error(f"API error: {r.status_code} — {r.text}")
             st.stop()
 
-        data = r.json()
-
-        # --- Summary metrics
-        st.success(f"Overall Match: {data.get('overall_score', 0)} / 100")
-        c1, c2, c3 = st.columns(3)
-        sec = data.get("section_scores", {})
-        c1.metric("Hard Skills", sec.get("hard_skills", 0))
-        c2.metric("Experience", sec.get("experience", 0))
-        c3.metric("Soft Skills", sec.get("soft_skills", 0))
-
-        # --- Good matches
-        st.subheader("Good Matches (Evidence-backed)")
-        good_matches = data.get("good_matches", [])
-        if good_matches:
-            for gm in good_matches[:12]:
-                st.markdown(f"**Requirement:** {gm.get('requirement', '')}")
-                if gm.get("evidence"):
-                    st.markdown(f"> **Evidence:** {gm.get('evidence', '')}")
-                if gm.get("reason"):
-                    st.caption(gm.get("reason", ""))
-                st.divider()
-        else:
-            st.write("No strong matches detected.")
-
-        # --- Missing requirements
-        st.subheader("Missing Requirements")
-        missing_reqs = data.get("missing_requirements", [])
-        if missing_reqs:
-            for mr in missing_reqs[:30]:
-                st.write(f"- {mr}")
-        else:
-            st.write("None detected 🎉")
-
-        # --- Missing / weak skills (LLM + heuristic)
-        st.subheader("Missing / Weak Skills")
-        miss_sk = data.get("missing_skills", [])
-        if miss_sk:
-            st.write(", ".join(sorted(set(miss_sk))[:40]))
-        else:
-            st.write("None detected")
-
-        # --- Improvement suggestions
-        st.subheader("Improvement Suggestions")
-        sugg = data.get("improvement_suggestions", [])
-        if sugg:
-            for s in sugg[:12]:
-                st.write(f"- {s}")
-        else:
-            st.write("No suggestions provided by the LLM.")
+        render_results(r.json())
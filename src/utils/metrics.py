@@ -0,0 +1,105 @@
+import bisect
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _labels(kw: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in kw.items()))
+
+
+def _fmt(name: str, labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return name
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return f"{name}{{{body}}}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_labels(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines += [f"{_fmt(self.name, k)} {v:g}" for k, v in sorted(self._values.items())]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help = name, help
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts, +Inf count, sum)
+        self._values: Dict[Labels, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0, 0.0])
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                entry[0][i] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(_labels(labels))
+        return entry[1] if entry else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, s) in sorted(self._values.items()):
+                cumulative = 0
+                for le, c in zip(self.buckets, counts):
+                    cumulative += c
+                    lines.append(f"{_fmt(self.name + '_bucket', key, (('le', f'{le:g}'),))} {cumulative}")
+                lines.append(f"{_fmt(self.name + '_bucket', key, (('le', '+Inf'),))} {total}")
+                lines.append(f"{_fmt(self.name + '_sum', key)} {s:.6f}")
+                lines.append(f"{_fmt(self.name + '_count', key)} {total}")
+        return lines
+
+
+_registry: Dict[str, object] = {}
+_registry_lock = threading.Lock()
+
+
+def counter(name: str, help: str) -> Counter:
+    with _registry_lock:
+        return _registry.setdefault(name, Counter(name, help))
+
+
+def histogram(name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    with _registry_lock:
+        return _registry.setdefault(name, Histogram(name, help, buckets))
+
+
+def render_prometheus() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+
+# shared by the pipelines, the LLM provider, the embedder and the API
+STAGE_SECONDS = histogram("cvjd_stage_seconds", "Wall time of a pipeline stage or traced call.")
+LLM_CALLS = counter("cvjd_llm_calls_total", "Uncached LLM provider calls by outcome.")
+LLM_INVALID_JSON = counter("cvjd_llm_invalid_json_total", "LLM answers that could not be parsed as JSON.")
+EMBED_TEXTS = counter("cvjd_embed_texts_total", "Texts embedded, by source (cache or model).")
+HTTP_SECONDS = histogram("cvjd_http_request_seconds", "HTTP request latency by route and status.")
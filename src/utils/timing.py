@@ -0,0 +1,67 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from .metrics import STAGE_SECONDS
+
+T = TypeVar("T")
+
+
+class Timings:
+    """Wall-clock seconds per stage name for one request; repeated spans add up."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def as_ms(self) -> Dict[str, float]:
+        return {name: round(s * 1000, 3) for name, s in self.seconds.items()}
+
+
+_current: ContextVar[Optional[Timings]] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def collect() -> Iterator[Timings]:
+    """Record every span opened in this context (and tasks/threads it is copied into)."""
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **labels) -> Iterator[None]:
+    """
+    Time a pipeline stage: always into the `cvjd_stage_seconds` histogram
+    (labelled stage=name plus `labels`), and into the request's Timings when
+    one is being collected.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        STAGE_SECONDS.observe(elapsed, stage=name, **labels)
+        timings = _current.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+def traced(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Bind `fn` to the caller's context so spans it opens in a worker thread
+    (executors don't copy contextvars) still land in the caller's Timings.
+    """
+    ctx = copy_context()
+    return lambda *args: ctx.copy().run(fn, *args)
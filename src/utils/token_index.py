@@ -0,0 +1,77 @@
+import re
+from functools import cached_property
+from typing import Dict, Iterable, List, Union
+
+from ..ingest.document import WORD_RE
+
+RUN_RE = re.compile(r"[a-z0-9]+")
+
+
+class TokenIndex:
+    """
+    Whole-word index over a text (or list of texts) built in one pass.
+    A term is present if it is an alphanumeric run ("docker" in
+    "docker-compose") or a full compound token as tokenize_words sees it
+    ("node.js", "c++"), so "java" no longer matches inside "javascript".
+    Multi-word terms match as consecutive runs ("machine learning").
+    """
+
+    def __init__(self, text: Union[str, Iterable[str]]):
+        if not isinstance(text, str):
+            text = "\n".join(text)
+        self._low = low = text.lower()
+        self.runs = RUN_RE.findall(low)
+        self.terms = frozenset(self.runs).union(WORD_RE.findall(low))
+
+    @classmethod
+    def from_terms(cls, terms: Iterable[str], text: str) -> "TokenIndex":
+        """Rebuild from a stored term set; the text is only scanned if a phrase is looked up."""
+        index = cls.__new__(cls)
+        index._low = text.lower()
+        index.terms = frozenset(terms)
+        return index
+
+    @cached_property
+    def runs(self) -> List[str]:
+        return RUN_RE.findall(self._low)
+
+    @cached_property
+    def positions(self) -> Dict[str, List[int]]:
+        # only needed for phrase lookups, so built on the first one
+        positions: Dict[str, List[int]] = {}
+        for i, run in enumerate(self.runs):
+            positions.setdefault(run, []).append(i)
+        return positions
+
+    def __contains__(self, term: str) -> bool:
+        term = term.lower().strip()
+        if term in self.terms:
+            return True
+        parts = RUN_RE.findall(term)
+        if len(parts) < 2:
+            return False
+        return self.has_phrase(parts)
+
+    def has_phrase(self, parts: List[str]) -> bool:
+        """True if the runs in `parts` occur consecutively somewhere in the text."""
+        starts = self.positions.get(parts[0])
+        if not starts:
+            return False
+        runs, n = self.runs, len(self.runs)
+        return any(
+            i + len(parts) <= n and all(runs[i + j] == p for j, p in enumerate(parts[1:], 1))
+            for i in starts
+        )
+
+    def any_of(self, terms: Iterable[str]) -> bool:
+        return not self.terms.isdisjoint(terms)
+
+    def missing(self, terms: Iterable[str]) -> List[str]:
+        """Terms (in first-seen order, deduplicated) that are not in the text."""
+        out, seen = [], set()
+        for t in terms:
+            if t not in seen:
+                seen.add(t)
+                if t not in self:
+                    out.append(t)
+        return out
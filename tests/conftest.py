@@ -0,0 +1,40 @@
+"""Helpers shared by the pipeline tests: a model-free embedder and deterministic fake LLMs."""
+import json
+import time
+import zlib
+import numpy as np
+
+
+class _HashEmbedder:
+    """Deterministic bag-of-words vectors; no model download."""
+    def __init__(self, *a, **kw):
+        pass
+
+    def encode(self, texts):
+        out = np.zeros((len(texts), 64), dtype="float32")
+        for i, t in enumerate(texts):
+            for w in t.lower().split():
+                out[i, zlib.crc32(w.encode()) % 64] += 1.0
+        return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+
+
+def _fake_llm(latency):
+    def call(prompt):
+        time.sleep(latency)
+        reqs = prompt.split("JOB_REQUIREMENTS:\n", 1)[1].split("\n\n", 1)[0].splitlines()
+        return json.dumps({"overall_score": 50, "missing_requirements": [reqs[0][2:]]})
+    return call
+
+
+CV = "Python developer.\n\nBuilt FastAPI services with Docker on AWS.\n\nLed a team of 4."
+JD = "\n".join(f"- Requirement number {i} about python" for i in range(50))
+
+
+def _docker_llm(prompt):
+    # score = number of evidence lines mentioning docker, so CVs rank deterministically
+    evidence = prompt.split("EVIDENCE_BY_REQUIREMENT:", 1)[1]
+    return json.dumps({"overall_score": 10 * evidence.lower().count("docker")})
+
+
+DOCKER_JD = "- Strong Python\n- Docker in production\n- Kubernetes is a plus"
+DOCKER_CVS = ["Python only.\n\nData analysis.", "Python and Docker.\n\nDocker compose, Docker swarm.", ""]
@@ -0,0 +1,80 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from src.pipeline import artifacts, fast_scoring, match_pipeline
+from tests.conftest import CV, JD, _fake_llm, _HashEmbedder
+
+THRESHOLDS = {"low": 0.2, "match": 0.4, "high": 0.8}
+
+
+def test_npz_round_trip(tmp_path):
+    cv = artifacts.build_artifact("cv", CV, "cand-1", _HashEmbedder())
+    artifacts.ArtifactStore(str(tmp_path)).put(cv)
+
+    loaded = artifacts.ArtifactStore(str(tmp_path)).get("cand-1")
+    assert (loaded.kind, loaded.items, loaded.bullets, loaded.terms) == (cv.kind, cv.items, cv.bullets, cv.terms)
+    assert np.array_equal(loaded.emb, cv.emb) and loaded.emb.dtype == np.float32
+    assert loaded.info()["items"] == len(cv.items)
+    assert "fastapi" in loaded.token_index() and "led a team" in loaded.token_index()
+
+    store = artifacts.ArtifactStore(str(tmp_path))
+    assert store.delete("cand-1") and store.get("cand-1") is None
+    with pytest.raises(HTTPException):
+        store.get("../etc/passwd")
+
+
+def test_scoring_by_id_skips_parsing_and_embedding(tmp_path, monkeypatch):
+    store = artifacts.ArtifactStore(str(tmp_path))
+    store.put(artifacts.build_artifact("cv", CV, "cv-1", _HashEmbedder()))
+    store.put(artifacts.build_artifact("jd", JD, "jd-1", _HashEmbedder()))
+    monkeypatch.setattr(match_pipeline, "Embedder", _HashEmbedder)
+    monkeypatch.setattr(match_pipeline, "acall_llm", lambda p: asyncio.sleep(0, _fake_llm(0)(p)))
+    expected = asyncio.run(match_pipeline.arun_match(CV, JD))
+    expected_fast = fast_scoring.run_match_fast(CV, JD, _HashEmbedder(), THRESHOLDS)
+
+    def boom(*a, **kw):
+        raise AssertionError("ingest stage ran")
+    monkeypatch.setattr(artifacts, "_store", store)
+    monkeypatch.setattr(match_pipeline, "Embedder", boom)
+    monkeypatch.setattr(match_pipeline, "parse_document", boom)
+
+    cv, jd = artifacts.resolve_pair("cv-1", "jd-1")
+    assert asyncio.run(artifacts.arun_match_artifacts(cv, jd)) == expected
+    monkeypatch.setattr(fast_scoring, "_thresholds", THRESHOLDS)
+    assert artifacts.run_match_fast_artifacts(cv, jd) == expected_fast
+
+    with pytest.raises(HTTPException) as e:
+        artifacts.resolve("cv", "missing", None)
+    assert e.value.status_code == 404
+    with pytest.raises(HTTPException) as e:
+        artifacts.resolve("cv", "jd-1", None)
+    assert e.value.status_code == 400
+
+
+def test_bad_doc_id_rejected_before_embedding():
+    def boom(*a, **kw):
+        raise AssertionError("embedded before validating doc_id")
+    with pytest.raises(HTTPException) as e:
+        artifacts.build_artifact("cv", CV, "../escape", boom)
+    assert e.value.status_code == 400
+
+
+def test_reembedding_for_a_new_model_leaves_the_cached_artifact_alone(tmp_path, monkeypatch):
+    class Current(_HashEmbedder):
+        model_name = artifacts.EMBEDDING_MODEL
+
+    store = artifacts.ArtifactStore(str(tmp_path))
+    old = artifacts.build_artifact("cv", CV, "cv-1", _HashEmbedder())
+    old.model, old.emb = "old-model", old.emb * 0
+    store.put(old)
+    monkeypatch.setattr(artifacts, "_store", store)
+    monkeypatch.setattr(artifacts, "Embedder", Current)
+
+    new = artifacts.resolve("cv", "cv-1", None)
+    assert new is not old and new.model == artifacts.EMBEDDING_MODEL and new.emb.any()
+    assert old.model == "old-model" and not old.emb.any()
+    assert store.get("cv-1") is new
+    assert artifacts.ArtifactStore(str(tmp_path)).get("cv-1").model == artifacts.EMBEDDING_MODEL
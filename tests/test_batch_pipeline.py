@@ -0,0 +1,31 @@
+from src.pipeline import batch_pipeline
+from tests.conftest import DOCKER_CVS, DOCKER_JD, _docker_llm, _HashEmbedder
+
+
+class _CountingEmbedder(_HashEmbedder):
+    calls = 0
+
+    def encode(self, texts):
+        type(self).calls += 1
+        return super().encode(texts)
+
+
+def test_one_jd_many_cvs_embeds_once_and_ranks(monkeypatch):
+    monkeypatch.setattr(batch_pipeline, "Embedder", _CountingEmbedder)
+    monkeypatch.setattr(batch_pipeline, "call_llm", _docker_llm)
+    _CountingEmbedder.calls = 0
+
+    out = batch_pipeline.run_match_batch(jd_text=DOCKER_JD, cv_texts=DOCKER_CVS, ids=["a", "b", "c"], top_k=1)
+
+    assert _CountingEmbedder.calls == 1
+    assert out["mode"] == "jd_vs_cvs"
+    assert [r["id"] for r in out["results"]] == ["a", "b", "c"]
+    assert out["ranking"][0]["id"] == "b"
+
+
+def test_one_cv_many_jds(monkeypatch):
+    monkeypatch.setattr(batch_pipeline, "Embedder", _HashEmbedder)
+    monkeypatch.setattr(batch_pipeline, "call_llm", _docker_llm)
+    out = batch_pipeline.run_match_batch(cv_text=DOCKER_CVS[1], jd_texts=[DOCKER_JD, "- Excel reporting skills"], top_k=1)
+    assert out["mode"] == "cv_vs_jds"
+    assert [r["index"] for r in out["ranking"]] == [0, 1]
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from src.rag.bm25 import BM25Index, bm25_tokens, reciprocal_rank_fusion
+from src.rag.store import FaissStore
+from tests.conftest import _HashEmbedder
+
+CHUNKS = [
+    "Deployed services to Kubernetes clusters with Helm charts.",
+    "Built ETL jobs in PySpark on Databricks.",
+    "Wrote Node.js and C++ tooling for the build system.",
+    "Mentored junior engineers and ran design reviews.",
+    "Kubernetes Kubernetes Kubernetes operators, a very long chunk about Kubernetes and many other things too.",
+]
+
+
+def test_bm25_ranks_exact_tech_tokens():
+    index = BM25Index()
+    index.add(CHUNKS)
+    hits = index.search_batch(["PySpark pipelines", "node.js experience", "kubernetes", "cobol"], k=3)
+    assert [i for _, i in hits[0]] == [1]
+    assert [i for _, i in hits[1]] == [2]
+    assert {i for _, i in hits[2]} == {0, 4} and hits[3] == []
+    assert "c++" in bm25_tokens(CHUNKS[2]) and "with" not in bm25_tokens(CHUNKS[0])
+    # batched and single queries agree
+    assert index.search_batch(["kubernetes"], k=3) == [hits[2]]
+
+
+def test_reciprocal_rank_fusion():
+    assert reciprocal_rank_fusion([[1, 2, 3], [3, 1]]) == [1, 3, 2]
+    assert reciprocal_rank_fusion([[5], []]) == [5]
+
+
+def test_hybrid_store_surfaces_keyword_hits_with_cosine_scores():
+    emb = _HashEmbedder().encode(CHUNKS)
+    # a query vector pointing away from every chunk: dense alone ranks arbitrarily
+    q = -emb.mean(axis=0, keepdims=True)
+    q /= np.linalg.norm(q)
+    dense = FaissStore(dim=emb.shape[1], hybrid=False)
+    dense.add(emb, CHUNKS)
+    hybrid = FaissStore(dim=emb.shape[1], hybrid=True, hybrid_depth=2)
+    hybrid.add(emb, CHUNKS)
+
+    hits = hybrid.search_batch(q, k=2, query_texts=["PySpark"])[0]
+    assert CHUNKS[1] in [t for _, t in hits]
+    assert dict((t, s) for s, t in hits)[CHUNKS[1]] == pytest.approx(float(emb[1] @ q[0]), abs=1e-6)
+    assert hybrid.search_batch(q, k=2) == dense.search_batch(q, k=2)
+
+
+def test_auto_hybrid_covers_cv_stores_and_drops_bm25_past_the_cap():
+    emb = _HashEmbedder().encode(CHUNKS)
+    small = FaissStore(dim=emb.shape[1], hybrid=None, hybrid_max_chunks=len(CHUNKS))
+    small.add(emb, CHUNKS)
+    assert small.bm25 is not None and len(small.bm25) == len(CHUNKS)
+
+    large = FaissStore(dim=emb.shape[1], hybrid=None, hybrid_max_chunks=len(CHUNKS))
+    large.add(emb, CHUNKS)
+    large.add(emb[:1], CHUNKS[:1])
+    assert large.bm25 is None
+    forced = FaissStore(dim=emb.shape[1], hybrid=True, hybrid_max_chunks=1)
+    forced.add(emb, CHUNKS)
+    assert forced.bm25 is not None
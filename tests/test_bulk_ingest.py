@@ -0,0 +1,67 @@
+import io
+import json
+from pdfminer.high_level import extract_text
+from src.ingest import bulk_ingest
+from src.ingest.bulk_ingest import TextCache, ingest_directory, iter_pages, pdf_bytes_to_text
+
+
+def _pdf(pages):
+    """Minimal uncompressed PDF, one line of Helvetica text per page."""
+    n = len(pages)
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (4 + 2 * i) for i in range(n))
+            + b"] /Count %d >>" % n,
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    for i, text in enumerate(pages):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode() + b") Tj ET"
+        objs.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources "
+                    b"<< /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (5 + 2 * i))
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objs, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % i + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1))
+    out.writelines(b"%010d 00000 n \n" % o for o in offsets)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref))
+    return out.getvalue()
+
+
+PAGES = [f"Page {i} Python Docker experience" for i in range(10)]
+
+
+def test_parallel_pages_match_pdfminer_and_hit_cache(tmp_path, monkeypatch):
+    data = _pdf(PAGES)
+    cache = TextCache(str(tmp_path / "cache"))
+    monkeypatch.setattr(bulk_ingest, "PDF_WORKERS", 2)
+
+    pages = list(iter_pages(data, cache, min_parallel_pages=4))
+    assert [p.strip() for p in pages] == PAGES
+    assert pdf_bytes_to_text(data, cache) == extract_text(io.BytesIO(data))
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
+
+    def boom(*a, **kw):
+        raise AssertionError("cached documents must not be re-extracted")
+    monkeypatch.setattr(bulk_ingest, "extract_pages", boom)
+    assert list(iter_pages(data, TextCache(str(tmp_path / "cache")))) == pages
+
+
+def test_ingest_directory_skips_unchanged(tmp_path):
+    src = tmp_path / "cvs"
+    (src / "team").mkdir(parents=True)
+    (src / "a.pdf").write_bytes(_pdf(["Alice Python"]))
+    (src / "team" / "b.pdf").write_bytes(_pdf(["Bob Docker", "Bob Kubernetes"]))
+    out = tmp_path / "out"
+
+    first = ingest_directory(str(src), str(out), workers=2, cache_dir=str(tmp_path / "cache"))
+    assert first["ingested"] == 2 and first["pages"] == 3
+    recs = {r["doc_id"]: r for r in map(json.loads, (out / "chunks.jsonl").read_text().splitlines())}
+    assert set(recs) == {"a", "team/b"} and recs["team/b"]["pages"] == 2
+    assert "Bob Kubernetes" in (out / "texts" / "team" / "b.txt").read_text()
+
+    (src / "a.pdf").write_bytes(_pdf(["Alice Python and Go"]))
+    second = ingest_directory(str(src), str(out), workers=2, cache_dir=str(tmp_path / "cache"))
+    assert second["ingested"] == 1 and second["skipped"] == 1
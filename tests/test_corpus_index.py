@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from src.rag.corpus_index import CorpusIndex
+
+
+def _unit(rows):
+    x = np.array(rows, dtype="float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def test_add_delete_update_and_reload(tmp_path):
+    idx = CorpusIndex(dim=3)
+    idx.add_document("alice", ["python", "docker"], _unit([[1, 0, 0], [0, 1, 0]]), {"name": "Alice"})
+    idx.add_document("bob", ["excel"], _unit([[0, 0, 1]]))
+    idx.update_document("bob", ["excel", "python-ish"], _unit([[0, 0, 1], [1, 0.2, 0]]))
+    assert idx.stats() == {"documents": 2, "chunks": 4, "dim": 3}
+
+    idx.save(str(tmp_path))
+    loaded = CorpusIndex.load(str(tmp_path))
+    ranked = loaded.search_candidates(_unit([[1, 0, 0], [0, 1, 0]]), k_per_req=4, top_n=2)
+    assert [c["doc_id"] for c in ranked] == ["alice", "bob"]
+    assert ranked[0]["metadata"] == {"name": "Alice"}
+
+    assert loaded.delete_document("alice")
+    assert loaded.search(_unit([[1, 0, 0]]), k=5)[0][0][1] == "bob"
+    # ids stay unique after reload
+    loaded.add_document("carol", ["go"], _unit([[0, 1, 1]]))
+    assert len(set(loaded.chunks)) == loaded.index.ntotal == 3
+
+
+def test_save_appends_only_the_edits_and_compacts_superseded_records(tmp_path):
+    idx = CorpusIndex(dim=3)
+    for d in range(4):
+        idx.add_document(f"cv{d}", [f"text {d}"], _unit([[1, d, 0]]))
+    idx.save(str(tmp_path))
+    journal = tmp_path / CorpusIndex.META_FILE
+    before = journal.read_text()
+
+    idx.add_document("cv9", ["text 9"], _unit([[0, 0, 1]]))
+    idx.delete_document("cv0")
+    idx.save(str(tmp_path))
+    after = journal.read_text()
+    assert after.startswith(before) and len(after.splitlines()) == len(before.splitlines()) + 2
+    assert CorpusIndex.load(str(tmp_path)).stats() == idx.stats() == {"documents": 4, "chunks": 4, "dim": 3}
+
+    for _ in range(3):      # replacing the same document piles up superseded records
+        idx.update_document("cv1", ["text 1b"], _unit([[1, 1, 1]]))
+    idx.save(str(tmp_path))
+    assert len(journal.read_text().splitlines()) == 1 + 4
+    loaded = CorpusIndex.load(str(tmp_path))
+    assert loaded.docs == idx.docs and loaded.chunks == idx.chunks and loaded.next_id == idx.next_id
+
+
+def test_rebuild_as_ivf_keeps_ids_and_deletes():
+    rng = np.random.default_rng(0)
+    idx = CorpusIndex(dim=16)
+    for d in range(50):
+        idx.add_document(f"cv{d}", [f"c{d}.{j}" for j in range(4)], _unit(rng.normal(size=(4, 16))))
+    probe = idx.index.reconstruct(17)[None, :]
+    idx.rebuild("ivf_flat", nprobe=64)
+    assert idx.search(probe, k=1)[0][0][2] == idx.chunks[17][1]
+    assert idx.delete_document("cv4") and idx.index.ntotal == 196
+
+
+def test_rebuilt_ivf_index_stays_writable_after_mmap_load(tmp_path):
+    rng = np.random.default_rng(1)
+    idx = CorpusIndex(dim=16)
+    for d in range(50):
+        idx.add_document(f"cv{d}", [f"c{d}.{j}" for j in range(4)], _unit(rng.normal(size=(4, 16))))
+    probe = idx.index.reconstruct(9)[None, :]
+    idx.rebuild("ivf_flat", nprobe=64)
+    idx.save(str(tmp_path))
+
+    loaded = CorpusIndex.load(str(tmp_path))
+    assert loaded.search(probe, k=1)[0][0][1] == "cv2"
+    assert loaded.delete_document("cv2")
+    loaded.add_document("new", ["n0"], _unit(rng.normal(size=(1, 16))))
+    loaded.update_document("cv3", ["c3.x"], _unit(rng.normal(size=(1, 16))))
+    assert loaded.stats() == {"documents": 50, "chunks": 194, "dim": 16}
+    loaded.save(str(tmp_path))
+    reloaded = CorpusIndex.load(str(tmp_path))
+    assert reloaded.stats() == loaded.stats()
+    reloaded.rebuild("ivf_flat", nprobe=64)
+    assert reloaded.stats() == loaded.stats()
+    assert "cv2" not in {doc_id for _, doc_id, _ in reloaded.search(probe, k=5)[0]}
+
+
+def test_corpus_writes_share_one_debounced_save(tmp_path, monkeypatch):
+    from src.pipeline import corpus_search
+    from src.rag import corpus_index
+    from tests.conftest import _HashEmbedder
+
+    saves = []
+    monkeypatch.chdir(tmp_path)     # no saved corpus under the default CORPUS_INDEX_DIR
+    monkeypatch.setattr(corpus_index, "_corpus", None)
+    monkeypatch.setattr(corpus_search, "Embedder", _HashEmbedder)
+    monkeypatch.setattr(corpus_search, "CORPUS_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(corpus_search, "CORPUS_SAVE_DELAY_S", 60.0)
+    monkeypatch.setattr(CorpusIndex, "save", lambda self, path: (saves.append(path), setattr(self, "dirty", False)))
+
+    for i in range(5):
+        corpus_search.index_cv(f"cv{i}", f"Python services.\n\nKubernetes operator number {i}.")
+    corpus_search.remove_cv("cv0")
+    assert saves == []
+    assert corpus_search.flush_corpus()["saved"] and saves == [str(tmp_path)]
+    assert not corpus_search.flush_corpus()["saved"] and len(saves) == 1
+
+
+def test_flush_rebuilds_a_grown_flat_corpus_as_ivf(tmp_path, monkeypatch):
+    from src.pipeline import corpus_search
+    from src.rag import corpus_index
+    from tests.conftest import _HashEmbedder
+
+    monkeypatch.chdir(tmp_path)     # no saved corpus under the default CORPUS_INDEX_DIR
+    monkeypatch.setattr(corpus_index, "_corpus", None)
+    monkeypatch.setattr(corpus_search, "Embedder", _HashEmbedder)
+    monkeypatch.setattr(corpus_search, "CORPUS_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(corpus_search, "CORPUS_SAVE_DELAY_S", 60.0)
+    monkeypatch.setattr(corpus_search, "CORPUS_IVF_MIN_CHUNKS", 40)
+
+    for i in range(20):
+        corpus_search.index_cv(f"cv{i}", f"Python services and Kubernetes operator number {i}.")
+    corpus = corpus_index._corpus
+    corpus_search.flush_corpus()
+    assert corpus.is_flat() and corpus.index.ntotal == 20
+
+    for i in range(20, 45):
+        corpus_search.index_cv(f"cv{i}", f"Python services and Kubernetes operator number {i}.")
+    corpus_search.flush_corpus()
+    assert not corpus.is_flat() and CorpusIndex.load(str(tmp_path)).stats() == corpus.stats()
+
+    out = corpus_search.rebuild_corpus("ivf_flat", nprobe=4)
+    assert out["saved"] and out["chunks"] == 45 and corpus.nprobe == 4
+    with pytest.raises(HTTPException) as e:
+        corpus_search.rebuild_corpus("hnsw")
+    assert e.value.status_code == 400
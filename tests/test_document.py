@@ -0,0 +1,30 @@
+from src.ingest.chunking import chunk_text
+from src.ingest.cv_parser import extract_cv_bullets
+from src.ingest.document import parse_document, word_set
+from src.pipeline.llm_only import extract_bullets, tokenize_words
+
+
+def test_one_scan_serves_every_parser():
+    text = "Jane Doe\n\n- Built Python services on AWS\n  • Led a team of four engineers\n1. Shipped CI/CD pipelines\n2) Docker"
+    doc = parse_document(text)
+    assert doc is parse_document(text)
+    assert doc.symbol_bullets == ["Built Python services on AWS", "Led a team of four engineers"]
+    assert doc.bullets == doc.symbol_bullets + ["Shipped CI/CD pipelines", "Docker"]
+    assert extract_cv_bullets(text) == doc.symbol_bullets
+    assert extract_bullets(text) == doc.bullets
+    assert doc.chunks == chunk_text(text, max_chars=800)
+    assert {"python", "aws", "docker"} <= doc.tokens
+
+
+def test_fallbacks_keep_their_thresholds():
+    text = "A short line\nA line of about 25 chars\nAnd this one is well over thirty characters."
+    doc = parse_document(text)
+    assert doc.requirements == ["A line of about 25 chars", "And this one is well over thirty characters."]
+    assert doc.cv_bullets == ["And this one is well over thirty characters."]
+    assert extract_bullets("First sentence is long enough. Second one is long enough too!") == \
+        ["First sentence is long enough.", "Second one is long enough too!"]
+
+
+def test_word_set_matches_tokenizing_joined_text():
+    parts = ["Python 3.11 and FastAPI", "k8s, Docker-compose", "C++ / Go"]
+    assert frozenset().union(*map(word_set, parts)) == set(tokenize_words(" ".join(parts)))
@@ -0,0 +1,26 @@
+import threading
+import numpy as np
+from src.rag import embedder as emb_mod
+
+
+class _FakeModel:
+    def encode(self, texts, **kw):
+        return np.ones((len(texts), 4))
+
+
+def test_model_loaded_once_across_threads(monkeypatch):
+    loads = []
+    def fake_load(name):
+        loads.append(name)
+        return _FakeModel()
+    monkeypatch.setattr(emb_mod, "_load_model", fake_load)
+    monkeypatch.setattr(emb_mod, "_MODELS", {})
+    monkeypatch.setattr(emb_mod, "_MODEL_STATS", {})
+
+    threads = [threading.Thread(target=lambda: emb_mod.Embedder("fake-model", use_cache=False)) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    assert loads == ["fake-model"]
+    assert emb_mod.Embedder("fake-model", use_cache=False).encode(["a", "b"]).dtype == np.float32
+    assert "load_seconds" in emb_mod.model_stats()["fake-model"]
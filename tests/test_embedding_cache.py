@@ -0,0 +1,73 @@
+import numpy as np
+from src.rag.embedder import Embedder
+from src.rag.embedding_cache import EmbeddingCache, text_key
+
+
+class _CountingModel:
+    def __init__(self):
+        self.seen = []
+
+    def encode(self, texts, **kw):
+        self.seen.append(list(texts))
+        return np.array([[len(t), 1.0, 0.0] for t in texts], dtype="float32")
+
+
+def _embedder(cache):
+    e = Embedder.__new__(Embedder)
+    e.model_name, e.model, e.cache = "fake", _CountingModel(), cache
+    return e
+
+
+def test_only_misses_are_encoded(tmp_path):
+    e = _embedder(EmbeddingCache("fake", max_items=10, cache_dir=str(tmp_path)))
+    first = e.encode(["python", "docker", "python"])
+    second = e.encode(["docker  ", "kubernetes", "python"])
+    assert e.model.seen == [["python", "docker"], ["kubernetes"]]
+    assert np.allclose(second[0], first[1])
+    assert e.cache.stats()["hits"] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    c1 = EmbeddingCache("fake", max_items=1, cache_dir=str(tmp_path))
+    c1.put_many([text_key("a"), text_key("b")], np.array([[1, 0], [0, 1]], dtype="float32"))
+    c2 = EmbeddingCache("fake", max_items=1, cache_dir=str(tmp_path))
+    got = c2.get_many([text_key("b"), text_key("zzz")])
+    assert np.allclose(got[0], [0, 1]) and got[1] is None
+    assert c2.stats()["disk_hits"] == 1
+
+
+def test_compact_dtypes_round_trip_through_both_tiers(tmp_path):
+    x = np.random.default_rng(0).normal(size=(3, 384)).astype("float32")
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    keys = [text_key(t) for t in "abc"]
+    for dtype, tol in (("float16", 1e-3), ("int8", 1e-2)):
+        c1 = EmbeddingCache("fake", max_items=10, cache_dir=str(tmp_path / dtype), dtype=dtype)
+        c1.put_many(keys, x)
+        assert np.allclose(np.stack(c1.get_many(keys)), x, atol=tol)
+        # a reopened directory keeps its dtype even if the setting changed
+        c2 = EmbeddingCache("fake", max_items=10, cache_dir=str(tmp_path / dtype), dtype="float32")
+        got = np.stack(c2.get_many(keys))
+        assert got.dtype == np.float32 and np.allclose(got, x, atol=tol)
+    f32 = (tmp_path / "float16" / "fake" / "vectors.f16").stat().st_size
+    i8 = (tmp_path / "int8" / "fake" / "vectors.i8").stat().st_size
+    assert f32 == 3 * 384 * 2 and i8 == 3 * (384 + 4)
+
+
+def test_torn_append_is_cut_back_and_rows_come_from_the_file(tmp_path):
+    c1 = EmbeddingCache("fake", max_items=1, cache_dir=str(tmp_path))
+    c1.put_many([text_key("a")], np.array([[1, 0]], dtype="float32"))
+    vec_file = tmp_path / "fake" / "vectors.f32"
+    # crash after writing vectors (one whole row and half of the next) but before their keys
+    with open(vec_file, "ab") as f:
+        f.write(np.array([[9, 9], [9, 9]], dtype="float32").tobytes()[:12])
+
+    c2 = EmbeddingCache("fake", max_items=1, cache_dir=str(tmp_path))
+    assert vec_file.stat().st_size == 8
+    # a second writer on the same directory (another process) appends in between
+    c1.put_many([text_key("b")], np.array([[0, 1]], dtype="float32"))
+    c2.put_many([text_key("c")], np.array([[1, 1]], dtype="float32"))
+
+    c3 = EmbeddingCache("fake", max_items=1, cache_dir=str(tmp_path))
+    got = c3.get_many([text_key(t) for t in "abc"])
+    assert np.allclose(np.stack(got), [[1, 0], [0, 1], [1, 1]])
+    assert np.allclose(c2.get_many([text_key("c")])[0], [1, 1])
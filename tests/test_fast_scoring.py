@@ -0,0 +1,42 @@
+import time
+import numpy as np
+import pytest
+from src.pipeline.fast_scoring import calibrate, label_with_llm, run_match_fast
+from src.pipeline.match_pipeline import _merge_batch_results
+from tests.conftest import _HashEmbedder
+
+CV = "Python developer building FastAPI services.\n\nDocker and Kubernetes in production.\n\nMentored a team."
+JD = "- Python and FastAPI services\n- Kubernetes in production\n- Salesforce Apex certification\n- Mentored a team"
+THRESHOLDS = {"low": 0.2, "match": 0.4, "high": 0.8}
+
+
+def test_same_schema_as_llm_merge_and_no_llm_call():
+    out = run_match_fast(CV, JD, _HashEmbedder(), THRESHOLDS)
+    assert set(_merge_batch_results([])) <= set(out)
+    assert out["prompt_stats"]["llm_calls"] == 0 and out["mode"] == "fast"
+    assert out["missing_requirements"] == ["Salesforce Apex certification"]
+    assert {g["requirement"] for g in out["good_matches"]} >= {"Python and FastAPI services", "Mentored a team"}
+    assert "salesforce" in out["missing_skills"]
+    # no experience-type requirement here, so that section falls back to the overall score
+    assert 0 < out["overall_score"] < 100 and out["section_scores"]["experience"] == out["overall_score"]
+    assert [c["requirement"] for c in out["coverage"]] == [l[2:] for l in JD.splitlines()]
+
+    embedder = _HashEmbedder()
+    run_match_fast(CV, JD, embedder, THRESHOLDS)
+    t0 = time.perf_counter()
+    for _ in range(20):
+        run_match_fast(CV, JD, embedder, THRESHOLDS)
+    assert (time.perf_counter() - t0) / 20 < 0.01
+
+
+def test_calibrate_separates_labelled_similarities():
+    rng = np.random.default_rng(0)
+    pos, neg = rng.normal(0.6, 0.05, 200), rng.normal(0.3, 0.05, 200)
+    t = calibrate(np.concatenate([pos, neg]), [True] * 200 + [False] * 200)
+    assert t["low"] <= t["match"] <= t["high"] and 0.4 < t["match"] < 0.5
+    with pytest.raises(ValueError):
+        calibrate([0.1, 0.2], [True, True])
+
+    sims, labels = label_with_llm([(CV, JD)], scorer=lambda cv, jd: {"missing_requirements": ["salesforce apex certification"]},
+                                  embedder=_HashEmbedder())
+    assert labels == [True, True, False, True] and len(sims) == 4
@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+from src.pipeline import incremental, match_pipeline
+from tests.conftest import _fake_llm, _HashEmbedder
+
+CV = "Python developer.\n\nBuilt FastAPI services with Docker on AWS.\n\nLed a team of 4."
+JD = "\n".join(f"- Requirement number {i} about python" for i in range(40))
+
+
+def _setup(monkeypatch):
+    prompts, encoded = [], []
+
+    class Counting(_HashEmbedder):
+        def encode(self, texts):
+            encoded.extend(texts)
+            return super().encode(texts)
+
+    async def fake_acall(prompt):
+        prompts.append(prompt)
+        return _fake_llm(0)(prompt)
+    monkeypatch.setattr(match_pipeline, "Embedder", _HashEmbedder)
+    monkeypatch.setattr(match_pipeline, "MAX_REQ_PER_CALL", 10)
+    monkeypatch.setattr(match_pipeline, "acall_llm", fake_acall)
+    monkeypatch.setattr(incremental, "Embedder", Counting)
+    monkeypatch.setattr(incremental, "acall_llm", fake_acall)
+    return prompts, encoded
+
+
+def test_first_call_matches_full_pipeline_and_resubmit_is_free(monkeypatch):
+    prompts, encoded = _setup(monkeypatch)
+    sessions = incremental.SessionStore()
+    full = asyncio.run(match_pipeline.arun_match(CV, JD))
+    prompts.clear()
+
+    first = asyncio.run(incremental.arun_match_incremental("s1", CV, JD, sessions=sessions))
+    assert {k: v for k, v in first.items() if k != "prompt_stats"} == \
+        {k: v for k, v in full.items() if k != "prompt_stats"}
+    assert len(prompts) == 4 and first["prompt_stats"]["incremental"]["llm_calls_avoided"] == 0
+
+    prompts.clear(), encoded.clear()
+    again = asyncio.run(incremental.arun_match_incremental("s1", CV, JD, sessions=sessions))
+    assert prompts == [] and encoded == []
+    assert again["prompt_stats"]["incremental"]["llm_calls_avoided"] == 4
+    assert again["overall_score"] == first["overall_score"]
+
+
+def test_edit_rescores_only_batches_with_changed_evidence(monkeypatch):
+    prompts, encoded = _setup(monkeypatch)
+    sessions = incremental.SessionStore()
+    asyncio.run(incremental.arun_match_incremental("s1", CV, JD, sessions=sessions))
+    prompts.clear(), encoded.clear()
+
+    edited = JD.replace("Requirement number 25 about python", "Kubernetes operators in Go")
+    out = asyncio.run(incremental.arun_match_incremental("s1", CV, edited, sessions=sessions))
+    stats = out["prompt_stats"]["incremental"]
+    # one new requirement text embedded, only its batch re-run
+    assert encoded == ["Kubernetes operators in Go"]
+    assert len(prompts) == 1 and "Kubernetes operators in Go" in prompts[0]
+    assert stats["requirements_added"] == 1 and stats["requirements_removed"] == 1
+    assert stats["batches_reused"] == 3 and stats["llm_calls_avoided"] == 3
+    assert out["missing_requirements"] == ["Requirement number 0 about python", "Requirement number 10 about python",
+                                           "Requirement number 20 about python", "Requirement number 30 about python"]
+
+    # another session starts from scratch
+    prompts.clear()
+    asyncio.run(incremental.arun_match_incremental("s2", CV, edited, sessions=sessions))
+    assert len(prompts) == 4
+
+
+def test_incremental_score_matches_a_full_rescore_of_the_edit(monkeypatch):
+    _setup(monkeypatch)
+
+    async def scored_acall(prompt):
+        body = json.loads(_fake_llm(0)(prompt))
+        body["overall_score"] = 90 if "Kubernetes" in prompt else 50
+        return json.dumps(body)
+    monkeypatch.setattr(match_pipeline, "acall_llm", scored_acall)
+    monkeypatch.setattr(incremental, "acall_llm", scored_acall)
+    sessions = incremental.SessionStore()
+    asyncio.run(incremental.arun_match_incremental("s1", CV, JD, sessions=sessions))
+
+    # a 41st requirement: four reused batches of 10 plus one re-scored batch of 1
+    edited = JD + "\n- Kubernetes operators in Go"
+    out = asyncio.run(incremental.arun_match_incremental("s1", CV, edited, sessions=sessions))
+    assert out["prompt_stats"]["incremental"]["batches_reused"] == 4
+    full = asyncio.run(match_pipeline.arun_match(CV, edited))
+    assert out["overall_score"] == full["overall_score"] == round((40 * 50 + 90) / 41)
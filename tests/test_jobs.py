@@ -0,0 +1,117 @@
+import threading
+import time
+from fastapi import HTTPException
+from src.jobs.queue import JobQueue
+from src.jobs.workers import HANDLERS, JobWorkerPool
+from src.pipeline import batch_pipeline
+from tests.conftest import DOCKER_CVS, DOCKER_JD, _docker_llm, _HashEmbedder
+
+
+def _wait(queue, job_id, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_jobs_survive_restart_and_report_progress(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_pipeline, "Embedder", _HashEmbedder)
+    monkeypatch.setattr(batch_pipeline, "call_llm", _docker_llm)
+    db = str(tmp_path / "jobs.sqlite")
+
+    queue = JobQueue(db)
+    job_id = queue.submit("batch", {"jd_text": DOCKER_JD, "cv_texts": DOCKER_CVS, "top_k": 1}, items=len(DOCKER_CVS))
+    assert queue.claim()["id"] == job_id          # a worker took it ...
+    queue.start(job_id)
+    queue.close()                                 # ... and the process died mid-job
+
+    queue = JobQueue(db)
+    assert queue.recovered == 1 and queue.metrics()["queue_depth"] == 1
+    pool = JobWorkerPool(queue, workers=2, poll_interval=0.05).start()
+    try:
+        job = _wait(queue, job_id)
+    finally:
+        pool.stop()
+
+    assert job["status"] == "done" and job["attempts"] == 2
+    assert job["done"] == job["total"] > 0 and job["progress"] == 1.0 and job["items_per_s"] > 0
+    assert queue.result(job_id)["ranking"][0]["index"] == 1
+    metrics = queue.metrics()
+    assert metrics["by_status"]["done"] == 1 and metrics["queue_depth"] == 0 and metrics["completed"] == 1
+
+
+def test_failures_are_recorded(tmp_path):
+    def bad(payload, progress):
+        raise HTTPException(status_code=400, detail="Empty CV text.")
+
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    pool = JobWorkerPool(queue, workers=1, handlers={**HANDLERS, "match": (bad, ())}, poll_interval=0.05)
+    pool.start()
+    try:
+        failed = _wait(queue, queue.submit("match", {"cv_text": "", "jd_text": "x"}))
+        unknown = _wait(queue, queue.submit("nope", {}))
+    finally:
+        pool.stop()
+    assert failed["status"] == "failed" and failed["error"] == "Empty CV text."
+    assert unknown["status"] == "failed" and queue.result(unknown["id"]) is None
+
+
+def test_interrupted_job_fails_after_max_attempts(tmp_path):
+    db = str(tmp_path / "jobs.sqlite")
+    queue = JobQueue(db, max_attempts=2)
+    job_id = queue.submit("batch", {"jd_text": DOCKER_JD, "cv_texts": DOCKER_CVS})
+    for attempt in (1, 2):
+        assert queue.claim()["attempts"] == attempt - 1
+        queue.start(job_id)
+        queue.close()                                 # the job takes the process down with it
+        queue = JobQueue(db, max_attempts=2)
+    assert (queue.recovered, queue.abandoned) == (0, 1)
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and "Interrupted 2 times" in job["error"]
+    assert queue.claim() is None and queue.metrics()["by_status"]["failed"] == 1
+
+
+
+def test_match_jobs_report_progress_per_llm_call(tmp_path, monkeypatch):
+    from src.pipeline import match_pipeline
+    from tests.conftest import CV, JD, _fake_llm
+    monkeypatch.setattr(match_pipeline, "Embedder", _HashEmbedder)
+    monkeypatch.setattr(match_pipeline, "MAX_REQ_PER_CALL", 10)
+    monkeypatch.setattr(match_pipeline, "call_llm", _fake_llm(0))
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    seen = []
+    monkeypatch.setattr(queue, "progress", lambda job_id, done, total: seen.append((done, total)))
+
+    job_id = queue.submit("match", {"cv_text": CV, "jd_text": JD})
+    JobWorkerPool(queue, workers=1).run_one(queue.claim())
+    assert queue.get(job_id)["status"] == "done"
+    assert seen == [(i, 5) for i in range(6)]
+
+
+def test_worker_survives_base_exceptions_and_stop_requeues_without_an_attempt(tmp_path):
+    release = threading.Event()
+
+    def exits(payload, progress):
+        raise SystemExit(3)
+
+    def blocks(payload, progress):
+        release.wait(10)
+        return {}
+
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    handlers = {**HANDLERS, "match": (exits, ()), "batch": (blocks, ())}
+    pool = JobWorkerPool(queue, workers=1, handlers=handlers, poll_interval=0.05).start()
+    try:
+        exited = _wait(queue, queue.submit("match", {}))
+        blocked = queue.submit("batch", {})
+        while queue.get(blocked)["attempts"] == 0:
+            time.sleep(0.01)
+    finally:
+        pool.stop(timeout=0.1)
+    assert exited["status"] == "failed" and exited["error"] == "SystemExit: 3"
+    job = queue.get(blocked)
+    assert job["status"] == "queued" and job["attempts"] == 0     # the worker outlived SystemExit to run it
+    release.set()
@@ -0,0 +1,37 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.llm.local_generator import ResidentGenerator
+
+
+class _FakeGenerator(ResidentGenerator):
+    def __init__(self, **kw):
+        super().__init__(model_name="fake", **kw)
+        self.loads = 0
+        self.batch_sizes = []
+        self.release = threading.Event()
+
+    def _load(self):
+        self.loads += 1
+
+    def _generate_batch(self, prompts):
+        self.release.wait(5)
+        self.batch_sizes.append(len(prompts))
+        return [p.upper() for p in prompts]
+
+
+def test_prompts_are_batched_and_model_loaded_once():
+    # a batch closes as soon as it is full, so a long wait cap never adds latency here
+    gen = _FakeGenerator(max_batch_size=4, max_wait_ms=5000)
+    futs = [gen.submit(f"p{i}") for i in range(8)]
+    gen.release.set()
+    assert [f.result(5) for f in futs] == [f"P{i}" for i in range(8)]
+    assert gen.loads == 1
+    assert gen.batch_sizes == [4, 4] and (gen.batches, gen.prompts) == (2, 8)
+
+
+def test_generate_errors_propagate_to_callers():
+    gen = _FakeGenerator(max_batch_size=2, max_wait_ms=1)
+    gen._generate_batch = lambda prompts: 1 / 0
+    with ThreadPoolExecutor(2) as ex:
+        errs = list(ex.map(lambda p: type(gen.submit(p).exception(5)).__name__, ["a", "b"]))
+    assert errs == ["ZeroDivisionError"] * 2
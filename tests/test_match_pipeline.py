@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from src.pipeline import match_pipeline
+from tests.conftest import CV, JD, _fake_llm, _HashEmbedder
+
+
+def test_batches_run_concurrently_and_keep_order(monkeypatch):
+    # every call waits until all 5 batches are in flight: a serial run breaks the barrier
+    barrier = threading.Barrier(5, timeout=5)
+    llm = _fake_llm(0)
+
+    def call(prompt):
+        barrier.wait()
+        return llm(prompt)
+    monkeypatch.setattr(match_pipeline, "Embedder", _HashEmbedder)
+    monkeypatch.setattr(match_pipeline, "MAX_REQ_PER_CALL", 10)
+    monkeypatch.setattr(match_pipeline, "call_llm", call)
+    monkeypatch.setattr(match_pipeline, "llm_concurrency", lambda: 8)
+
+    out = match_pipeline.run_match(CV, JD)
+    assert out["missing_requirements"] == [f"Requirement number {i} about python" for i in range(0, 50, 10)]
+
+
+def test_async_pipeline_holds_many_requests_in_flight(monkeypatch):
+    # 100 requests x 5 batches: no call returns until all 500 are in flight on the loop
+    state = {"in_flight": 0}
+
+    async def fake_acall(prompt):
+        state["in_flight"] += 1
+        if state["in_flight"] == 500:
+            state["all_in"].set()
+        await state["all_in"].wait()
+        return _fake_llm(0)(prompt)
+    monkeypatch.setattr(match_pipeline, "Embedder", _HashEmbedder)
+    monkeypatch.setattr(match_pipeline, "MAX_REQ_PER_CALL", 10)
+    monkeypatch.setattr(match_pipeline, "acall_llm", fake_acall)
+
+    async def many():
+        state["all_in"] = asyncio.Event()
+        return await asyncio.wait_for(asyncio.gather(*(match_pipeline.arun_match(CV, JD) for _ in range(100))), 10)
+
+    results = asyncio.run(many())
+    assert state["in_flight"] == 500
+    assert all(r["missing_requirements"] == results[0]["missing_requirements"] for r in results)
+
+
+def test_requirements_embedded_and_searched_once(monkeypatch):
+    calls = []
+    class Counting(_HashEmbedder):
+        def encode(self, texts):
+            calls.append(len(texts))
+            return super().encode(texts)
+    monkeypatch.setattr(match_pipeline, "Embedder", Counting)
+    monkeypatch.setattr(match_pipeline, "call_llm", _fake_llm(0))
+    match_pipeline.run_match(CV, JD)
+    assert calls == [1 + 50]   # CV chunk + 50 requirements, one model call
+
+
+def test_stream_emits_first_batch_before_the_others_finish(monkeypatch):
+    # batch 3 answers at once; the rest wait until the consumer has seen a batch event
+    state = {}
+
+    async def fake_acall(prompt):
+        first_req = prompt.split("JOB_REQUIREMENTS:\n- Requirement number ", 1)[1].split(" ", 1)[0]
+        if first_req != "30":
+            await state["seen"].wait()
+        return _fake_llm(0)(prompt)
+    monkeypatch.setattr(match_pipeline, "Embedder", _HashEmbedder)
+    monkeypatch.setattr(match_pipeline, "MAX_REQ_PER_CALL", 10)
+    monkeypatch.setattr(match_pipeline, "acall_llm", fake_acall)
+
+    async def collect():
+        state["seen"] = asyncio.Event()
+        prepared = await match_pipeline.aprepare_match(CV, JD)
+        events = []
+        async for e in match_pipeline.aiter_match(prepared):
+            events.append(e)
+            if e["event"] == "batch":
+                state["seen"].set()
+        return events
+
+    events = asyncio.run(asyncio.wait_for(collect(), 10))
+    assert [e["event"] for e in events] == ["start"] + ["batch"] * 5 + ["done"]
+    assert events[1]["batch_index"] == 3
+    assert events[-1]["result"] == asyncio.run(match_pipeline.arun_match(CV, JD))
@@ -0,0 +1,34 @@
+from src.llm.tokens import estimate_tokens, truncate_to_tokens
+from src.pipeline.prompt_packer import (
+    clip_evidence, duplicate_snippets, format_evidence, pack_evidence
+)
+from src.config import LLM_OUTPUT_TOKENS, LLM_OUTPUT_TOKENS_PER_REQ
+
+SNIPPETS = [f"Built service {i} with Python, FastAPI and Docker on AWS for team {i}." for i in range(5)]
+EVIDENCE = [(f"Requirement {i}: experience with tool{i}", [(0.8, SNIPPETS[i % 5]), (0.6, SNIPPETS[(i + 1) % 5])])
+            for i in range(60)]
+
+
+def test_truncate_to_tokens():
+    text = "word " * 500
+    out = truncate_to_tokens(text, 50)
+    assert estimate_tokens(out) <= 50 and out.endswith("…")
+    assert truncate_to_tokens("short", 50) == "short"
+
+
+def test_pack_fits_budget_keeps_order_and_dedups():
+    batches = pack_evidence(EVIDENCE, fixed_tokens=200, context_tokens=3000)
+    assert 1 < len(batches) < 6          # fewer calls than fixed batches of 10
+    assert [r for b in batches for r, _ in b] == [r for r, _ in EVIDENCE]
+    for b in batches:
+        req_lines = sum(estimate_tokens(f"- {r}") for r, _ in b)
+        used = 200 + estimate_tokens(format_evidence(b)) + req_lines + LLM_OUTPUT_TOKENS + LLM_OUTPUT_TOKENS_PER_REQ * len(b)
+        assert used <= 3000 * 1.05
+    assert duplicate_snippets(batches) > 0
+    assert format_evidence(batches[0]).count(SNIPPETS[0]) == 1
+
+
+def test_oversized_requirement_gets_its_own_call():
+    big = [("huge " * 400, [(0.5, "x")]), ("small", [(0.5, "y")])]
+    batches = pack_evidence(clip_evidence(big, max_req_tokens=5000), fixed_tokens=100, context_tokens=1000)
+    assert [len(b) for b in batches] == [1, 1]
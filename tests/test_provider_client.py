@@ -0,0 +1,134 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.llm.provider import ProviderClient, _acall_ollama, _call_ollama
+
+
+class _StubOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({"response": '{"overall_score": 70}'}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_ollama_calls_reuse_pooled_connections():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = ProviderClient(pool_size=2, timeout=5, ollama_base_url=f"http://127.0.0.1:{server.server_port}")
+    try:
+        for _ in range(25):
+            assert _call_ollama("score this", client=client) == '{"overall_score": 70}'
+    finally:
+        client.close()
+        server.shutdown()
+    assert _StubOllama.connections == 1
+
+
+def test_async_ollama_uses_pooled_client():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = ProviderClient(pool_size=4, timeout=5, ollama_base_url=f"http://127.0.0.1:{server.server_port}")
+
+    async def run():
+        try:
+            return await asyncio.gather(*(_acall_ollama("score this", client=client) for _ in range(10)))
+        finally:
+            await client.aclose()
+
+    before = _StubOllama.connections
+    try:
+        assert asyncio.run(run()) == ['{"overall_score": 70}'] * 10
+    finally:
+        server.shutdown()
+    assert _StubOllama.connections - before <= 4
+
+
+def test_sync_and_async_calls_share_one_provider_limit(monkeypatch):
+    from src.llm import provider
+    lock, state = threading.Lock(), {"now": 0, "max": 0, "calls": 0}
+
+    def enter():
+        with lock:
+            state["now"] += 1
+            state["calls"] += 1
+            state["max"] = max(state["max"], state["now"])
+
+    def leave():
+        with lock:
+            state["now"] -= 1
+
+    def fake(prompt):
+        enter()
+        threading.Event().wait(0.01)
+        leave()
+        return "{}"
+
+    async def afake(prompt):
+        enter()
+        await asyncio.sleep(0.01)
+        leave()
+        return "{}"
+
+    monkeypatch.setattr(provider, "_dispatch", fake)
+    monkeypatch.setattr(provider, "_adispatch", afake)
+    monkeypatch.setitem(provider._limits, provider.LLM_PROVIDER, provider.ProviderLimit(2))
+
+    async def many():
+        return await asyncio.gather(*(provider._acall_uncached("p") for _ in range(6)))
+
+    threads = [threading.Thread(target=provider._call_uncached, args=("p",)) for _ in range(6)]
+    threads += [threading.Thread(target=lambda: asyncio.run(many())) for _ in range(2)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert state["calls"] == 18 and state["max"] <= 2
+
+
+def test_cancelled_async_waiter_gives_its_slot_back():
+    from src.llm.provider import ProviderLimit
+    limit = ProviderLimit(1)
+
+    async def run():
+        await limit.aacquire()                      # hold the only slot
+        waiter = asyncio.ensure_future(limit.aacquire())
+        await asyncio.sleep(0)
+        limit.release()                             # handed to the waiter ...
+        waiter.cancel()                             # ... which is cancelled before it runs
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.wait_for(limit.aacquire(), 1)   # the slot was not lost
+        limit.release()
+
+    asyncio.run(run())
+
+
+def test_async_clients_are_per_event_loop():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = ProviderClient(pool_size=2, timeout=5, ollama_base_url=f"http://127.0.0.1:{server.server_port}")
+
+    async def call():
+        return await _acall_ollama("score this", client=client), client.async_http()
+
+    try:
+        # e.g. asyncio.run in a worker thread, then the API loop; the first loop never closed its client
+        first, first_http = asyncio.run(call())
+        second, second_http = asyncio.run(call())
+    finally:
+        server.shutdown()
+    assert first == second == '{"overall_score": 70}'
+    assert first_http is not second_http
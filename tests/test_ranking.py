@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+from src.pipeline import fast_scoring, ranking
+from tests.conftest import _HashEmbedder
+
+JD = "- Kubernetes operators in production\n- Python services with FastAPI\n- Terraform on AWS"
+STRONG = "Ran Kubernetes operators in production.\n\nBuilt Python services with FastAPI.\n\nTerraform on AWS."
+WEAK = "Sold insurance products.\n\nManaged retail accounts.\n\nOrganised regional sales events."
+
+
+def _setup(monkeypatch, slow_prompt_word=None):
+    prompts = []
+
+    async def fake_acall(prompt):
+        prompts.append(prompt)
+        if slow_prompt_word and slow_prompt_word in prompt:
+            await asyncio.sleep(2)
+        score = 90 if "Ran Kubernetes" in prompt else 50
+        return '{"overall_score": %d, "missing_requirements": []}' % score
+    monkeypatch.setattr(ranking, "Embedder", _HashEmbedder)
+    monkeypatch.setattr(ranking, "acall_llm", fake_acall)
+    monkeypatch.setattr(fast_scoring, "_thresholds", {"low": 0.1, "match": 0.4, "high": 0.8})
+    return prompts
+
+
+def test_only_the_shortlist_reaches_the_llm(monkeypatch):
+    prompts = _setup(monkeypatch)
+    pool = [WEAK] * 20 + [STRONG, STRONG.replace("Ran", "Used"), "Python scripts.\n\nAWS console."]
+    out = asyncio.run(ranking.arun_rank(JD, cv_texts=pool, top_n=2))
+
+    assert out["candidates"] == 23 and len(out["ranking"]) == 23
+    assert out["stages"]["llm"]["shortlisted"] == 2 and len(prompts) == out["stages"]["llm"]["llm_calls"] == 2
+    top = out["ranking"][:2]
+    assert [r["index"] for r in top] == [20, 21] and [r["llm_score"] for r in top] == [90, 50]
+    assert all(r["status"] == "scored" and r["screen"]["keyword"] == 1.0 for r in top)
+    rest = out["ranking"][2:]
+    assert rest[0]["index"] == 22 and all(r["llm_score"] is None for r in rest)
+    assert [r["screen"]["score"] for r in rest] == sorted((r["screen"]["score"] for r in rest), reverse=True)
+
+
+def test_stage_budgets_cut_work_not_the_ranking(monkeypatch):
+    _setup(monkeypatch, slow_prompt_word="Used Kubernetes")
+    pool = [STRONG, STRONG.replace("Ran", "Used"), WEAK]
+    t0 = time.perf_counter()
+    out = asyncio.run(ranking.arun_rank(JD, cv_texts=pool, ids=["a", "b", "c"], top_n=2, llm_budget_s=0.3))
+    assert time.perf_counter() - t0 < 1.5
+    assert [(r["id"], r["status"]) for r in out["ranking"]] == [("a", "scored"), ("b", "llm_timeout"), ("c", "screened")]
+    assert out["stages"]["llm"]["timed_out"] == 1
+
+    class Slow(_HashEmbedder):
+        def encode(self, texts):
+            time.sleep(0.2)
+            return super().encode(texts)
+    monkeypatch.setattr(ranking, "Embedder", Slow)
+    monkeypatch.setattr(ranking, "SCREEN_SLICE", 2)
+    out = asyncio.run(ranking.arun_rank(JD, cv_texts=[STRONG] * 10, top_n=0, screen_budget_s=0.3))
+    assert out["stages"]["screen"]["screened"] == 2 and out["stages"]["screen"]["unscreened"] == 8
+    assert [r["status"] for r in out["ranking"]] == ["screened"] * 2 + ["unscreened"] * 8
+
+
+def test_a_cancelled_llm_call_leaves_its_candidate_unscored(monkeypatch):
+    _setup(monkeypatch)
+
+    async def cancelled_for_b(prompt):
+        if "Used Kubernetes" in prompt:
+            raise asyncio.CancelledError
+        return '{"overall_score": 90, "missing_requirements": []}'
+    monkeypatch.setattr(ranking, "acall_llm", cancelled_for_b)
+    pool = [STRONG, STRONG.replace("Ran", "Used"), WEAK]
+    out = asyncio.run(ranking.arun_rank(JD, cv_texts=pool, ids=["a", "b", "c"], top_n=2))
+    assert [(r["id"], r["status"]) for r in out["ranking"]] == [("a", "scored"), ("b", "llm_error"), ("c", "screened")]
+    assert out["stages"]["llm"]["errors"] == 1
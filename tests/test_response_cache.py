@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from src.llm.response_cache import ResponseCache, response_key
+
+
+def _count_lookups(cache):
+    """Count cache lookups that missed: a caller past its miss only waits on, or makes, the LLM call."""
+    misses = []
+    get = cache.get
+    cache.get = lambda key: get(key) or misses.append(key)
+    return misses
+
+
+def _until(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def test_concurrent_identical_prompts_share_one_call():
+    cache = ResponseCache(max_items=10, ttl=60, db_path=None)
+    calls, out = [], []
+    started, release = threading.Event(), threading.Event()
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return '{"overall_score": 80}'
+    key = response_key("ollama", "m", 0.1, "same   prompt")
+    lookups = _count_lookups(cache)
+    call = lambda: out.append(cache.get_or_call(key, slow))
+    threading.Thread(target=call).start()
+    started.wait(5)
+    n_owner = len(lookups)
+    threads = [threading.Thread(target=call) for _ in range(7)]
+    for t in threads: t.start()
+    _until(lambda: len(lookups) == n_owner + 7)     # all 7 missed while the call was still running
+    release.set()
+    for t in threads: t.join()
+    _until(lambda: len(out) == 8)
+    assert len(calls) == 1 and out == ['{"overall_score": 80}'] * 8
+    assert cache.get_or_call(response_key("ollama", "m", 0.1, " same prompt "), slow) == out[0]
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] == 8
+
+
+def test_ttl_sqlite_tier_and_uncacheable(tmp_path, monkeypatch):
+    db = str(tmp_path / "llm.sqlite")
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = ResponseCache(max_items=10, ttl=60, db_path=db)
+    cache.get_or_call("k", lambda: "a")
+    now[0] += 59
+    assert cache.get("k") == ("a", cache.get("k")[1])
+    now[0] += 2
+    assert cache.get("k") is None
+
+    ResponseCache(ttl=60, db_path=db).get_or_call("k2", lambda: "b")
+    reopened = ResponseCache(ttl=60, db_path=db)
+    assert reopened.get_or_call("k2", lambda: "never") == "b" and reopened.stats()["disk_hits"] == 1
+
+    reopened.get_or_call("bad", lambda: "not json", cacheable=lambda r: False)
+    assert reopened.get("bad") is None
+
+
+def test_async_stampede_protection():
+    cache = ResponseCache(max_items=10, ttl=60, db_path=None)
+    calls = []
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "{}"
+    async def many():
+        return await asyncio.gather(*(cache.aget_or_call("k", slow) for _ in range(20)))
+    assert asyncio.run(many()) == ["{}"] * 20 and len(calls) == 1
+    assert cache.stats()["shared_inflight"] == 19 and cache.stats()["misses"] == 1
+
+
+def test_async_callers_on_different_loops_share_one_call():
+    cache = ResponseCache(max_items=10, ttl=60, db_path=None)
+    calls, out = [], []
+    started, release = threading.Event(), threading.Event()
+    async def slow():
+        calls.append(1)
+        started.set()
+        await asyncio.get_running_loop().run_in_executor(None, release.wait, 5)
+        return "{}"
+    lookups = _count_lookups(cache)
+    owner = threading.Thread(target=lambda: out.append(asyncio.run(cache.aget_or_call("k", slow))))
+    owner.start()
+    started.wait(5)
+    n_owner = len(lookups)
+    waiter = threading.Thread(target=lambda: out.append(asyncio.run(cache.aget_or_call("k", slow))))
+    waiter.start()
+    _until(lambda: len(lookups) == n_owner + 1)     # the second loop missed while the call was running
+    release.set()
+    owner.join(), waiter.join()
+    assert out == ["{}", "{}"] and len(calls) == 1
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
+
+
+def test_cancelled_owner_hands_the_call_to_a_sharer():
+    cache = ResponseCache(max_items=10, ttl=60, db_path=None)
+    calls = []
+
+    async def main():
+        started = asyncio.Event()
+        async def llm():
+            calls.append("async")
+            if len(calls) == 1:
+                started.set()
+                await asyncio.Event().wait()        # hangs until cancelled
+            return "{}"
+        owner = asyncio.ensure_future(cache.aget_or_call("k", llm))
+        await started.wait()
+        sharer = asyncio.ensure_future(cache.aget_or_call("k", llm))
+        await asyncio.sleep(0)                      # the sharer is now waiting on the owner's call
+        loop = asyncio.get_running_loop()
+        thread_sharer = loop.run_in_executor(None, cache.get_or_call, "k", lambda: calls.append("sync") or "{}")
+        owner.cancel()
+        assert (await asyncio.gather(owner, return_exceptions=True))[0].__class__ is asyncio.CancelledError
+        return await sharer, await thread_sharer
+
+    assert asyncio.run(main()) == ("{}", "{}")
+    assert len(calls) == 2 and cache.stats()["misses"] == 2
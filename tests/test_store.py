@@ -0,0 +1,79 @@
+import faiss
+import numpy as np
+import pytest
+from src.rag.store import FaissStore
+
+
+def _data(n, dim=32, seed=0):
+    x = np.random.default_rng(seed).normal(size=(n, dim)).astype("float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw", "ivf_pq"])
+def test_index_types_find_self(index_type):
+    x = _data(2000)
+    store = FaissStore(dim=32, index_type=index_type, ann_min_size=0, nprobe=8, pq_m=8)
+    store.add(x, [f"chunk {i}" for i in range(len(x))])
+    assert store.stats()["index_type"] == index_type
+    # computed from the index structure, within a few headers of the serialized size
+    assert 0.99 < store.memory_bytes() / faiss.serialize_index(store.index).nbytes <= 1.0
+    hits = sum(store.search(x[i:i+1], k=5)[0][1] == f"chunk {i}" for i in range(0, 2000, 40))
+    assert hits >= (30 if index_type == "ivf_pq" else 45)
+
+
+def test_small_collections_stay_flat():
+    store = FaissStore(dim=32, index_type="hnsw", ann_min_size=1000)
+    store.add(_data(50), ["x"] * 50)
+    assert store.stats()["index_type"] == "flat"
+
+
+@pytest.mark.parametrize("storage", ["float32", "binary"])
+def test_flat_store_switches_to_ann_when_it_grows_past_ann_min_size(storage):
+    x = _data(1200)
+    store = FaissStore(dim=32, index_type="hnsw", ann_min_size=1000, storage=storage, rescore=0)
+    store.add(x[:600], [f"chunk {i}" for i in range(600)])
+    assert store.stats()["index_type"] == "flat"
+    store.add(x[600:], [f"chunk {i}" for i in range(600, 1200)])
+    assert store.stats()["index_type"] == "hnsw" and store.stats()["vectors"] == 1200
+    assert [store.search(x[i:i+1], k=1)[0][1] for i in (5, 900)] == ["chunk 5", "chunk 900"]
+
+    store.rebuild()
+    assert store.stats()["vectors"] == 1200 and store.search(x[5:6], k=1)[0][1] == "chunk 5"
+
+
+def test_search_batch_matches_single_queries():
+    x = _data(300)
+    store = FaissStore(dim=32)
+    store.add(x, [f"chunk {i}" for i in range(300)])
+    batched = store.search_batch(x[:20], k=3)
+    assert batched == [store.search(x[i:i+1], k=3) for i in range(20)]
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8", "binary"])
+def test_compact_storage_rescored_to_exact_order(storage, tmp_path):
+    x = _data(3000, dim=64)
+    q = x[:50] + 0.1 * _data(50, dim=64, seed=1)
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    exact = FaissStore(dim=64)
+    exact.add(x, [f"chunk {i}" for i in range(3000)])
+    compact = FaissStore(dim=64, storage=storage, rescore=10, rescore_path=str(tmp_path / "floats.f32"))
+    compact.add(x, [f"chunk {i}" for i in range(3000)])
+    assert compact.memory_bytes() < exact.memory_bytes() / (8 if storage == "binary" else 1.9)
+    assert compact.stats()["rescore_memory_bytes"] == 0
+
+    want, got = exact.search_batch(q, k=5), compact.search_batch(q, k=5)
+    # sign bits only preserve the nearest neighbour on unstructured random data
+    k = 1 if storage == "binary" else 5
+    recall = np.mean([len({t for _, t in a[:k]} & {t for _, t in b[:k]}) / k for a, b in zip(want, got)])
+    assert recall >= 0.98
+    # rescored hits carry exact float scores
+    assert got[0][0][0] == pytest.approx(float(x[int(got[0][0][1].split()[1])] @ q[0]), abs=1e-5)
+
+
+def test_binary_without_rescore_reports_hamming_similarity():
+    x = _data(200, dim=64)
+    store = FaissStore(dim=64, storage="binary", rescore=0)
+    store.add(x, [str(i) for i in range(200)])
+    assert store.search(x[7:8], k=1) == [(1.0, "7")]
+    with pytest.raises(ValueError):
+        FaissStore(dim=64, index_type="ivf_pq", storage="int8", ann_min_size=0).add(x, ["x"] * 200)
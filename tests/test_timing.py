@@ -0,0 +1,46 @@
+from src.pipeline import match_pipeline
+from src.utils.timing import collect, span
+from tests.conftest import CV, JD, _HashEmbedder, _fake_llm
+
+
+def test_spans_only_record_inside_collect():
+    with span("outside"):
+        pass
+    with collect() as t:
+        with span("a"):
+            pass
+        with span("a"):
+            pass
+    assert set(t.seconds) == {"a"} and t.counts["a"] == 2
+
+
+def test_run_match_reports_every_stage(monkeypatch):
+    monkeypatch.setattr(match_pipeline, "Embedder", _HashEmbedder)
+    calls = []
+    fake = _fake_llm(0)
+    monkeypatch.setattr(match_pipeline, "call_llm", lambda prompt: calls.append(prompt) or fake(prompt))
+    with collect() as t:
+        out = match_pipeline.run_match(CV, JD)
+    # json_parse runs in the LLM worker threads and still lands in this request's timings
+    assert set(t.seconds) == {"parse", "chunk", "embed", "index", "retrieve", "prompt", "llm", "json_parse", "merge"}
+    assert t.counts["json_parse"] == len(calls) == len(out["prompt_stats"]["prompt_tokens"])
+    assert t.counts["llm"] == 1 and all(t.counts[s] == 1 for s in ("parse", "embed", "retrieve", "merge"))
+
+
+def test_prometheus_rendering():
+    from src.utils.metrics import Counter, Histogram, STAGE_SECONDS
+    h = Histogram("t_seconds", "test", buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 5):
+        h.observe(v, route="/score")
+    c = Counter("t_total", "test")
+    c.inc(provider="ollama", outcome="ok")
+    text = "\n".join(h.render() + c.render())
+    assert 't_seconds_bucket{route="/score",le="0.1"} 1' in text
+    assert 't_seconds_bucket{route="/score",le="1"} 2' in text
+    assert 't_seconds_bucket{route="/score",le="+Inf"} 3' in text
+    assert 't_total{outcome="ok",provider="ollama"} 1' in text
+
+    before = STAGE_SECONDS.count(stage="unit", provider="x")
+    with span("unit", provider="x"):
+        pass
+    assert STAGE_SECONDS.count(stage="unit", provider="x") == before + 1
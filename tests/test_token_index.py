@@ -0,0 +1,18 @@
+from src.pipeline.match_pipeline import _augment_missing
+from src.utils.token_index import TokenIndex
+
+
+def test_whole_words_compounds_and_phrases():
+    idx = TokenIndex(["Built JavaScript apps with Node.js", "Docker-compose, C++ and machine   learning."])
+    assert "javascript" in idx and "java" not in idx
+    assert "node.js" in idx and "node" in idx and "docker" in idx and "docker-compose" in idx
+    assert "c++" in idx
+    assert "Machine Learning" in idx and "learning machine" not in idx
+    assert idx.any_of({"rust", "docker"}) and not idx.any_of({"rust"})
+    assert idx.missing(["java", "docker", "java", "kubernetes"]) == ["java", "kubernetes"]
+
+
+def test_augment_missing_no_longer_matches_inside_words():
+    merged = _augment_missing({"missing_skills": ["Go"]}, ["Strong Java (Spring)", "JavaScript, TypeScript"],
+                              ["Five years of JavaScript and Spring Boot."])
+    assert merged["missing_skills"] == ["Go", "strong", "java", "typescript"]